@@ -0,0 +1,110 @@
+"""
+Benchmark: address prefilter
+
+Builds Bloom filter snapshots of a synthetic subscriber list and reports,
+per false-positive target: memory per million addresses, the measured
+false-positive rate over addresses that are not in the list, lookup time,
+build time and the cold-start cost of loading the snapshot (read vs mmap).
+A plain Python set of the same addresses is measured for comparison.
+
+Usage (from the repo root):
+    python lambda/newsletter/benchmarks/bench_address_index.py [--count 1000000] [--probes 100000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import harness  # noqa: F401  (puts the function directory on sys.path)
+
+from newsletter_core.address_index import BloomFilter, build_filter, write_snapshot
+
+FP_RATES = (0.01, 0.001)
+
+
+def members(count):
+    return (f'subscriber{i}@example.com' for i in range(count))
+
+
+def non_members(count):
+    return [f'newcomer{i}@example.org' for i in range(count)]
+
+
+def set_bytes(count):
+    """
+    Memory held by a set of the addresses, strings included.
+    """
+    tracemalloc.start()
+    try:
+        addresses = set(members(count))
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del addresses
+    return size
+
+
+def _lookup_ns(bloom, probes):
+    start = time.perf_counter()
+    for address in probes:
+        address in bloom
+    return (time.perf_counter() - start) / len(probes) * 1e9
+
+
+def _load_ms(path, mmap_threshold):
+    start = time.perf_counter()
+    BloomFilter.load(path, mmap_threshold)
+    return (time.perf_counter() - start) * 1000
+
+
+def run(count=1_000_000, probes=100_000, fp_rates=FP_RATES):
+    """
+    One result dict per false-positive target.
+    """
+    outside = non_members(probes)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for fp_rate in fp_rates:
+            start = time.perf_counter()
+            bloom = build_filter(members(count), fp_rate)
+            build_s = time.perf_counter() - start
+
+            path = os.path.join(directory, f'snapshot-{fp_rate}.bin')
+            write_snapshot(bloom, path)
+            mapped = BloomFilter.load(path, mmap_threshold=0)
+            false_positives = sum(1 for address in outside if address in mapped)
+
+            results.append({
+                'fp_target': fp_rate,
+                'bytes': bloom.size_bytes,
+                'bytes_per_million': bloom.size_bytes * 1_000_000 / count,
+                'hash_count': bloom.hash_count,
+                'fp_measured': false_positives / len(outside),
+                'lookup_ns': _lookup_ns(mapped, outside[:10_000]),
+                'build_s': build_s,
+                'load_read_ms': _load_ms(path, mmap_threshold=os.path.getsize(path)),
+                'load_mmap_ms': _load_ms(path, mmap_threshold=0),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1_000_000, help='addresses in the list')
+    parser.add_argument('--probes', type=int, default=100_000, help='non-member lookups for the FP rate')
+    args = parser.parse_args()
+
+    print(f'{args.count:,} addresses, {args.probes:,} non-member probes')
+    print(f"{'fp target':>9} {'MB/million':>11} {'k':>3} {'fp measured':>12} {'lookup ns':>10} "
+          f"{'build s':>8} {'read ms':>8} {'mmap ms':>8}")
+    for r in run(args.count, args.probes):
+        print(f"{r['fp_target']:>9.3%} {r['bytes_per_million'] / 2**20:>11.2f} {r['hash_count']:>3} "
+              f"{r['fp_measured']:>12.3%} {r['lookup_ns']:>10.0f} {r['build_s']:>8.2f} "
+              f"{r['load_read_ms']:>8.2f} {r['load_mmap_ms']:>8.2f}")
+    print(f'python set of the same addresses: {set_bytes(args.count) * 1_000_000 / args.count / 2**20:.1f} MB/million')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: SES client reuse and connection keep-alive
+
+Sends welcome-sized emails through a real boto3 SES client against a local
+HTTP stand-in (local_ses.py) and compares:
+
+- new_client_per_call: what an uncached client costs (construction + new connection)
+- new_connection_per_call: shared client, but no keep-alive (pool size 1, Connection: close)
+- reused_client: the tuned, module-cached client from aws_clients.get_client
+
+--handshake-ms simulates the TCP + TLS setup paid on every new connection.
+
+Usage (from the repo root):
+    python lambda/newsletter/benchmarks/bench_connection_reuse.py [--iterations 300] [--handshake-ms 20]
+"""
+
+import argparse
+import os
+import sys
+
+import harness
+
+from local_ses import LocalSESServer
+
+from newsletter_core import aws_clients
+
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+
+MESSAGE = {
+    'Subject': {'Data': 'Welcome to TranquilMindQuest Newsletter!', 'Charset': 'UTF-8'},
+    'Body': {
+        'Html': {'Data': '<p>Hi there,</p>' * 200, 'Charset': 'UTF-8'},
+        'Text': {'Data': 'Hi there,\n' * 200, 'Charset': 'UTF-8'},
+    },
+}
+
+
+def send(client, i):
+    return client.send_email(
+        Source='newsletter@tranquilmindquest.com',
+        Destination={'ToAddresses': [f'user{i}@example.com']},
+        Message=MESSAGE,
+    )
+
+
+def build_scenarios(endpoint_url):
+    import boto3
+
+    def new_client_per_call(i):
+        client = boto3.client('ses', region_name='ap-south-1', endpoint_url=endpoint_url,
+                              config=aws_clients.build_client_config())
+        send(client, i)
+
+    no_keepalive = boto3.client('ses', region_name='ap-south-1', endpoint_url=endpoint_url,
+                                config=aws_clients.build_client_config(max_pool_connections=1))
+    no_keepalive.meta.events.register(
+        'before-send.ses.*', lambda request, **kwargs: request.headers.__setitem__('Connection', 'close')
+    )
+
+    aws_clients.clear_clients()
+    reused = aws_clients.get_client('ses', region_name='ap-south-1', endpoint_url=endpoint_url)
+
+    return {
+        'new_client_per_call': new_client_per_call,
+        'new_connection_per_call': lambda i: send(no_keepalive, i),
+        'reused_client': lambda i: send(reused, i),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--handshake-ms', type=float, default=20.0)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with LocalSESServer(latency_ms=args.latency_ms, handshake_ms=args.handshake_ms) as server:
+        scenarios = build_scenarios(server.endpoint_url)
+        results = {}
+        for name, func in scenarios.items():
+            before = server.connections
+            results[name] = harness.measure(func, args.iterations, warmup=5)
+            results[name]['connections'] = server.connections - before
+
+    harness.print_results(
+        f'SES send_email via local stand-in, {args.iterations} calls, {args.handshake_ms:.0f} ms handshake', results
+    )
+    for name, metrics in results.items():
+        print(f'{name:<26} new connections: {metrics["connections"]}')
+    aws_clients.clear_clients()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
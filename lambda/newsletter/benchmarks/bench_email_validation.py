@@ -0,0 +1,113 @@
+"""
+Benchmark: email validation
+
+Compares the single-pass validator in email_validation.py against the
+original multi-pass sanitize_email over a synthetic corpus of valid,
+invalid and adversarial addresses.
+
+Usage (from the repo root):
+    python lambda/newsletter/benchmarks/bench_email_validation.py [--count 1000000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from email.utils import parseaddr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newsletter_core.email_validation import validate_email, validate_many  # noqa: E402
+
+
+def legacy_sanitize_email(email):
+    """
+    The original sanitize_email, kept verbatim as the reference behavior.
+    """
+    if not email or not isinstance(email, str):
+        return None
+
+    if len(email) > 254:
+        return None
+
+    email = email.strip().lower()
+
+    email_regex = r'^[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}$'
+    if not re.match(email_regex, email):
+        return None
+
+    parsed = parseaddr(email)
+    if not parsed[1] or '@' not in parsed[1]:
+        return None
+
+    dangerous_patterns = ['\n', '\r', '%0a', '%0d', '<', '>', '"', "'"]
+    if any(pattern in email for pattern in dangerous_patterns):
+        return None
+
+    return parsed[1]
+
+
+EDGE_CASES = [
+    None, '', ' ', 42, ['a@b.co'], 'a@b.co', ' A@B.CO\n', 'a@b.c', 'a@b', '@b.co', 'a@.co',
+    'a..b@c.co', '.a@b.co', 'a.@b.co', 'a@b..co', 'a@-b.co', 'a+tag@b.co', 'a%b@c.co',
+    'a%0a@b.co', 'a%0D@b.co', 'a%0b@b.co', 'a\n@b.co', 'a\r\nbcc:x@b.co', 'a@b.co\nbcc:x@y.co',
+    '"a"@b.co', "a'b@c.co", '<a@b.co>', 'a@b.co>', 'Name <a@b.co>', 'a b@c.co', 'a@@b.co',
+    'a@b.co.', 'a@b.c0m', 'ünï@b.co', 'a@bü.co', 'Kelvin@b.co', 'İstanbul@b.co',
+    '\xa0a@b.co\xa0', '\x1fa@b.co', 'a@b.co\x00', 'x' * 250 + '@b.co', 'x' * 240 + '@b.co',
+    ' ' * 250 + 'a@b.co', 'a@b.museum', 'A@B.COM', '_@_.co', '-@-.co', '%@%.co',
+]
+
+_LOCAL_CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789._%+-'
+_NOISE_CHARS = _LOCAL_CHARS + 'ABCXYZ@ <>"\'\n\r\tü'
+
+
+def generate_corpus(count, seed=1234):
+    """
+    Build a reproducible corpus: mostly plausible addresses, some noise, some edge cases.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            local = ''.join(rng.choice(_LOCAL_CHARS) for _ in range(rng.randint(1, 20)))
+            domain = ''.join(rng.choice('abcdefghij-.0') for _ in range(rng.randint(1, 12)))
+            tld = rng.choice(['com', 'org', 'in', 'co', 'io', 'c', 'CoM'])
+            address = f'{local}@{domain}.{tld}'
+            if rng.random() < 0.1:
+                address = f'  {address.upper()} '
+            corpus.append(address)
+        elif roll < 0.95:
+            corpus.append(''.join(rng.choice(_NOISE_CHARS) for _ in range(rng.randint(0, 40))))
+        else:
+            corpus.append(EDGE_CASES[i % len(EDGE_CASES)])
+    return corpus
+
+
+def _time(label, func, corpus):
+    start = time.perf_counter()
+    func(corpus)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {elapsed:8.3f}s  {len(corpus) / elapsed / 1e6:6.2f} M addr/s')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.count)
+    print(f'Corpus: {len(corpus):,} addresses')
+
+    legacy = _time('legacy sanitize_email', lambda c: [legacy_sanitize_email(e) for e in c], corpus)
+    fast = _time('validate_email (per call)', lambda c: [validate_email(e) for e in c], corpus)
+    many = _time('validate_many', validate_many, corpus)
+
+    print(f'Speedup: {legacy / fast:.1f}x per call, {legacy / many:.1f}x vectorized')
+
+
+if __name__ == '__main__':
+    main()
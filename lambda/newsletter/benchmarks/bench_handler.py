@@ -0,0 +1,113 @@
+"""
+Benchmark: newsletter subscription handler
+
+Drives lambda_handler with synthetic API Gateway events against a stubbed
+SES client and reports throughput, latency percentiles and allocated bytes
+per request for each request type.
+
+Usage (from the repo root):
+    python lambda/newsletter/benchmarks/bench_handler.py [--iterations 20000]
+    python lambda/newsletter/benchmarks/bench_handler.py --save-baseline
+    python lambda/newsletter/benchmarks/bench_handler.py --compare
+"""
+
+import argparse
+import json
+import sys
+
+import harness
+
+from botocore.exceptions import ClientError
+
+from newsletter_core import handlers, sending  # noqa: E402
+from newsletter_core.abuse_limiter import SlidingWindowLimiter  # noqa: E402
+from newsletter_core.subscriber_store import CachedSubscriberStore, InMemorySubscriberStore  # noqa: E402
+
+ORIGIN = 'https://tranquilmindquest.com'
+
+
+class StubSESClient:
+    """
+    In-process SES stand-in: returns a fixed message id, or raises `error`.
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+
+    def send_email(self, **kwargs):
+        if self.error is not None:
+            raise self.error
+        return {'MessageId': 'bench-message-id'}
+
+
+def api_event(method='POST', body=None, origin=ORIGIN):
+    return {
+        'httpMethod': method,
+        'headers': {'origin': origin},
+        'body': json.dumps(body) if body is not None else None,
+    }
+
+
+def build_scenarios():
+    """
+    Scenario name -> callable(i). Valid signups use a unique address per call
+    so duplicate suppression does not short-circuit them.
+    """
+    ok_client = StubSESClient()
+    rejected = ClientError({'Error': {'Code': 'MessageRejected', 'Message': 'rejected'}}, 'SendEmail')
+    failing_client = StubSESClient(error=rejected)
+
+    preflight = api_event('OPTIONS')
+    invalid = api_event(body={'email': 'not-an-email', 'name': 'Bench'})
+    forbidden = api_event(body={'email': 'bench@example.com'}, origin='https://evil.test')
+    duplicate = api_event(body={'email': 'repeat@example.com', 'name': 'Bench'})
+
+    def with_client(client, func):
+        def run(i):
+            sending.ses_client = client
+            return func(i)
+        return run
+
+    return {
+        'preflight': lambda i: handlers.lambda_handler(preflight, None),
+        'forbidden_origin': lambda i: handlers.lambda_handler(forbidden, None),
+        'invalid_email': lambda i: handlers.lambda_handler(invalid, None),
+        'valid_signup': with_client(ok_client, lambda i: handlers.lambda_handler(
+            api_event(body={'email': f'user{i}@example.com', 'name': f'User {i % 50}'}), None)),
+        'duplicate_signup': with_client(ok_client, lambda i: handlers.lambda_handler(duplicate, None)),
+        'ses_error': with_client(failing_client, lambda i: handlers.lambda_handler(
+            api_event(body={'email': f'fail{i}@example.com'}), None)),
+    }
+
+
+def run(iterations, warmup=100, alloc_iterations=200):
+    """
+    Run all scenarios with an isolated in-memory subscriber store and queue disabled.
+    The abuse limiters keep their bookkeeping but get limits no scenario reaches.
+    """
+    saved = (sending.ses_client, handlers.subscriber_store, handlers.send_queue,
+             handlers.ip_limiter, handlers.domain_limiter)
+    handlers.subscriber_store = CachedSubscriberStore(InMemorySubscriberStore())
+    handlers.send_queue = None
+    handlers.ip_limiter = SlidingWindowLimiter(10 ** 9)
+    handlers.domain_limiter = SlidingWindowLimiter(10 ** 9)
+    try:
+        return harness.run_scenarios(build_scenarios(), iterations, warmup, alloc_iterations)
+    finally:
+        (sending.ses_client, handlers.subscriber_store, handlers.send_queue,
+         handlers.ip_limiter, handlers.domain_limiter) = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    harness.add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    harness.print_results(f'lambda_handler, {args.iterations:,} requests per scenario', results)
+    return harness.finish('bench_handler', results, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
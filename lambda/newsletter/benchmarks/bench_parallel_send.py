@@ -0,0 +1,93 @@
+"""
+Benchmark: parallel welcome email sending
+
+Sends welcome emails through sending.send_welcome_emails (the dispatcher)
+to a stub SES client that sleeps for --latency-ms per call, standing in
+for the network round trip, and reports throughput per concurrency level.
+The stub sits behind RateLimitedSESClient like the real client, so
+--rate caps throughput the way the account's max send rate would.
+Levels stop at SEND_CONCURRENCY (the dispatcher's pool size); set it
+higher in the environment to measure more.
+
+Usage (from the repo root):
+    python lambda/newsletter/benchmarks/bench_parallel_send.py [--count 200] [--latency-ms 20] [--rate 1000]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import harness
+
+from newsletter_core import dispatcher, sending
+from newsletter_core.config import SEND_CONCURRENCY
+from newsletter_core.rate_limiter import RateLimitedSESClient
+
+CONCURRENCY_LEVELS = tuple(level for level in (1, 2, 4, 8, 16, 32) if level <= SEND_CONCURRENCY)
+
+
+class SlowSESClient:
+    """
+    SES stand-in whose send_email blocks for a fixed latency.
+    """
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send_email(self, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            return {'MessageId': f'slow-{self.calls}'}
+
+
+def measure_throughput(count, concurrency, latency_ms, rate):
+    """
+    Send `count` welcome emails at `concurrency`; returns sends per second.
+    """
+    saved_client, saved_backend = sending.ses_client, sending.sending_backend
+    sending.ses_client = RateLimitedSESClient(SlowSESClient(latency_ms), rate=rate)
+    sending.sending_backend = sending.SesV1Backend()
+    recipients = [(f'user{i}@example.com', f'User {i}') for i in range(count)]
+    try:
+        # Warm the thread pool and the token bucket outside the timed run
+        sending.send_welcome_emails(recipients[:concurrency], concurrency)
+        start = time.perf_counter()
+        outcomes = sending.send_welcome_emails(recipients, concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        sending.ses_client, sending.sending_backend = saved_client, saved_backend
+    assert all(error is None for _, error in outcomes)
+    return count / elapsed
+
+
+def run(count=200, latency_ms=20.0, rate=1000.0, levels=CONCURRENCY_LEVELS):
+    results = {}
+    for concurrency in levels:
+        with harness.quiet():
+            results[concurrency] = measure_throughput(count, concurrency, latency_ms, rate)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--rate', type=float, default=1000.0, help='max sends per second (token bucket)')
+    args = parser.parse_args()
+
+    results = run(args.count, args.latency_ms, args.rate)
+    baseline = results[CONCURRENCY_LEVELS[0]]
+    print(f'{args.count} welcome emails, {args.latency_ms:.0f} ms per SES call, rate limit {args.rate:.0f}/s')
+    print(f'{"concurrency":>11}  {"sends/s":>10}  {"speedup":>8}')
+    for concurrency, throughput in results.items():
+        print(f'{concurrency:>11}  {throughput:>10.1f}  {throughput / baseline:>7.1f}x')
+    dispatcher.shutdown_executor()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
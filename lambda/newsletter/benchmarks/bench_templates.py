@@ -0,0 +1,84 @@
+"""
+Benchmark: template variants
+
+For every template variant (name x locale) in the registry, reports the
+one-time compile cost (file reads + CSS inlining + segment split, paid once
+per container), render throughput and latency for uncached renders (a new
+display name each call), the size of the rendered HTML, and what inlining
+the CSS on every send instead would cost per render.
+
+Usage (from the repo root):
+    python lambda/newsletter/benchmarks/bench_templates.py [--iterations 20000]
+"""
+
+import argparse
+import html
+import time
+
+import harness
+
+from newsletter_core.template_registry import TemplateRegistry, inline_css
+
+CONFIRM_URL = 'https://tranquilmindquest.com/confirm?token=' + 'x' * 96
+UNSUBSCRIBE_URL = 'https://tranquilmindquest.com/unsubscribe?token=' + 'y' * 96
+
+
+def slot_values(index):
+    display_name = f'Subscriber {index}'
+    return {
+        'name': html.escape(display_name), 'year': '2031',
+        'unsubscribe_url': UNSUBSCRIBE_URL, 'confirm_url': html.escape(CONFIRM_URL),
+    }, {
+        'name': display_name, 'year': '2031', 'unsubscribe_url': UNSUBSCRIBE_URL, 'confirm_url': CONFIRM_URL,
+    }
+
+
+def variants(registry):
+    return [(name, locale) for name in sorted(registry.manifest) for locale in registry.locales(name)]
+
+
+def run(iterations=20_000, warmup=100):
+    """
+    One result dict per variant.
+    """
+    results = []
+    for name, locale in variants(TemplateRegistry()):
+        registry = TemplateRegistry()
+        start = time.perf_counter()
+        variant = registry.variant(name, locale)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        def render(i):
+            html_values, text_values = slot_values(i)
+            return variant.html.render(html_values), variant.text.render(text_values)
+
+        metrics = harness.measure(render, iterations, warmup)
+
+        source = registry.read(f"{registry.manifest[name].get('body', name)}.{locale}.html")
+        start = time.perf_counter()
+        for _ in range(20):
+            inline_css(source, registry.read)
+        inline_us = (time.perf_counter() - start) / 20 * 1e6
+
+        results.append(dict(
+            metrics, variant=f'{name}.{locale}', compile_ms=compile_ms,
+            html_bytes=len(render(0)[0].encode('utf-8')), inline_per_send_us=inline_us,
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20_000, help='renders per variant')
+    args = parser.parse_args()
+
+    print(f'{args.iterations:,} uncached renders per variant')
+    print(f"{'variant':<12} {'compile ms':>10} {'renders/s':>11} {'p50 us':>8} {'p99 us':>8} "
+          f"{'html bytes':>10} {'inline/send us':>15}")
+    for r in run(args.iterations):
+        print(f"{r['variant']:<12} {r['compile_ms']:>10.2f} {r['ops_per_sec']:>11,.0f} {r['p50_us']:>8.1f} "
+              f"{r['p99_us']:>8.1f} {r['html_bytes']:>10,} {r['inline_per_send_us']:>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
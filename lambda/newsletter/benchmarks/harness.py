@@ -0,0 +1,199 @@
+"""
+Benchmark Harness
+
+Small timing helpers shared by the benchmark scripts in this folder:
+latency percentiles, throughput, per-call allocation and JSON baselines
+that can be committed and compared in review.
+"""
+
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+FUNCTION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+if FUNCTION_DIR not in sys.path:
+    sys.path.insert(0, FUNCTION_DIR)
+
+
+def percentile(sorted_samples, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_samples:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_samples))
+    return sorted_samples[max(0, min(len(sorted_samples), rank) - 1)]
+
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Swallow handler print() output while measuring.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(func, iterations, warmup=100):
+    """
+    Call func(i) `iterations` times; return throughput and latency percentiles (microseconds).
+    """
+    for i in range(warmup):
+        func(i)
+
+    samples = []
+    clock = time.perf_counter
+    start = clock()
+    for i in range(warmup, warmup + iterations):
+        t0 = clock()
+        func(i)
+        samples.append(clock() - t0)
+    total = clock() - start
+
+    samples.sort()
+    return {
+        'ops_per_sec': iterations / total if total else 0.0,
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p95_us': percentile(samples, 95) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+    }
+
+
+def measure_allocations(func, iterations=200, offset=10_000_000):
+    """
+    Average peak bytes allocated while a single call runs (tracemalloc).
+    Indexes start at `offset` so inputs don't collide with the timed run.
+    """
+    tracemalloc.start()
+    try:
+        total = 0
+        for i in range(offset, offset + iterations):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(i)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / iterations
+
+
+def run_scenarios(scenarios, iterations, warmup=100, alloc_iterations=200, repeats=3):
+    """
+    Measure every scenario: {name: callable(i)} -> {name: metrics}.
+    Each scenario is timed `repeats` times and the fastest run is kept (as timeit does),
+    which filters out most scheduler noise.
+    """
+    results = {}
+    with quiet():
+        for name, func in scenarios.items():
+            runs = [measure(func, iterations, warmup) for _ in range(repeats)]
+            metrics = min(runs, key=lambda m: m['p50_us'])
+            metrics['alloc_bytes'] = measure_allocations(func, alloc_iterations)
+            results[name] = metrics
+    return results
+
+
+def print_results(title, results):
+    print(title)
+    print(f"{'scenario':<22} {'ops/sec':>12} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'alloc B/req':>12}")
+    for name, m in results.items():
+        print(f"{name:<22} {m['ops_per_sec']:>12,.0f} {m['p50_us']:>10.1f} {m['p95_us']:>10.1f} "
+              f"{m['p99_us']:>10.1f} {_format_alloc(m.get('alloc_bytes')):>12}")
+
+
+def _format_alloc(value):
+    return '-' if value is None else f'{value:,.0f}'
+
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def save_baseline(name, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    data = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        # Rounded so committed baselines diff cleanly in review
+        'results': {
+            name: {key: round(value, 1) for key, value in metrics.items()}
+            for name, metrics in results.items()
+        },
+    }
+    with open(baseline_path(name), 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f'Baseline saved: {baseline_path(name)}')
+
+
+def load_baseline(name):
+    try:
+        with open(baseline_path(name), encoding='utf-8') as f:
+            return json.load(f)['results']
+    except FileNotFoundError:
+        return None
+
+
+def compare_to_baseline(results, baseline, tolerance=0.5, alloc_tolerance=0.1, min_delta_us=5.0):
+    """
+    Return human-readable regressions: latency more than `tolerance` (and at
+    least `min_delta_us`) above the baseline, throughput more than `tolerance`
+    below it, or allocations more than `alloc_tolerance` above it. Allocations
+    are deterministic, so they get the tighter bound.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ('p50_us', 'p99_us'):
+            limit = max(base.get(key, 0) * (1 + tolerance), base.get(key, 0) + min_delta_us)
+            if base.get(key) and current[key] > limit:
+                regressions.append(f'{name}: {key} {current[key]:.1f} vs baseline {base[key]:.1f}')
+        if current.get('alloc_bytes', 0) > base.get('alloc_bytes', 0) * (1 + alloc_tolerance) + 64:
+            regressions.append(
+                f"{name}: alloc_bytes {current['alloc_bytes']:.0f} vs baseline {base.get('alloc_bytes', 0):.0f}"
+            )
+        if base.get('ops_per_sec') and current['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: ops_per_sec {current['ops_per_sec']:.0f} vs baseline {base['ops_per_sec']:.0f}"
+            )
+    return regressions
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument('--save-baseline', action='store_true', help='write results to baselines/')
+    parser.add_argument('--compare', action='store_true', help='fail if results regress against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed relative latency/throughput regression (default 0.5)')
+    parser.add_argument('--alloc-tolerance', type=float, default=0.1,
+                        help='allowed relative allocation regression (default 0.1)')
+
+
+def finish(name, results, args):
+    """
+    Save and/or compare baselines as requested; returns the process exit code.
+    """
+    if args.save_baseline:
+        save_baseline(name, results)
+    if args.compare:
+        baseline = load_baseline(name)
+        if baseline is None:
+            print(f'No baseline for {name}; run with --save-baseline first')
+            return 1
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.alloc_tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            return 1
+        print('No regressions against baseline')
+    return 0
@@ -0,0 +1,91 @@
+"""
+Local HTTP Stand-in for the SES Query API
+
+Answers every POST with a minimal successful SendEmail response, so a real
+boto3 SES client (with endpoint_url pointed here) exercises its full HTTP
+stack: connection pooling, keep-alive, request signing and parsing.
+
+`handshake_ms` delays each *new* connection (a stand-in for the TCP + TLS
+handshake to the real endpoint) and `latency_ms` delays every response.
+"""
+
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEND_EMAIL_RESPONSE = (
+    '<SendEmailResponse xmlns="http://ses.amazonaws.com/doc/2010-12-01/">'
+    '<SendEmailResult><MessageId>{message_id}</MessageId></SendEmailResult>'
+    '<ResponseMetadata><RequestId>{request_id}</RequestId></ResponseMetadata>'
+    '</SendEmailResponse>'
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; avoid Nagle + delayed-ACK stalls
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+        if self.server.handshake_ms:
+            time.sleep(self.server.handshake_ms / 1000.0)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', '0'))
+        self.rfile.read(length)
+        self.server.requests += 1
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000.0)
+        body = SEND_EMAIL_RESPONSE.format(message_id=uuid.uuid4().hex, request_id=uuid.uuid4().hex).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalSESServer:
+    """
+    Context manager running the stand-in on a free localhost port.
+    """
+
+    def __init__(self, latency_ms=0.0, handshake_ms=0.0):
+        self.latency_ms = latency_ms
+        self.handshake_ms = handshake_ms
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.latency_ms = self.latency_ms
+        self._server.handshake_ms = self.handshake_ms
+        self._server.connections = 0
+        self._server.requests = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def endpoint_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def connections(self):
+        return self._server.connections
+
+    @property
+    def requests(self):
+        return self._server.requests
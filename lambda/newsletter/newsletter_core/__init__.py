@@ -0,0 +1,54 @@
+"""
+Newsletter Handler Core
+
+Shared implementation behind both newsletter Lambda entry points
+(`lambda/newsletter/lambda_function.py` and `aws/lambda-newsletter-handler.py`).
+The entry point files only re-export the handlers defined here, so request
+parsing, validation, CORS, rendering and sending exist exactly once.
+
+Modules:
+- config: environment-driven settings
+- cors: allowed-origin checks and CORS headers
+- events: API Gateway event parsing and response building
+- email_validation / email_templates: validation and rendering
+- template_registry: template files per locale, compiled (CSS inlined) once per container
+- sending / ses_v2 / raw_email: SES clients and welcome email sending backends
+- dispatcher: bounded parallel fan-out of SES calls
+- importer: streaming CSV/JSONL subscriber import
+- campaigns: checkpointed newsletter campaigns over the subscriber list
+- tokens: signed stateless tokens for confirm and unsubscribe links
+- confirmation: double opt-in tokens
+- unsubscribe: one-click unsubscribe links, headers and route pages
+- suppression: bounce/complaint suppression index
+- address_index: Bloom filter snapshots that answer "definitely new" for signups
+- coalescing: single-flight coalescing of concurrent duplicate signups
+- deadline: response-time budget for the SES calls of a signup
+- abuse_limiter: per-IP / per-domain sliding-window throttling
+- handlers: Lambda handlers (subscription, queue consumer, bulk send, campaign, import, SES feedback, snapshots)
+"""
+
+from .handlers import (
+    bulk_send_handler,
+    campaign_handler,
+    create_welcome_email_html,
+    create_welcome_email_text,
+    feedback_handler,
+    import_handler,
+    lambda_handler,
+    sanitize_email,
+    send_queue_consumer_handler,
+    snapshot_handler,
+)
+
+__all__ = [
+    'bulk_send_handler',
+    'campaign_handler',
+    'create_welcome_email_html',
+    'create_welcome_email_text',
+    'feedback_handler',
+    'import_handler',
+    'lambda_handler',
+    'sanitize_email',
+    'send_queue_consumer_handler',
+    'snapshot_handler',
+]
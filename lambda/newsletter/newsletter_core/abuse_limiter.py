@@ -0,0 +1,211 @@
+"""
+Per-Client Abuse Throttling
+
+API Gateway throttling is global, so a single bot can still use up the
+endpoint and the SES quota. The subscription handler therefore limits
+requests per source IP and signups per recipient domain with a sliding
+window counter. The estimate is
+    previous_window_count * (1 - elapsed_fraction) + current_window_count
+which needs only two counters per key and smooths out bursts at window
+edges.
+
+Two tiers:
+- InMemoryWindowStore: bounded per-container counters. Always consulted
+  first, so a client hammering one warm container is rejected without a
+  backend round trip.
+- Shared store (optional), for counts that hold across concurrent containers:
+  SQLiteWindowStore (RATE_LIMIT_DB_PATH, local runs) or DynamoDBWindowStore
+  (RATE_LIMIT_TABLE, atomic ADD on one item per key and window, expired via TTL).
+
+Stores expose increment(key, window, cost) -> (current_count, previous_count).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .aws_clients import get_client
+
+
+class InMemoryWindowStore:
+    """
+    Per-container window counters, least recently used keys evicted first.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def increment(self, key, window, cost=1):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] < window - 1:
+                current, previous = 0, 0
+            elif entry[0] == window - 1:
+                current, previous = 0, entry[1]
+            else:
+                current, previous = entry[1], entry[2]
+            current += cost
+            self._entries[key] = (window, current, previous)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return current, previous
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteWindowStore:
+    """
+    SQLite window counters shared by every process using the same file.
+    """
+
+    # Delete finished windows every this many increments
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        self._increments = 0
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_windows ('
+            'key TEXT, window INTEGER, hits INTEGER, PRIMARY KEY (key, window))'
+        )
+
+    def increment(self, key, window, cost=1):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'INSERT INTO rate_windows (key, window, hits) VALUES (?, ?, ?) '
+                    'ON CONFLICT (key, window) DO UPDATE SET hits = hits + excluded.hits',
+                    (key, window, cost)
+                )
+                counts = dict(self._conn.execute(
+                    'SELECT window, hits FROM rate_windows WHERE key = ? AND window IN (?, ?)',
+                    (key, window, window - 1)
+                ).fetchall())
+                self._increments += 1
+                if self._increments % self.PRUNE_EVERY == 0:
+                    self._conn.execute('DELETE FROM rate_windows WHERE window < ?', (window - 1,))
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        return counts.get(window, 0), counts.get(window - 1, 0)
+
+
+class DynamoDBWindowStore:
+    """
+    DynamoDB window counters: one item per (key, window) with an atomic ADD.
+    Closed windows no longer change, so the previous window's count is read
+    once and kept in memory.
+    """
+
+    def __init__(self, table_name, window_seconds, client=None, cache_size=10000):
+        self.table_name = table_name
+        self.window_seconds = window_seconds
+        self._client = client
+        self._previous = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client('dynamodb')
+        return self._client
+
+    def increment(self, key, window, cost=1):
+        response = self.client.update_item(
+            TableName=self.table_name,
+            Key={'pk': {'S': f'{key}#{window}'}},
+            UpdateExpression='ADD hits :cost SET expires_at = if_not_exists(expires_at, :expires)',
+            ExpressionAttributeValues={
+                ':cost': {'N': str(cost)},
+                ':expires': {'N': str((window + 2) * self.window_seconds)}
+            },
+            ReturnValues='UPDATED_NEW'
+        )
+        current = int(response['Attributes']['hits']['N'])
+        return current, self._previous_count(key, window - 1)
+
+    def _previous_count(self, key, window):
+        cache_key = (key, window)
+        with self._lock:
+            if cache_key in self._previous:
+                return self._previous[cache_key]
+        item = self.client.get_item(
+            TableName=self.table_name, Key={'pk': {'S': f'{key}#{window}'}}
+        ).get('Item')
+        count = int(item['hits']['N']) if item else 0
+        with self._lock:
+            self._previous[cache_key] = count
+            while len(self._previous) > self._cache_size:
+                self._previous.popitem(last=False)
+        return count
+
+
+class SlidingWindowLimiter:
+    """
+    Allow at most `limit` hits per key in any `window_seconds` span (estimated).
+    A limit of 0 disables the limiter.
+    """
+
+    def __init__(self, limit, window_seconds=60, local=None, shared=None, clock=time.time):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.local = local if local is not None else InMemoryWindowStore()
+        self.shared = shared
+        self._clock = clock
+
+    def _estimate(self, counts, weight):
+        current, previous = counts
+        return previous * weight + current
+
+    def hit(self, key, cost=1):
+        """
+        Record `cost` hits for `key`; returns False if the key is over its limit.
+        """
+        if self.limit <= 0:
+            return True
+        now = self._clock()
+        window = int(now // self.window_seconds)
+        weight = 1.0 - (now % self.window_seconds) / self.window_seconds
+
+        # This container alone has already seen too many: no need to ask the shared store
+        if self._estimate(self.local.increment(key, window, cost), weight) > self.limit:
+            return False
+        if self.shared is None:
+            return True
+        return self._estimate(self.shared.increment(key, window, cost), weight) <= self.limit
+
+
+def create_limiters():
+    """
+    Build the (per-IP, per-domain) limiters configured by environment variables.
+    """
+    window_seconds = int(os.environ.get('RATE_LIMIT_WINDOW_SECONDS', '60'))
+    table_name = os.environ.get('RATE_LIMIT_TABLE', '')
+    db_path = os.environ.get('RATE_LIMIT_DB_PATH', '')
+    if table_name:
+        shared = DynamoDBWindowStore(table_name, window_seconds)
+    elif db_path:
+        shared = SQLiteWindowStore(db_path)
+    else:
+        shared = None
+
+    cache_size = int(os.environ.get('RATE_LIMIT_CACHE_SIZE', '10000'))
+    ip_limiter = SlidingWindowLimiter(
+        int(os.environ.get('RATE_LIMIT_PER_IP', '10')), window_seconds,
+        InMemoryWindowStore(cache_size), shared
+    )
+    domain_limiter = SlidingWindowLimiter(
+        int(os.environ.get('RATE_LIMIT_PER_DOMAIN', '50')), window_seconds,
+        InMemoryWindowStore(cache_size), shared
+    )
+    return ip_limiter, domain_limiter
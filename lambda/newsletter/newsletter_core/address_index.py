@@ -0,0 +1,302 @@
+"""
+Address Prefilter (Bloom Filter Snapshots)
+
+Most signups are new addresses, yet with double opt-in the signup path
+still asks the subscriber store whether they are already registered,
+which costs a remote round trip each time. A Bloom filter of every
+subscribed address answers "definitely not in the list" in memory with k
+bit probes, so only possible hits go to the authoritative store.
+
+Snapshots are built offline from the subscriber store (snapshot_handler, or
+`python -m newsletter_core.address_index`) and loaded once per container
+from a local path or s3:// URI. Files above PREFILTER_MMAP_BYTES are
+memory-mapped rather than read, so a cold start only pages in the bits
+that are actually probed. At a 1% false-positive rate the filter needs
+about 1.2 MB per million addresses.
+
+A snapshot lags the store. Addresses written by this container are kept in
+a small local set, and the snapshot is re-checked for a newer version every
+PREFILTER_REFRESH_SECONDS. The prefilter is therefore only used for the
+duplicate-signup check. It is never used for suppressions: a bounce or
+complaint recorded since the snapshot was built must still stop the send.
+
+Snapshot file layout (little endian):
+    b'TMQBLOOM' | version u8 | 3 pad bytes | hash_count u32 | bit_count u64 | item_count u64 | bits
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+
+from .aws_clients import get_client
+
+SNAPSHOT_MAGIC = b'TMQBLOOM'
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct('<8sB3xIQQ')
+
+PREFILTER_FP_RATE = float(os.environ.get('PREFILTER_FP_RATE', '0.01'))
+PREFILTER_MMAP_BYTES = int(os.environ.get('PREFILTER_MMAP_BYTES', str(1 << 20)))
+PREFILTER_REFRESH_SECONDS = int(os.environ.get('PREFILTER_REFRESH_SECONDS', '300'))
+
+
+def address_digest(email):
+    """
+    128-bit digest of an address; its two halves seed the k probe positions.
+    """
+    return hashlib.blake2b(email.encode('utf-8'), digest_size=16).digest()
+
+
+class BloomFilter:
+    """
+    Bit array with k probes per key (Kirsch-Mitzenmacher double hashing).
+    `bits` may be a bytearray (building), bytes or a read-only mmap (loaded
+    snapshots); `offset` is where the bit array starts inside it.
+    """
+
+    __slots__ = ('bits', 'bit_count', 'hash_count', 'count', 'offset')
+
+    def __init__(self, bit_count, hash_count, bits=None, count=0, offset=0):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray((bit_count + 7) // 8)
+        self.count = count
+        self.offset = offset
+
+    @classmethod
+    def for_capacity(cls, capacity, fp_rate=PREFILTER_FP_RATE):
+        """
+        Size a filter for `capacity` keys at the given false-positive rate.
+        """
+        capacity = max(1, capacity)
+        bit_count = max(64, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(bit_count / capacity * math.log(2)))
+        return cls(bit_count, hash_count)
+
+    def _positions(self, digest):
+        bit_count = self.bit_count
+        position = int.from_bytes(digest[:8], 'little') % bit_count
+        step = (int.from_bytes(digest[8:], 'little') | 1) % bit_count or 1
+        for _ in range(self.hash_count):
+            yield position
+            position = (position + step) % bit_count
+
+    def add_digest(self, digest):
+        bits, offset = self.bits, self.offset
+        for position in self._positions(digest):
+            bits[offset + (position >> 3)] |= 1 << (position & 7)
+        self.count += 1
+
+    def add(self, email):
+        self.add_digest(address_digest(email))
+
+    def __contains__(self, email):
+        bits, offset = self.bits, self.offset
+        for position in self._positions(address_digest(email)):
+            if not bits[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def size_bytes(self):
+        return (self.bit_count + 7) // 8
+
+    def to_bytes(self):
+        header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.hash_count, self.bit_count, self.count)
+        return header + bytes(self.bits[self.offset:self.offset + self.size_bytes])
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """
+        Wrap a snapshot held in bytes or an mmap without copying the bit array.
+        """
+        if len(buffer) < HEADER.size:
+            raise ValueError('Snapshot is truncated')
+        magic, version, hash_count, bit_count, count = HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError('Not an address snapshot')
+        if len(buffer) < HEADER.size + (bit_count + 7) // 8:
+            raise ValueError('Snapshot is truncated')
+        return cls(bit_count, hash_count, buffer, count, HEADER.size)
+
+    @classmethod
+    def load(cls, path, mmap_threshold=PREFILTER_MMAP_BYTES):
+        """
+        Load a snapshot file, memory-mapping it when larger than `mmap_threshold` bytes.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > mmap_threshold:
+                # The mapping stays valid after the file is closed
+                return cls.from_buffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            return cls.from_buffer(f.read())
+
+
+def build_filter(emails, fp_rate=PREFILTER_FP_RATE):
+    """
+    Build a filter sized for exactly the given addresses. Only their 16-byte
+    digests are held while counting, not the address strings.
+    """
+    digests = bytearray()
+    for email in emails:
+        digests += address_digest(email)
+    bloom = BloomFilter.for_capacity(len(digests) // 16, fp_rate)
+    view = memoryview(digests)
+    for start in range(0, len(digests), 16):
+        bloom.add_digest(view[start:start + 16])
+    return bloom
+
+
+def iter_pages(page):
+    """
+    Yield every address from a page(after, limit) -> (items, cursor) function.
+    Items may be addresses or subscriber records.
+    """
+    cursor = None
+    while True:
+        items, cursor = page(cursor, 1000)
+        for item in items:
+            yield item['email'] if isinstance(item, dict) else item
+        if cursor is None:
+            return
+
+
+def _split_s3(uri):
+    bucket, _, key = uri[len('s3://'):].partition('/')
+    return bucket, key
+
+
+def write_snapshot(bloom, destination):
+    """
+    Write a snapshot to a local path (atomically) or an s3:// URI.
+    """
+    data = bloom.to_bytes()
+    if destination.startswith('s3://'):
+        bucket, key = _split_s3(destination)
+        get_client('s3').put_object(Bucket=bucket, Key=key, Body=data)
+        return
+    directory = os.path.dirname(os.path.abspath(destination))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, destination)
+
+
+def rebuild_snapshot(page, destination, fp_rate=PREFILTER_FP_RATE):
+    """
+    Build a snapshot of everything a store's page() returns and write it out.
+    """
+    bloom = build_filter(iter_pages(page), fp_rate)
+    write_snapshot(bloom, destination)
+    return bloom
+
+
+def snapshot_version(source):
+    """
+    Cheap change marker: the local file's mtime or the S3 object's ETag.
+    """
+    if source.startswith('s3://'):
+        bucket, key = _split_s3(source)
+        return get_client('s3').head_object(Bucket=bucket, Key=key)['ETag']
+    return os.stat(source).st_mtime_ns
+
+
+def load_snapshot(source, mmap_threshold=PREFILTER_MMAP_BYTES):
+    """
+    Load a snapshot from a local path, or download an s3:// snapshot to /tmp first.
+    """
+    if source.startswith('s3://'):
+        bucket, key = _split_s3(source)
+        path = os.path.join(tempfile.gettempdir(), 'prefilter-' + key.replace('/', '_'))
+        body = get_client('s3').get_object(Bucket=bucket, Key=key)['Body']
+        with open(path + '.tmp', 'wb') as f:
+            shutil.copyfileobj(body, f, 1 << 20)
+        os.replace(path + '.tmp', path)
+        source = path
+    return BloomFilter.load(source, mmap_threshold)
+
+
+class AddressPrefilter:
+    """
+    A loaded snapshot plus the addresses this container wrote since, refreshed
+    when the snapshot source changes. might_contain() is False only for
+    addresses that are definitely not in the list.
+    """
+
+    def __init__(self, source, bloom, refresh_seconds=PREFILTER_REFRESH_SECONDS, clock=time.monotonic):
+        self.source = source
+        self.bloom = bloom
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._version = None
+        self._checked_at = clock()
+        self._local = set()
+        self._lock = threading.Lock()
+
+    def might_contain(self, email):
+        if self._clock() - self._checked_at >= self.refresh_seconds:
+            self.refresh()
+        return email in self._local or email in self.bloom
+
+    def add(self, email):
+        self._local.add(email)
+
+    def refresh(self):
+        """
+        Reload the snapshot if its source changed; keeps the current one on any error.
+        """
+        with self._lock:
+            self._checked_at = self._clock()
+            try:
+                version = snapshot_version(self.source)
+                if self._version is None:
+                    self._version = version
+                elif version != self._version:
+                    self.bloom = load_snapshot(self.source)
+                    self._version = version
+            except Exception as e:
+                print(f'Prefilter refresh failed: {str(e)}')
+
+
+def create_prefilter(source):
+    """
+    Prefilter for a snapshot source, or None (no prefilter) if unset or unreadable.
+    """
+    if not source:
+        return None
+    try:
+        prefilter = AddressPrefilter(source, load_snapshot(source))
+        prefilter._version = snapshot_version(source)
+        return prefilter
+    except Exception as e:
+        print(f'Prefilter snapshot unavailable ({source}): {str(e)}')
+        return None
+
+
+def create_subscriber_prefilter():
+    """
+    Subscriber prefilter from SUBSCRIBER_SNAPSHOT, or None.
+    """
+    return create_prefilter(os.environ.get('SUBSCRIBER_SNAPSHOT', ''))
+
+
+def main(argv=None):
+    from .subscriber_store import create_subscriber_store
+
+    parser = argparse.ArgumentParser(description='Build a Bloom filter snapshot of the subscriber list.')
+    parser.add_argument('destination', help='local path or s3://bucket/key')
+    parser.add_argument('--fp-rate', type=float, default=PREFILTER_FP_RATE)
+    args = parser.parse_args(argv)
+
+    bloom = rebuild_snapshot(create_subscriber_store().page, args.destination, args.fp_rate)
+    print(f'Snapshot written: {bloom.count} addresses, {bloom.size_bytes} bytes, {bloom.hash_count} probes')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
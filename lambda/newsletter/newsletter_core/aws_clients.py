@@ -0,0 +1,162 @@
+"""
+Lazily Created AWS Clients
+
+boto3 is only imported, and clients are only built, the first time a code
+path actually talks to AWS. CORS preflights and rejected requests never do,
+so on a cold start they skip the boto3 import and client construction.
+Clients are cached per container and shared by all later invocations, so
+their connection pools (and kept-alive TLS connections) are reused too.
+
+Every client gets an explicit botocore config instead of the defaults
+(60 s timeouts, legacy retries), tunable through environment variables:
+
+- BOTO_CONNECT_TIMEOUT: seconds to establish a connection (default 2)
+- BOTO_READ_TIMEOUT: seconds to wait for a response (default 5)
+- BOTO_RETRY_MODE: 'adaptive', 'standard' or 'legacy' (default adaptive)
+- BOTO_MAX_ATTEMPTS: total attempts including the first (default 3)
+- BOTO_TCP_KEEPALIVE: 'true' / 'false' (default true)
+- BOTO_MAX_POOL_CONNECTIONS: connection pool size per client (default 10)
+
+Clients whose calls are already retried by the caller (SES, behind the
+RateLimitedSESClient) come from get_single_attempt_client(), so the two
+retry schedules do not multiply.
+
+Calls that must finish within a response budget use get_bounded_client():
+a client whose connect + read timeouts fit the budget and that does not
+retry on its own. Budgets are rounded down to a few tiers, so only a
+handful of such clients are ever built per container.
+"""
+
+import os
+import threading
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Timeout tiers (seconds) for bounded clients
+TIMEOUT_TIERS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+
+# botocore's max_attempts does not count the first request; total_max_attempts does
+SINGLE_ATTEMPT = {'mode': 'standard', 'total_max_attempts': 1}
+
+
+def default_region():
+    # AWS_REGION is automatically provided by Lambda runtime
+    return os.environ.get('AWS_REGION') or os.environ.get('AWS_DEFAULT_REGION') or 'ap-south-1'
+
+
+def client_settings(environ=None):
+    """
+    Read the client tuning settings from the environment.
+    """
+    environ = os.environ if environ is None else environ
+    return {
+        'connect_timeout': float(environ.get('BOTO_CONNECT_TIMEOUT', '2')),
+        'read_timeout': float(environ.get('BOTO_READ_TIMEOUT', '5')),
+        'retries': {
+            'mode': environ.get('BOTO_RETRY_MODE', 'adaptive'),
+            'max_attempts': int(environ.get('BOTO_MAX_ATTEMPTS', '3')),
+        },
+        'tcp_keepalive': environ.get('BOTO_TCP_KEEPALIVE', 'true').lower() == 'true',
+        'max_pool_connections': int(environ.get('BOTO_MAX_POOL_CONNECTIONS', '10')),
+    }
+
+
+def build_client_config(**overrides):
+    """
+    Build a botocore Config from the environment settings, with per-call overrides.
+    """
+    from botocore.config import Config  # deferred with boto3
+
+    settings = client_settings()
+    settings.update(overrides)
+    return Config(**settings)
+
+
+def get_client(service_name, region_name=None, **client_kwargs):
+    """
+    Return a cached boto3 client for the service, creating it on first use.
+    Extra keyword arguments (e.g. endpoint_url) are passed to boto3.client and
+    are part of the cache key.
+    """
+    key = (service_name, region_name or default_region(), tuple(sorted(client_kwargs.items())))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3  # deferred: the import alone is a large share of cold start
+            client_kwargs.setdefault('config', build_client_config())
+            client = boto3.client(service_name, region_name=key[1], **client_kwargs)
+            _clients[key] = client
+    return client
+
+
+def get_single_attempt_client(service_name, region_name=None):
+    """
+    Cached client with the BOTO_* timeouts but no botocore retries, for
+    callers that retry on their own.
+    """
+    key = (service_name, region_name or default_region(), ('single-attempt',))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+
+            client = boto3.client(service_name, region_name=key[1], config=build_client_config(retries=SINGLE_ATTEMPT))
+            _clients[key] = client
+    return client
+
+
+def timeout_tier(timeout, limit=None):
+    """
+    Largest tier not above `timeout` (and `limit`); the smallest tier at worst.
+    """
+    if limit is not None:
+        timeout = min(timeout, limit)
+    fitting = [tier for tier in TIMEOUT_TIERS if tier <= timeout]
+    return fitting[-1] if fitting else TIMEOUT_TIERS[0]
+
+
+def get_bounded_client(service_name, timeout, region_name=None):
+    """
+    Cached client for calls that must complete within `timeout` seconds:
+    connect + read timeouts add up to the timeout tier (never more than the
+    BOTO_* settings) and botocore retries are off, so one call cannot
+    outlive its budget by retrying.
+    """
+    settings = client_settings()
+    tier = timeout_tier(timeout, settings['connect_timeout'] + settings['read_timeout'])
+    key = (service_name, region_name or default_region(), ('bounded', tier))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+
+            connect_timeout = min(settings['connect_timeout'], tier / 4)
+            config = build_client_config(
+                connect_timeout=connect_timeout,
+                read_timeout=tier - connect_timeout,
+                retries=SINGLE_ATTEMPT
+            )
+            client = boto3.client(service_name, region_name=key[1], config=config)
+            _clients[key] = client
+    return client
+
+
+def clear_clients():
+    """
+    Drop cached clients (used by tests).
+    """
+    with _clients_lock:
+        _clients.clear()
@@ -0,0 +1,98 @@
+"""
+Bulk Newsletter Sending via AWS SES SendBulkTemplatedEmail
+
+Recipients are grouped into batches of up to 50 destinations (the SES limit
+per call), so a newsletter issue costs one API round trip per 50 subscribers
+instead of one per subscriber. Every destination gets its own status entry,
+and batches can be sent concurrently through the dispatcher.
+"""
+
+import json
+from itertools import islice
+
+from botocore.exceptions import ClientError
+
+from .dispatcher import dispatch
+
+# SES accepts at most 50 destinations per SendBulkTemplatedEmail call
+MAX_BULK_DESTINATIONS = 50
+
+
+def chunked(iterable, size):
+    """
+    Yield lists of up to `size` items from any iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def build_destination(email, template_data):
+    """
+    Build one SES bulk destination entry with per-recipient template data.
+    """
+    return {
+        'Destination': {'ToAddresses': [email]},
+        'ReplacementTemplateData': json.dumps(template_data),
+    }
+
+
+def send_bulk_templated(ses_client, recipients, template, source, reply_to=None,
+                        default_template_data=None, tags=None,
+                        batch_size=MAX_BULK_DESTINATIONS, concurrency=1):
+    """
+    Send a stored SES template to (email, template_data) pairs in batches,
+    with up to `concurrency` batches in flight at once.
+
+    Returns a list of per-destination results in input order:
+    {'email': ..., 'status': 'Success', 'messageId': ...} or
+    {'email': ..., 'status': <SES status or error code>, 'error': ...}
+    """
+    batch_size = max(1, min(batch_size, MAX_BULK_DESTINATIONS))
+    base_request = {
+        'Source': source,
+        'Template': template,
+        'DefaultTemplateData': json.dumps(default_template_data or {}),
+    }
+    if reply_to:
+        base_request['ReplyToAddresses'] = [reply_to]
+    if tags:
+        base_request['DefaultTags'] = tags
+
+    results = []
+    outcomes = dispatch(
+        lambda batch: send_batch(ses_client, base_request, batch),
+        chunked(recipients, batch_size),
+        concurrency
+    )
+    for batch_results, error in outcomes:
+        if error is not None:
+            raise error
+        results.extend(batch_results)
+    return results
+
+
+def send_batch(ses_client, base_request, batch):
+    """
+    One SendBulkTemplatedEmail call; a failed call yields an error result per destination.
+    """
+    request = dict(base_request, Destinations=[build_destination(email, data) for email, data in batch])
+    try:
+        response = ses_client.send_bulk_templated_email(**request)
+    except ClientError as e:
+        error_code = e.response['Error']['Code']
+        print(f'AWS SES Bulk Error: {error_code} - {str(e)}')
+        return [{'email': email, 'status': error_code, 'error': str(e)} for email, _ in batch]
+
+    results = []
+    for (email, _), status in zip(batch, response.get('Status', [])):
+        result = {'email': email, 'status': status.get('Status', 'Unknown')}
+        if status.get('MessageId'):
+            result['messageId'] = status['MessageId']
+        if status.get('Error'):
+            result['error'] = status['Error']
+        results.append(result)
+    return results
@@ -0,0 +1,334 @@
+"""
+Newsletter Campaign Runner
+
+Sends one newsletter issue to the whole subscriber list, across as many
+invocations as it takes. The list is paged with the store's cursor
+(page(after, limit)); each chunk is checked against the suppression index,
+split by segment and sent with SendBulkTemplatedEmail through the
+rate-limited SES client.
+
+Progress is checkpointed per campaign id around every chunk:
+1. claim: the cursor is advanced past the chunk (in_flight=True)
+2. send the chunk
+3. commit: the chunk's counts are added (in_flight=False)
+A run stops before the Lambda deadline and the next invocation of the same
+campaign continues from the cursor. A send that fails with an exception
+(connection error, timeout) puts the cursor back before the chunk and stops
+the run, so the next run sends the chunk again. A crash between claim and
+commit (the Lambda timing out or running out of memory) loses at most the
+unsent part of one chunk (counted as `interrupted`) instead of resending it.
+Every save is conditional on the checkpoint version, so two overlapping
+invocations of one campaign cannot both send a chunk.
+
+Checkpoint stores:
+- InMemoryCheckpointStore: per-container dict (default, tests)
+- SQLiteCheckpointStore: local file database (CAMPAIGN_DB_PATH)
+- DynamoDBCheckpointStore: DynamoDB table keyed on `campaign_id` (CAMPAIGN_TABLE)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from botocore.exceptions import ClientError
+
+from .aws_clients import get_client
+from .bulk_send import send_bulk_templated
+from .config import FROM_EMAIL, REPLY_TO_EMAIL, SEND_CONCURRENCY
+from .events import display_name_for
+from .unsubscribe import unsubscribe_url_for
+
+CAMPAIGN_CHUNK_SIZE = int(os.environ.get('CAMPAIGN_CHUNK_SIZE', '200'))
+# Stop when less than this is left of the invocation (or twice the slowest chunk so far)
+CAMPAIGN_RESERVE_MS = int(os.environ.get('CAMPAIGN_RESERVE_MS', '10000'))
+
+# The last segment is the campaign's own template, matching every domain (domains=None)
+Campaign = namedtuple('Campaign', ['campaign_id', 'segments'])
+Segment = namedtuple('Segment', ['name', 'template', 'template_data', 'domains'])
+
+
+class CheckpointConflict(Exception):
+    """
+    The checkpoint changed since it was loaded (another invocation runs the campaign).
+    """
+
+
+def new_checkpoint(campaign_id, now=None):
+    return {
+        'campaign_id': campaign_id,
+        'status': 'running',
+        'cursor': None,
+        'exhausted': False,
+        'in_flight': False,
+        'chunks': 0,
+        'sent': 0,
+        'failed': 0,
+        'suppressed': 0,
+        'interrupted': 0,
+        'version': 0,
+        'started_at': int(now if now is not None else time.time()),
+    }
+
+
+class InMemoryCheckpointStore:
+    """
+    Dict-backed checkpoints; lives as long as the warm container.
+    """
+
+    def __init__(self):
+        self._checkpoints = {}
+        self._lock = threading.Lock()
+
+    def load(self, campaign_id):
+        checkpoint = self._checkpoints.get(campaign_id)
+        return dict(checkpoint) if checkpoint else None
+
+    def save(self, checkpoint):
+        """
+        Store `checkpoint` if the stored version is still checkpoint['version'];
+        returns the saved copy with the version incremented.
+        """
+        saved = dict(checkpoint, version=checkpoint['version'] + 1)
+        with self._lock:
+            current = self._checkpoints.get(checkpoint['campaign_id'])
+            if (current['version'] if current else 0) != checkpoint['version']:
+                raise CheckpointConflict(checkpoint['campaign_id'])
+            self._checkpoints[checkpoint['campaign_id']] = saved
+        return dict(saved)
+
+
+class SQLiteCheckpointStore:
+    """
+    SQLite checkpoints; the version check is part of the UPDATE.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS campaign_checkpoints ('
+            'campaign_id TEXT PRIMARY KEY, version INTEGER, state TEXT)'
+        )
+
+    def load(self, campaign_id):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT state FROM campaign_checkpoints WHERE campaign_id = ?', (campaign_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, checkpoint):
+        saved = dict(checkpoint, version=checkpoint['version'] + 1)
+        with self._lock:
+            if checkpoint['version'] == 0:
+                cursor = self._conn.execute(
+                    'INSERT OR IGNORE INTO campaign_checkpoints (campaign_id, version, state) VALUES (?, ?, ?)',
+                    (saved['campaign_id'], saved['version'], json.dumps(saved))
+                )
+            else:
+                cursor = self._conn.execute(
+                    'UPDATE campaign_checkpoints SET version = ?, state = ? WHERE campaign_id = ? AND version = ?',
+                    (saved['version'], json.dumps(saved), saved['campaign_id'], checkpoint['version'])
+                )
+        if cursor.rowcount != 1:
+            raise CheckpointConflict(checkpoint['campaign_id'])
+        return saved
+
+
+class DynamoDBCheckpointStore:
+    """
+    DynamoDB checkpoints (partition key `campaign_id`, string), saved with a
+    conditional PutItem on the version.
+    """
+
+    def __init__(self, table_name, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client('dynamodb')
+        return self._client
+
+    def load(self, campaign_id):
+        item = self.client.get_item(
+            TableName=self.table_name, Key={'campaign_id': {'S': campaign_id}}, ConsistentRead=True
+        ).get('Item')
+        return json.loads(item['state']['S']) if item else None
+
+    def save(self, checkpoint):
+        saved = dict(checkpoint, version=checkpoint['version'] + 1)
+        request = {
+            'TableName': self.table_name,
+            'Item': {
+                'campaign_id': {'S': saved['campaign_id']},
+                'version': {'N': str(saved['version'])},
+                'state': {'S': json.dumps(saved)}
+            }
+        }
+        if checkpoint['version'] == 0:
+            request['ConditionExpression'] = 'attribute_not_exists(campaign_id)'
+        else:
+            request['ConditionExpression'] = 'version = :version'
+            request['ExpressionAttributeValues'] = {':version': {'N': str(checkpoint['version'])}}
+        try:
+            self.client.put_item(**request)
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise CheckpointConflict(checkpoint['campaign_id'])
+            raise
+        return saved
+
+
+def create_checkpoint_store():
+    """
+    Build the checkpoint store configured by environment variables.
+    """
+    table_name = os.environ.get('CAMPAIGN_TABLE', '')
+    db_path = os.environ.get('CAMPAIGN_DB_PATH', '')
+    if table_name:
+        return DynamoDBCheckpointStore(table_name)
+    if db_path:
+        return SQLiteCheckpointStore(db_path)
+    return InMemoryCheckpointStore()
+
+
+def parse_campaign(event):
+    """
+    Campaign from a handler event; raises ValueError for a malformed one.
+    """
+    campaign_id = event.get('campaignId')
+    template = event.get('template')
+    if not campaign_id or not isinstance(campaign_id, str):
+        raise ValueError('campaignId is required')
+    if not template:
+        raise ValueError('template is required')
+    segments = []
+    for segment in event.get('segments') or []:
+        if not segment.get('template') or not segment.get('domains'):
+            raise ValueError('every segment needs a template and domains')
+        segments.append(Segment(
+            name=segment.get('name') or segment['template'],
+            template=segment['template'],
+            template_data=segment.get('templateData') or event.get('templateData') or {},
+            domains=frozenset(domain.lower() for domain in segment['domains'])
+        ))
+    segments.append(Segment('default', template, event.get('templateData') or {}, None))
+    return Campaign(campaign_id, tuple(segments))
+
+
+def segment_index(campaign, clean_email):
+    """
+    Index of the first segment matching the address's domain (the default one at worst).
+    """
+    domain = clean_email.rsplit('@', 1)[-1]
+    for index, segment in enumerate(campaign.segments):
+        if segment.domains is None or domain in segment.domains:
+            return index
+
+
+def recipient_template_data(clean_email, name):
+    """
+    Per-recipient data for the newsletter templates: display name and signed
+    unsubscribe link. Shared by campaigns and the bulk send handler.
+    """
+    return {'name': display_name_for(name, clean_email), 'unsubscribe_url': unsubscribe_url_for(clean_email)}
+
+
+def send_chunk(campaign, records, ses_client, is_suppressed, concurrency=SEND_CONCURRENCY):
+    """
+    Send one page of subscribers, one bulk send per template.
+    Returns (sent, failed, suppressed).
+    """
+    groups = {}
+    suppressed = 0
+    for record in records:
+        clean_email = record['email']
+        if is_suppressed(clean_email):
+            suppressed += 1
+            continue
+        groups.setdefault(segment_index(campaign, clean_email), []).append(
+            (clean_email, recipient_template_data(clean_email, record.get('name')))
+        )
+
+    sent = failed = 0
+    for index, recipients in groups.items():
+        segment = campaign.segments[index]
+        results = send_bulk_templated(
+            ses_client,
+            recipients,
+            template=segment.template,
+            source=FROM_EMAIL,
+            reply_to=REPLY_TO_EMAIL,
+            default_template_data=segment.template_data,
+            tags=[{'Name': 'newsletter', 'Value': 'campaign'}],
+            concurrency=concurrency
+        )
+        for result in results:
+            if result['status'] == 'Success':
+                sent += 1
+            else:
+                failed += 1
+                print(f"Campaign send failed: {result['status']} - {result.get('error', '')}")
+    return sent, failed, suppressed
+
+
+def run_campaign(campaign, store, checkpoints, ses_client, is_suppressed=lambda email: False,
+                 remaining_ms=None, chunk_size=CAMPAIGN_CHUNK_SIZE, reserve_ms=CAMPAIGN_RESERVE_MS,
+                 concurrency=SEND_CONCURRENCY):
+    """
+    Send the campaign from its last checkpoint until the list is exhausted or
+    the invocation runs low on time (`remaining_ms` is a zero-argument callable,
+    e.g. context.get_remaining_time_in_millis). Returns the latest checkpoint;
+    its status is 'complete' once every subscriber has been handled.
+    """
+    checkpoint = checkpoints.load(campaign.campaign_id)
+    if checkpoint is None:
+        checkpoint = checkpoints.save(new_checkpoint(campaign.campaign_id))
+    if checkpoint['status'] == 'complete':
+        return checkpoint
+    if checkpoint['in_flight']:
+        # The previous run stopped mid-chunk; its cursor is already past that chunk
+        print(f"Campaign {campaign.campaign_id}: previous chunk was interrupted, not resending it")
+        checkpoint = checkpoints.save(dict(
+            checkpoint, in_flight=False, interrupted=checkpoint['interrupted'] + 1,
+            status='complete' if checkpoint['exhausted'] else 'running'
+        ))
+
+    slowest_ms = 0
+    while checkpoint['status'] != 'complete':
+        if remaining_ms is not None and remaining_ms() < max(reserve_ms, 2 * slowest_ms):
+            print(f"Campaign {campaign.campaign_id}: pausing before the deadline after {checkpoint['chunks']} chunks")
+            break
+        started = time.perf_counter()
+
+        records, next_cursor = store.page(checkpoint['cursor'], chunk_size)
+        chunk_start = checkpoint['cursor']
+        checkpoint = checkpoints.save(dict(
+            checkpoint, cursor=next_cursor, exhausted=next_cursor is None, in_flight=True
+        ))
+
+        try:
+            sent, failed, suppressed = send_chunk(campaign, records, ses_client, is_suppressed, concurrency)
+        except Exception as e:
+            # The send failed but the process lives on: release the chunk for the next run
+            print(f"Campaign {campaign.campaign_id}: chunk failed, it will be sent again: {str(e)}")
+            checkpoints.save(dict(checkpoint, cursor=chunk_start, exhausted=False, in_flight=False))
+            raise
+        checkpoint = checkpoints.save(dict(
+            checkpoint,
+            in_flight=False,
+            chunks=checkpoint['chunks'] + 1,
+            sent=checkpoint['sent'] + sent,
+            failed=checkpoint['failed'] + failed,
+            suppressed=checkpoint['suppressed'] + suppressed,
+            status='complete' if checkpoint['exhausted'] else 'running'
+        ))
+        slowest_ms = max(slowest_ms, (time.perf_counter() - started) * 1000)
+
+    return checkpoint
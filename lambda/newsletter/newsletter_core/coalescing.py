@@ -0,0 +1,269 @@
+"""
+Duplicate Request Coalescing (Single Flight)
+
+A double-submitted form or a quick client retry sends the same signup twice
+within milliseconds. Without coalescing, both requests validate, render and
+call SES (or both fail over to "already subscribed" before the first send
+has finished). SingleFlight runs one call per key at a time and hands its
+outcome to every duplicate that arrives while it is in flight.
+
+Two tiers, as in the abuse limiter:
+- In-container: duplicates on other threads of the same warm container wait
+  for the leader's result (or exception) on a lock, without any I/O.
+- Shared store (optional), for duplicates that land on other containers:
+  SQLiteFlightStore (COALESCE_DB_PATH, local runs) or DynamoDBFlightStore
+  (COALESCE_TABLE). The leader claims a short-lived lock item per key and
+  writes its outcome into it; duplicates poll the item for up to
+  COALESCE_WAIT_MS. The lock expires after COALESCE_LOCK_SECONDS, so a
+  crashed leader only blocks its key that long.
+
+Outcomes shared through a store must be JSON-serializable. A shared store
+that fails is logged and skipped (the call runs uncoalesced).
+
+Stores expose:
+- claim(key, owner, expires_at, now) -> True if the caller now holds the key
+- lookup(key, now) -> (held, outcome): held is False once the lock is gone
+- complete(key, owner, outcome, expires_at): publish the leader's outcome
+- release(key, owner): drop the lock so the next request runs again
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+from .aws_clients import get_client
+
+COALESCE_LOCK_SECONDS = float(os.environ.get('COALESCE_LOCK_SECONDS', '10'))
+COALESCE_WAIT_MS = int(os.environ.get('COALESCE_WAIT_MS', '3000'))
+
+
+class _Call:
+    """
+    One in-flight call. The leader holds `done` until the outcome is set;
+    duplicates wait by acquiring it (lighter than an Event per request).
+    """
+
+    __slots__ = ('done', 'outcome', 'error')
+
+    def __init__(self):
+        self.done = threading.Lock()
+        self.done.acquire()
+        self.outcome = None
+        self.error = None
+
+
+class SQLiteFlightStore:
+    """
+    Flight locks in a SQLite file shared by every process using it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS flights ('
+            'key TEXT PRIMARY KEY, owner TEXT, expires_at REAL, outcome TEXT)'
+        )
+
+    def claim(self, key, owner, expires_at, now):
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO flights (key, owner, expires_at, outcome) VALUES (?, ?, ?, NULL) '
+                'ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at, '
+                'outcome = NULL WHERE flights.expires_at < ?',
+                (key, owner, expires_at, now)
+            )
+        return cursor.rowcount == 1
+
+    def lookup(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT outcome FROM flights WHERE key = ? AND expires_at >= ?', (key, now)
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, (json.loads(row[0]) if row[0] is not None else None)
+
+    def complete(self, key, owner, outcome, expires_at):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE flights SET outcome = ?, expires_at = ? WHERE key = ? AND owner = ?',
+                (json.dumps(outcome), expires_at, key, owner)
+            )
+
+    def release(self, key, owner):
+        with self._lock:
+            self._conn.execute('DELETE FROM flights WHERE key = ? AND owner = ?', (key, owner))
+
+
+class DynamoDBFlightStore:
+    """
+    Flight locks in DynamoDB: one item per key (partition key `pk`, string),
+    claimed with a conditional PutItem and expired via TTL on `expires_at`.
+    """
+
+    def __init__(self, table_name, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client('dynamodb')
+        return self._client
+
+    def claim(self, key, owner, expires_at, now):
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={'pk': {'S': key}, 'owner': {'S': owner}, 'expires_at': {'N': str(int(expires_at) + 1)}},
+                ConditionExpression='attribute_not_exists(pk) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(int(now))}}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def lookup(self, key, now):
+        item = self.client.get_item(
+            TableName=self.table_name, Key={'pk': {'S': key}}, ConsistentRead=True
+        ).get('Item')
+        # TTL deletion is lazy, so expired items can still be returned
+        if item is None or int(item['expires_at']['N']) < now:
+            return False, None
+        return True, (json.loads(item['outcome']['S']) if 'outcome' in item else None)
+
+    def complete(self, key, owner, outcome, expires_at):
+        self._conditional(
+            'update_item',
+            UpdateExpression='SET outcome = :outcome, expires_at = :expires',
+            ExpressionAttributeValues={
+                ':outcome': {'S': json.dumps(outcome)},
+                ':expires': {'N': str(int(expires_at) + 1)},
+                ':owner': {'S': owner}
+            },
+            Key={'pk': {'S': key}}
+        )
+
+    def release(self, key, owner):
+        self._conditional('delete_item', ExpressionAttributeValues={':owner': {'S': owner}}, Key={'pk': {'S': key}})
+
+    def _conditional(self, operation, **request):
+        # Only the owner may touch the item; someone else's lock is left alone.
+        # OWNER is a DynamoDB reserved word, so it needs a name placeholder.
+        try:
+            getattr(self.client, operation)(
+                TableName=self.table_name,
+                ConditionExpression='#owner = :owner',
+                ExpressionAttributeNames={'#owner': 'owner'},
+                **request
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+
+class SingleFlight:
+    """
+    Run func(*args) once per key at a time; duplicates that arrive meanwhile get
+    the same outcome. do() returns (outcome, shared) where `shared` is True for
+    a duplicate. The outcome is None when a duplicate on another container was
+    still in flight after `wait_seconds`.
+    """
+
+    def __init__(self, shared=None, lock_seconds=COALESCE_LOCK_SECONDS, wait_seconds=COALESCE_WAIT_MS / 1000.0,
+                 poll_seconds=0.1, clock=time.time, sleep=time.sleep):
+        self.shared = shared
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, keep=lambda outcome: True):
+        """
+        `keep(outcome)` decides whether duplicates arriving on other containers
+        until the lock expires still get this outcome; when False the lock is
+        released as soon as the call is done (e.g. failures a retry should redo).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            with call.done:
+                pass
+            if call.error is not None:
+                raise call.error
+            return call.outcome, True
+
+        try:
+            call.outcome, shared = self._run(key, func, args, keep)
+            return call.outcome, shared
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.release()
+
+    def _run(self, key, func, args, keep):
+        if self.shared is None:
+            return func(*args), False
+        owner = uuid.uuid4().hex
+        deadline = self._clock() + self.wait_seconds
+        try:
+            while not self.shared.claim(key, owner, self._clock() + self.lock_seconds, self._clock()):
+                held, outcome = self.shared.lookup(key, self._clock())
+                if outcome is not None:
+                    return outcome, True
+                if held and self._clock() >= deadline:
+                    return None, True
+                if held:
+                    self._sleep(self.poll_seconds)
+        except Exception as e:
+            print(f'Coalescing store error: {str(e)}')
+            return func(*args), False
+
+        try:
+            outcome = func(*args)
+        except Exception:
+            self._finish(self.shared.release, key, owner)
+            raise
+        if keep(outcome):
+            self._finish(self.shared.complete, key, owner, outcome, self._clock() + self.lock_seconds)
+        else:
+            self._finish(self.shared.release, key, owner)
+        return outcome, False
+
+    def _finish(self, operation, *args):
+        try:
+            operation(*args)
+        except Exception as e:
+            print(f'Coalescing store error: {str(e)}')
+
+
+def create_single_flight():
+    """
+    Build the single-flight group configured by environment variables.
+    """
+    table_name = os.environ.get('COALESCE_TABLE', '')
+    db_path = os.environ.get('COALESCE_DB_PATH', '')
+    if table_name:
+        return SingleFlight(DynamoDBFlightStore(table_name))
+    if db_path:
+        return SingleFlight(SQLiteFlightStore(db_path))
+    return SingleFlight()
@@ -0,0 +1,58 @@
+"""
+Newsletter Handler Configuration
+
+All settings can be overridden via Lambda environment variables.
+"""
+
+import os
+
+FROM_EMAIL = os.environ.get('FROM_EMAIL', 'newsletter@tranquilmindquest.com')
+REPLY_TO_EMAIL = os.environ.get('REPLY_TO_EMAIL', 'contact@tranquilmindquest.com')
+NEWSLETTER_TEMPLATE = os.environ.get('NEWSLETTER_TEMPLATE', 'tranquilmindquest-newsletter')
+
+# Double opt-in: send a signed confirm link first, record + welcome only on confirmation.
+# CONFIRM_TOKEN_SECRET may list several comma-separated secrets (the first one signs),
+# so a secret can be rotated without invalidating links already sent.
+CONFIRM_SUBSCRIPTIONS = os.environ.get('CONFIRM_SUBSCRIPTIONS', 'false').lower() == 'true'
+CONFIRM_TOKEN_SECRETS = [
+    secret.strip().encode('utf-8')
+    for secret in os.environ.get('CONFIRM_TOKEN_SECRET', '').split(',')
+    if secret.strip()
+]
+CONFIRM_TOKEN_TTL_SECONDS = int(os.environ.get('CONFIRM_TOKEN_TTL_SECONDS', str(48 * 3600)))
+CONFIRM_URL = os.environ.get('CONFIRM_URL', '')
+CONFIRM_REDIRECT_URL = os.environ.get('CONFIRM_REDIRECT_URL', '')
+
+# One-click unsubscribe (RFC 8058): UNSUBSCRIBE_URL is the public URL of the
+# /unsubscribe route. Links are signed with UNSUBSCRIBE_TOKEN_SECRET (comma-separated
+# for rotation, like CONFIRM_TOKEN_SECRET, which is used when it is not set).
+UNSUBSCRIBE_URL = os.environ.get('UNSUBSCRIBE_URL', '')
+UNSUBSCRIBE_TOKEN_SECRETS = [
+    secret.strip().encode('utf-8')
+    for secret in (os.environ.get('UNSUBSCRIBE_TOKEN_SECRET', '') or os.environ.get('CONFIRM_TOKEN_SECRET', '')).split(',')
+    if secret.strip()
+]
+# Footer link used when one-click unsubscribe is not configured
+DEFAULT_UNSUBSCRIBE_URL = 'https://tranquilmindquest.com/unsubscribe'
+
+# Batch requests ({"subscriptions": [...]}): size limit and parallel SES sends
+MAX_BATCH_SUBSCRIPTIONS = int(os.environ.get('MAX_BATCH_SUBSCRIPTIONS', '50'))
+SEND_CONCURRENCY = int(os.environ.get('SEND_CONCURRENCY', '8'))
+
+# CORS Configuration - Support multiple origins for security
+# Default to production domain, but allow override via environment variable.
+# ALLOWED_ORIGIN (single value, used by the older handler) is still honored.
+DEFAULT_ALLOWED_ORIGINS = ['https://tranquilmindquest.com', 'https://www.tranquilmindquest.com']
+
+
+def parse_allowed_origins(value):
+    """
+    Split a comma-separated origin list, dropping blanks.
+    """
+    return [origin.strip() for origin in value.split(',') if origin.strip()]
+
+
+ALLOWED_ORIGINS = (
+    parse_allowed_origins(os.environ.get('ALLOWED_ORIGINS', '') or os.environ.get('ALLOWED_ORIGIN', ''))
+    or DEFAULT_ALLOWED_ORIGINS
+)
@@ -0,0 +1,121 @@
+"""
+Double Opt-In Confirmation
+
+With CONFIRM_SUBSCRIPTIONS=true a signup only gets a confirmation email.
+Its link carries a stateless token (see tokens.py) signing
+(email, name, expires_at, locale); the locale of the signup request picks
+the language of the welcome email. Tokens issued before the locale was
+added carry only the first three.
+
+The confirm route (GET ?token=...) checks the signature and expiry in
+memory, with no database read, and only a valid token records the
+subscriber and sends the welcome email. Tokens cannot be forged without the
+secret and stop working after CONFIRM_TOKEN_TTL_SECONDS.
+"""
+
+import time
+from urllib.parse import quote
+
+from .config import (
+    CONFIRM_REDIRECT_URL,
+    CONFIRM_SUBSCRIPTIONS,
+    CONFIRM_TOKEN_SECRETS,
+    CONFIRM_TOKEN_TTL_SECONDS,
+    CONFIRM_URL,
+)
+from .events import raw_response
+from .tokens import sign_claims, verify_claims
+
+HTML_HEADERS = {'Content-Type': 'text/html; charset=utf-8', 'Cache-Control': 'no-store'}
+
+TOKEN_PURPOSE = 'confirm'
+
+
+def create_token(clean_email, display_name, secret=None, ttl_seconds=None, now=None, locale=None):
+    """
+    Sign (email, name, expiry[, locale]) into a URL-safe token.
+    """
+    secret = secret if secret is not None else CONFIRM_TOKEN_SECRETS[0]
+    ttl_seconds = ttl_seconds if ttl_seconds is not None else CONFIRM_TOKEN_TTL_SECONDS
+    expires_at = int((now if now is not None else time.time()) + ttl_seconds)
+    claims = [clean_email, display_name, expires_at]
+    if locale is not None:
+        claims.append(locale)
+    return sign_claims(TOKEN_PURPOSE, claims, secret)
+
+
+def verify_token(token, secrets=None, now=None):
+    """
+    Return (clean_email, display_name) for a valid, unexpired token, otherwise None.
+    """
+    claims = verify_localized_token(token, secrets, now)
+    return claims[:2] if claims is not None else None
+
+
+def verify_localized_token(token, secrets=None, now=None):
+    """
+    Return (clean_email, display_name, locale) for a valid, unexpired token,
+    otherwise None; the locale is None for tokens signed without one.
+    """
+    secrets = secrets if secrets is not None else CONFIRM_TOKEN_SECRETS
+    claims = verify_claims(TOKEN_PURPOSE, token, secrets)
+    if claims is None or len(claims) not in (3, 4):
+        return None
+    clean_email, display_name, expires_at = claims[:3]
+    if expires_at < (now if now is not None else time.time()):
+        return None
+    return clean_email, display_name, claims[3] if len(claims) == 4 else None
+
+
+def confirmation_enabled():
+    """
+    Double opt-in needs both a signing secret and the public confirm URL.
+    """
+    if CONFIRM_SUBSCRIPTIONS and not (CONFIRM_TOKEN_SECRETS and CONFIRM_URL):
+        print('CONFIRM_SUBSCRIPTIONS needs CONFIRM_TOKEN_SECRET and CONFIRM_URL; sending welcome emails directly')
+        return False
+    return CONFIRM_SUBSCRIPTIONS
+
+
+def confirm_url_for(clean_email, display_name, now=None, locale=None):
+    separator = '&' if '?' in CONFIRM_URL else '?'
+    token = create_token(clean_email, display_name, now=now, locale=locale)
+    return f'{CONFIRM_URL}{separator}token={quote(token)}'
+
+
+def html_page(title, message, extra=''):
+    """
+    Minimal standalone page for routes opened from an email client;
+    `extra` is inserted as-is after the message (e.g. a form).
+    """
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
+        f'<title>{title}</title></head>'
+        '<body style="font-family: -apple-system, BlinkMacSystemFont, \'Segoe UI\', Roboto, Arial, sans-serif; '
+        'text-align: center; padding: 60px 20px; color: #333333;">'
+        f'<h1>{title}</h1><p>{message}</p>{extra}'
+        '<p><a href="https://tranquilmindquest.com">Back to TranquilMindQuest</a></p></body></html>'
+    )
+
+
+# Result pages of the confirm route, built once
+PAGES = {
+    'confirmed': (200, html_page('Subscription confirmed 🧘', 'Thank you! Your welcome email is on its way.')),
+    'already': (200, html_page('Already confirmed', "You're already subscribed. Thank you for being part of our community.")),
+    'invalid': (400, html_page('Link expired or invalid', 'Please sign up again to get a new confirmation link.')),
+    'suppressed': (400, html_page('Address not deliverable', 'Emails to this address bounced or were reported as spam, so we no longer send to it.')),
+    'error': (500, html_page('Something went wrong', 'We could not confirm your subscription. Please try the link again later.')),
+}
+
+
+def confirmation_response(outcome):
+    """
+    Result of the confirm route: a redirect to CONFIRM_REDIRECT_URL?status=<outcome>
+    when configured, otherwise a small HTML page.
+    """
+    status_code, page = PAGES[outcome]
+    if CONFIRM_REDIRECT_URL:
+        separator = '&' if '?' in CONFIRM_REDIRECT_URL else '?'
+        return raw_response(302, {'Location': f'{CONFIRM_REDIRECT_URL}{separator}status={outcome}'}, '')
+    return raw_response(status_code, HTML_HEADERS, page)
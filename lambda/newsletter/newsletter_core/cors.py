@@ -0,0 +1,77 @@
+"""
+CORS Handling
+
+The allowed origins are turned into a frozenset at import time, and the
+CORS header mapping for every allowed origin (plus one for denied origins)
+is built once, so a request costs one set lookup and no dict construction.
+A '*' entry allows any origin.
+"""
+
+from .config import ALLOWED_ORIGINS
+
+CORS_ALLOW_HEADERS = 'Content-Type,Authorization'
+CORS_ALLOW_METHODS = 'OPTIONS,POST,GET'
+
+
+class FrozenHeaders(dict):
+    """
+    Read-only header dict. Still a dict, so the Lambda runtime can serialize it,
+    but shared instances cannot be modified by one request and leak into the next.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('CORS header mappings are shared and read-only; copy with dict(headers)')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __ior__(self, other):
+        self._readonly()
+
+    def __reduce__(self):
+        # copy / deepcopy / pickle produce a plain, mutable dict
+        return (dict, (dict(self),))
+
+
+def cors_headers(allowed_origin):
+    """
+    CORS headers - Allow-Origin is only set if the origin is allowed.
+    """
+    headers = {
+        'Access-Control-Allow-Headers': CORS_ALLOW_HEADERS,
+        'Access-Control-Allow-Methods': CORS_ALLOW_METHODS
+    }
+    if allowed_origin:
+        headers['Access-Control-Allow-Origin'] = allowed_origin
+    return FrozenHeaders(headers)
+
+
+ALLOWED_ORIGIN_SET = frozenset(ALLOWED_ORIGINS)
+ALLOW_ANY_ORIGIN = '*' in ALLOWED_ORIGIN_SET or not ALLOWED_ORIGIN_SET
+
+# Prebuilt header mappings: one per allowed origin, one for '*', one for denied
+CORS_HEADERS_BY_ORIGIN = {
+    origin: cors_headers(origin) for origin in ALLOWED_ORIGIN_SET if origin != '*'
+}
+WILDCARD_CORS_HEADERS = cors_headers('*')
+DENIED_CORS_HEADERS = cors_headers(None)
+
+
+def get_origin(event):
+    """
+    Read the Origin header (API Gateway may pass it in either case).
+    """
+    request_headers = event.get('headers') or {}
+    return request_headers.get('origin') or request_headers.get('Origin', '')
+
+
+def lookup_cors(origin):
+    """
+    Return (allowed_origin, headers) for a request origin; allowed_origin is None if denied.
+    """
+    headers = CORS_HEADERS_BY_ORIGIN.get(origin)
+    if headers is not None:
+        return origin, headers
+    if ALLOW_ANY_ORIGIN:
+        return '*', WILDCARD_CORS_HEADERS
+    return None, DENIED_CORS_HEADERS
@@ -0,0 +1,85 @@
+"""
+Response-Time Budget (Deadline Propagation)
+
+A signup that is still waiting on SES when the Lambda times out never
+answers; API Gateway turns that into an opaque 502. lambda_handler instead
+derives a Deadline from context.get_remaining_time_in_millis() at the start
+of the invocation (deadline_from_context):
+
+    budget = min(remaining - BUDGET_RESERVE_MS, RESPONSE_BUDGET_MS)
+
+The reserve is kept back for queueing the signup and building the response.
+Each phase asks the deadline what is left: the SES send is only started
+with at least SES_MIN_BUDGET_MS remaining, and then runs on a client whose
+connect/read timeouts fit the rest of the budget (aws_clients.get_bounded_client).
+When the budget runs out, the handler defers the send to the queue and answers
+202 (see SEND_QUEUE_MODE) instead of failing.
+
+Invocations without a Lambda context (tests, benchmarks, local runs) get
+UNBOUNDED, which never expires.
+"""
+
+import os
+import time
+
+BUDGET_RESERVE_MS = int(os.environ.get('BUDGET_RESERVE_MS', '500'))
+# Kept below API Gateway's 29 s integration timeout; 0 means only the Lambda deadline counts
+RESPONSE_BUDGET_MS = int(os.environ.get('RESPONSE_BUDGET_MS', '25000'))
+SES_MIN_BUDGET_MS = int(os.environ.get('SES_MIN_BUDGET_MS', '300'))
+
+
+class DeadlineExceeded(Exception):
+    """
+    Too little of the response budget is left to start a phase.
+    """
+
+
+class Deadline:
+    """
+    Monotonic point in time by which the response must be built.
+    A deadline without a budget never expires.
+    """
+
+    __slots__ = ('expires_at', '_clock')
+
+    def __init__(self, budget_ms=None, clock=time.monotonic):
+        self._clock = clock
+        self.expires_at = None if budget_ms is None else clock() + max(0, budget_ms) / 1000.0
+
+    @property
+    def bounded(self):
+        return self.expires_at is not None
+
+    def remaining_ms(self):
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, (self.expires_at - self._clock()) * 1000.0)
+
+    def call_timeout(self, phase, min_ms):
+        """
+        Seconds a network call of `phase` may take (None when unbounded).
+        Raises DeadlineExceeded when less than `min_ms` is left.
+        """
+        if self.expires_at is None:
+            return None
+        remaining_ms = self.remaining_ms()
+        if remaining_ms < min_ms:
+            raise DeadlineExceeded(f'{phase}: {remaining_ms:.0f} ms left, {min_ms} ms needed')
+        return remaining_ms / 1000.0
+
+
+UNBOUNDED = Deadline()
+
+
+def deadline_from_context(context, reserve_ms=BUDGET_RESERVE_MS, cap_ms=RESPONSE_BUDGET_MS, clock=time.monotonic):
+    """
+    Deadline for an invocation: the Lambda's remaining time less the reserve,
+    capped at `cap_ms` (0 for no cap). UNBOUNDED without a Lambda context.
+    """
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if get_remaining is None:
+        return UNBOUNDED
+    budget_ms = get_remaining() - reserve_ms
+    if cap_ms > 0:
+        budget_ms = min(budget_ms, cap_ms)
+    return Deadline(budget_ms, clock)
@@ -0,0 +1,75 @@
+"""
+Parallel Send Dispatcher
+
+SES calls are network-bound, so sending to many recipients one call after
+another spends most of the invocation waiting on round trips. dispatch()
+runs a send function over many items on a bounded thread pool while all
+workers share one client. The RateLimitedSESClient token bucket is
+thread-safe, so the account's max send rate still holds across workers.
+
+Each item gets a (result, error) pair, so one failed recipient never
+aborts the rest. One thread pool of SEND_CONCURRENCY workers is kept per
+container and reused by warm invocations; a call asking for less
+concurrency keeps at most that many of its items in flight.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import SEND_CONCURRENCY
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the container-wide thread pool (SEND_CONCURRENCY workers).
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=SEND_CONCURRENCY, thread_name_prefix='send')
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def _call(func, item):
+    try:
+        return func(item), None
+    except Exception as e:
+        return None, e
+
+
+def dispatch(func, items, concurrency=SEND_CONCURRENCY):
+    """
+    Call func(item) for every item with at most `concurrency` calls in flight
+    (never more than SEND_CONCURRENCY). Returns a list of (result, error)
+    pairs in input order; error is the exception raised for that item,
+    otherwise None.
+    """
+    items = list(items)
+    concurrency = max(1, min(concurrency, len(items), SEND_CONCURRENCY))
+    if concurrency == 1:
+        return [_call(func, item) for item in items]
+    executor = get_executor()
+    if concurrency == SEND_CONCURRENCY:
+        return list(executor.map(lambda item: _call(func, item), items))
+
+    # Fewer slots than workers: submit the next item only when one of ours finishes
+    slots = threading.BoundedSemaphore(concurrency)
+    futures = []
+    for item in items:
+        slots.acquire()
+        future = executor.submit(_call, func, item)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return [future.result() for future in futures]
@@ -0,0 +1,109 @@
+"""
+Welcome Email Templates for the Newsletter Lambda Function
+
+The HTML and plain text bodies are files in templates/, compiled once per
+container by the template registry (template_registry.py) into static
+segments and named slots, so a render only splices the display name and
+year into pre-built strings instead of re-evaluating the whole template.
+Each email exists per locale; select_locale() picks one from a request's
+Accept-Language header.
+
+Fully rendered bodies are kept in a bounded LRU cache keyed by
+(display_name, year, locale). The display name is HTML-escaped here, in one
+place, before it reaches the HTML body.
+
+The double opt-in confirmation email is compiled the same way but rendered
+without the cache, since each one carries a unique confirm link.
+"""
+
+import html
+import os
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+from .config import DEFAULT_UNSUBSCRIBE_URL
+from .template_registry import DEFAULT_LOCALE, TEMPLATE_DIR, TemplateRegistry
+
+# Configuration - can be overridden via environment variables
+TEMPLATE_CACHE_SIZE = int(os.environ.get('TEMPLATE_CACHE_SIZE', '256'))
+
+RenderedEmail = namedtuple('RenderedEmail', ['subject', 'html', 'text'])
+
+# Compiled on first use per (name, locale) and kept for the life of the container
+templates = TemplateRegistry(TEMPLATE_DIR)
+
+
+def welcome_template(locale=DEFAULT_LOCALE):
+    """
+    The compiled Variant(subject, html, text) of the welcome email for a locale.
+    """
+    return templates.variant('welcome', locale)
+
+
+def select_locale(accept_language):
+    """
+    The welcome/confirmation locale for a request's Accept-Language header.
+    """
+    return templates.select_locale('welcome', accept_language)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _render_cached(display_name, year, locale):
+    subject, html_template, text_template = welcome_template(locale)
+    year = str(year)
+    return RenderedEmail(
+        subject=subject,
+        html=html_template.render({
+            'name': html.escape(display_name), 'year': year, 'unsubscribe_url': DEFAULT_UNSUBSCRIBE_URL
+        }),
+        text=text_template.render({'name': display_name, 'year': year, 'unsubscribe_url': DEFAULT_UNSUBSCRIBE_URL}),
+    )
+
+
+def render_welcome_email(display_name, year=None, locale=DEFAULT_LOCALE):
+    """
+    Render the welcome email for a subscriber (with the static footer unsubscribe link).
+    Returns a RenderedEmail(subject, html, text); repeat calls are served from the LRU cache.
+    """
+    if year is None:
+        year = datetime.now().year
+    return _render_cached(display_name, year, locale)
+
+
+def render_confirmation_email(display_name, confirm_url, year=None, locale=DEFAULT_LOCALE):
+    """
+    Render the double opt-in email. Not cached: every confirm URL carries its own token.
+    """
+    subject, html_template, text_template = templates.variant('confirm', locale)
+    year = str(year if year is not None else datetime.now().year)
+    return RenderedEmail(
+        subject=subject,
+        html=html_template.render({
+            'name': html.escape(display_name), 'confirm_url': html.escape(confirm_url), 'year': year
+        }),
+        text=text_template.render({'name': display_name, 'confirm_url': confirm_url, 'year': year}),
+    )
+
+
+def ses_template_content(locale=DEFAULT_LOCALE):
+    """
+    The welcome email as an SES stored template (Handlebars placeholders).
+    SES escapes {{name}} in the HTML part; the text part uses triple braces to stay unescaped.
+    """
+    subject, html_template, text_template = welcome_template(locale)
+    return {
+        'Subject': subject,
+        'Html': html_template.render({'name': '{{name}}', 'year': '{{year}}', 'unsubscribe_url': '{{unsubscribe_url}}'}),
+        'Text': text_template.render({
+            'name': '{{{name}}}', 'year': '{{year}}', 'unsubscribe_url': '{{{unsubscribe_url}}}'
+        }),
+    }
+
+
+def clear_render_cache():
+    """
+    Drop all cached renders and compiled templates (used by tests and after template changes).
+    """
+    _render_cached.cache_clear()
+    templates.clear()
@@ -0,0 +1,111 @@
+"""
+API Gateway Event Parsing and Responses
+
+Bodies of the fixed error and status responses are serialized once at
+import time instead of calling json.dumps on constant payloads per request.
+"""
+
+import json
+from functools import lru_cache
+
+# Fixed user-facing messages
+ORIGIN_NOT_ALLOWED = 'Origin not allowed'
+INVALID_EMAIL_FORMAT = 'Invalid email address format'
+PROCESSING_FAILED = 'Failed to process subscription. Please try again later.'
+ALREADY_SUBSCRIBED = "You're already subscribed! Thank you for being part of our community."
+SUBSCRIPTION_RECEIVED = 'Subscription received! Please check your email shortly.'
+SUBSCRIPTION_CONFIRMED = 'Subscription confirmed! Please check your email for confirmation.'
+ADDRESS_SUPPRESSED = "We can't deliver email to this address. Please use a different one."
+CONFIRMATION_SENT = 'Almost there! Please check your email and click the link to confirm your subscription.'
+TOO_MANY_REQUESTS = 'Too many requests. Please try again in a minute.'
+SERVICE_BUSY = 'Service is busy right now. Please try again in a moment.'
+INVALID_BATCH = 'subscriptions must be a non-empty list'
+BATCH_TOO_LARGE = 'Too many subscriptions in one request'
+
+
+def parse_body(event):
+    """
+    Return the request body as a dict (API Gateway proxy events carry it as a JSON string).
+    """
+    body = event.get('body')
+    if isinstance(body, str):
+        return json.loads(body)
+    return body or {}
+
+
+def get_source_ip(event):
+    """
+    Client IP from the API Gateway request context (REST or HTTP API); '' if absent.
+    """
+    context = event.get('requestContext') or {}
+    return (
+        (context.get('identity') or {}).get('sourceIp')
+        or (context.get('http') or {}).get('sourceIp')
+        or ''
+    )
+
+
+def get_accept_language(event):
+    """
+    The Accept-Language header (either case, as with Origin); '' if absent.
+    """
+    request_headers = event.get('headers') or {}
+    return request_headers.get('accept-language') or request_headers.get('Accept-Language', '')
+
+
+def display_name_for(name, clean_email):
+    """
+    Use the submitted name, or the mailbox part of the address when none was given.
+    """
+    if name and isinstance(name, str) and name.strip():
+        return name.strip()
+    return clean_email.split('@')[0]
+
+
+def raw_response(status_code, headers, body):
+    """
+    Build an API Gateway proxy response from an already serialized body.
+    """
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': body
+    }
+
+
+def json_response(status_code, headers, payload=None):
+    """
+    Build an API Gateway proxy response; an empty body when payload is None.
+    """
+    return raw_response(status_code, headers, '' if payload is None else json.dumps(payload))
+
+
+@lru_cache(maxsize=64)
+def error_body(message):
+    """
+    Serialized error payload; error messages come from a small fixed set, so they are cached.
+    """
+    return json.dumps({'success': False, 'error': message})
+
+
+@lru_cache(maxsize=16)
+def message_body(message):
+    """
+    Serialized success payload without per-request fields.
+    """
+    return json.dumps({'success': True, 'message': message})
+
+
+def error_response(status_code, headers, message):
+    return raw_response(status_code, headers, error_body(message))
+
+
+def message_response(status_code, headers, message):
+    return raw_response(status_code, headers, message_body(message))
+
+
+# Serialize the fixed responses at import time
+for _message in (ORIGIN_NOT_ALLOWED, INVALID_EMAIL_FORMAT, PROCESSING_FAILED, ADDRESS_SUPPRESSED, TOO_MANY_REQUESTS):
+    error_body(_message)
+for _message in (ALREADY_SUBSCRIBED, SUBSCRIPTION_RECEIVED, CONFIRMATION_SENT):
+    message_body(_message)
@@ -0,0 +1,1070 @@
+"""
+Newsletter Lambda Handlers
+
+- lambda_handler: API Gateway subscription endpoint (single or batched signups,
+  the GET confirm route of the double opt-in flow and the /unsubscribe route)
+- send_queue_consumer_handler: sends queued welcome emails
+- bulk_send_handler: newsletter dispatch in SES bulk batches
+- campaign_handler: checkpointed newsletter campaign over the whole subscriber list
+- import_handler: streaming subscriber import from a CSV/JSONL object in S3
+- feedback_handler: SES bounce/complaint notifications -> suppression index
+- snapshot_handler: rebuilds the Bloom filter snapshot used by the signup prefilter
+"""
+
+import json
+import os
+
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
+
+from . import sending
+from .abuse_limiter import create_limiters
+from .address_index import create_subscriber_prefilter, rebuild_snapshot
+from .bulk_send import send_bulk_templated
+from .campaigns import (
+    CheckpointConflict,
+    create_checkpoint_store,
+    parse_campaign,
+    recipient_template_data,
+    run_campaign,
+)
+from .coalescing import create_single_flight
+from .config import FROM_EMAIL, MAX_BATCH_SUBSCRIPTIONS, NEWSLETTER_TEMPLATE, REPLY_TO_EMAIL, SEND_CONCURRENCY
+from .confirmation import confirm_url_for, confirmation_enabled, confirmation_response, verify_localized_token
+from .cors import get_origin, lookup_cors
+from .deadline import SES_MIN_BUDGET_MS, UNBOUNDED, DeadlineExceeded, deadline_from_context
+from .dispatcher import dispatch
+from .email_templates import DEFAULT_LOCALE, render_welcome_email, select_locale
+from .email_validation import validate_email, validate_many
+from .events import (
+    ADDRESS_SUPPRESSED,
+    ALREADY_SUBSCRIBED,
+    BATCH_TOO_LARGE,
+    CONFIRMATION_SENT,
+    INVALID_BATCH,
+    INVALID_EMAIL_FORMAT,
+    ORIGIN_NOT_ALLOWED,
+    PROCESSING_FAILED,
+    SERVICE_BUSY,
+    SUBSCRIPTION_CONFIRMED,
+    SUBSCRIPTION_RECEIVED,
+    TOO_MANY_REQUESTS,
+    display_name_for,
+    error_response,
+    get_accept_language,
+    get_source_ip,
+    json_response,
+    message_response,
+    parse_body,
+)
+from .importer import import_source
+from .rate_limiter import is_throttling_error
+from .send_queue import (
+    CONFIRMATION_JOB,
+    MAX_RECEIVE_BATCH,
+    SEND_QUEUE_MODE,
+    create_send_queue,
+    decode_localized_job,
+    job_kind,
+    make_job,
+)
+from .metrics import NULL_METRICS, start_invocation
+from .subscriber_store import create_subscriber_store
+from .suppression import create_suppression_index, feedback_entries, notification_from_record
+from .unsubscribe import (
+    UNSUBSCRIBE_REASON,
+    is_unsubscribe_route,
+    unsubscribe_form_response,
+    unsubscribe_response,
+    verify_unsubscribe_token,
+)
+
+# Subscriber store (SUBSCRIBER_TABLE / SUBSCRIBER_DB_PATH, in-memory by default)
+subscriber_store = create_subscriber_store()
+
+# Addresses that bounced or complained (SUPPRESSION_TABLE / SUPPRESSION_DB_PATH)
+suppression_index = create_suppression_index()
+
+# Bloom filter snapshot of the subscribers (SUBSCRIBER_SNAPSHOT); None means always ask the store
+subscriber_prefilter = create_subscriber_prefilter()
+
+# Concurrent duplicate signups share one outcome (COALESCE_TABLE / COALESCE_DB_PATH across containers)
+signup_flight = create_single_flight()
+
+# Sliding-window limits per source IP and per recipient domain (RATE_LIMIT_*)
+ip_limiter, domain_limiter = create_limiters()
+
+# Batch item statuses that count as success
+BATCH_OK_STATUSES = ('Sent', 'Queued', 'ConfirmationSent', 'AlreadySubscribed')
+
+# Double opt-in (CONFIRM_SUBSCRIPTIONS): signups get a signed confirm link first
+confirm_subscriptions = confirmation_enabled()
+
+# Optional send queue (SEND_QUEUE_URL / SEND_QUEUE_DIR); None means send inline
+send_queue = create_send_queue()
+
+# SEND_QUEUE_MODE=overflow: send inline and queue only sends that run out of
+# response budget or are throttled (single, batch and confirm-link signups alike)
+queue_overflow_only = SEND_QUEUE_MODE == 'overflow'
+
+# Errors after which a welcome email is deferred rather than failed (budget mode)
+DEFERRABLE_ERRORS = (DeadlineExceeded, ReadTimeoutError, ConnectTimeoutError)
+
+# Campaign progress (CAMPAIGN_TABLE / CAMPAIGN_DB_PATH, in-memory by default)
+campaign_checkpoints = create_checkpoint_store()
+
+
+def sanitize_email(email):
+    """
+    Sanitize and validate email address to prevent injection attacks.
+    Returns None if email is invalid, otherwise returns sanitized email.
+    """
+    return validate_email(email)
+
+
+def lambda_handler(event, context):
+    """
+    Main Lambda handler function
+    """
+    metrics = start_invocation('subscribe')
+    response = handle_subscription(event, metrics, deadline_from_context(context))
+    metrics.emit(response['statusCode'])
+    return response
+
+
+def handle_subscription(event, metrics=NULL_METRICS, deadline=UNBOUNDED):
+    """
+    Subscription request flow; each phase is timed through `metrics`, and
+    network calls are fitted into what is left of `deadline`.
+    """
+    # Prebuilt, shared CORS headers for this origin
+    allowed_origin, headers = lookup_cors(get_origin(event))
+    metrics.mark('Cors')
+
+    # Handle preflight OPTIONS request
+    if event.get('httpMethod') == 'OPTIONS':
+        return json_response(200, headers)
+
+    # Unsubscribe and confirm links are opened from an email client, so there is no Origin to check
+    if is_unsubscribe_route(event):
+        return handle_unsubscribe(event, metrics)
+    if event.get('httpMethod') == 'GET':
+        return handle_confirmation(event, metrics)
+
+    # Reject requests from unauthorized origins
+    if not allowed_origin:
+        return error_response(403, headers, ORIGIN_NOT_ALLOWED)
+
+    # Per-client throttling before any parsing, rendering or SES work
+    client_ip = get_source_ip(event)
+    allowed = within_limit(ip_limiter, f'ip:{client_ip}') if client_ip else True
+    metrics.mark('Throttle')
+    if not allowed:
+        metrics.count('RateLimited')
+        return rate_limited_response(headers)
+
+    try:
+        body = parse_body(event)
+        metrics.mark('Parse')
+
+        # Batch shape: {"subscriptions": [{"email": ..., "name": ...}, ...]}
+        if 'subscriptions' in body:
+            return handle_batch_subscription(
+                body['subscriptions'], headers, metrics, client_ip, select_locale(get_accept_language(event)),
+                deadline
+            )
+
+        # Validate and sanitize email using secure function
+        clean_email = sanitize_email(body.get('email', ''))
+        metrics.mark('Validate')
+        if not clean_email:
+            return error_response(400, headers, INVALID_EMAIL_FORMAT)
+        display_name = display_name_for(body.get('name', ''), clean_email)
+        locale = select_locale(get_accept_language(event))
+
+        # Never mail addresses that hard-bounced or complained (an unsubscribe may sign up again)
+        reason = suppression_reason(clean_email)
+        metrics.mark('Suppression')
+        if reason is not None and reason != UNSUBSCRIBE_REASON:
+            metrics.count('Suppressed')
+            return error_response(400, headers, ADDRESS_SUPPRESSED)
+
+        if not within_limit(domain_limiter, f"domain:{clean_email.split('@')[1]}"):
+            metrics.count('RateLimited')
+            return rate_limited_response(headers)
+
+        # Double opt-in: only the confirm link is sent; nothing is stored yet
+        if confirm_subscriptions:
+            return request_confirmation(clean_email, display_name, headers, metrics, deadline, locale)
+
+        if reason == UNSUBSCRIBE_REASON:
+            lift_unsubscribe(clean_email)
+
+        # Double submits and quick retries of this signup share one outcome (and one SES call)
+        outcome, coalesced = signup_flight.do(
+            f'signup:{clean_email}', subscribe_one, clean_email, display_name, metrics, deadline, locale,
+            keep=is_final
+        )
+        if coalesced:
+            metrics.count('CoalescedSignup')
+        return subscription_response(outcome, headers)
+
+    except Exception as e:
+        print(f'Error processing subscription: {str(e)}')
+        return error_response(500, headers, PROCESSING_FAILED)
+
+
+def subscribe_one(clean_email, display_name, metrics=NULL_METRICS, deadline=UNBOUNDED, locale=DEFAULT_LOCALE):
+    """
+    Register one signup and queue or send its welcome email. The outcome is a
+    JSON-serializable dict ({'status': 'Sent' | 'Queued' | 'AlreadySubscribed' |
+    'Failed' | 'Busy', ...}) so coalesced duplicates on other containers can share it.
+    """
+    # Duplicate suppression: repeat signups never reach rendering or SES
+    registered = register_subscriber(clean_email, display_name)
+    metrics.mark('Dedupe')
+    if registered is False:
+        metrics.count('DuplicateSignup')
+        return {'status': 'AlreadySubscribed'}
+
+    try:
+        # Queue mode: hand the send off to the consumer and answer right away
+        if send_queue is not None and not queue_overflow_only:
+            outcome = enqueue_signup(clean_email, display_name, metrics, locale)
+            if outcome is not None:
+                return outcome
+
+        # Send email using SES, within what is left of the response budget
+        try:
+            timeout = deadline.call_timeout('Ses', SES_MIN_BUDGET_MS)
+            message_id = sending.send_welcome_email(clean_email, display_name, metrics, timeout, locale)
+        except DEFERRABLE_ERRORS as e:
+            print(f'Deferring the welcome email: {str(e)}')
+            metrics.mark('Ses')
+            return defer_signup(clean_email, display_name, registered, metrics, locale)
+        except ClientError as e:
+            if deadline.bounded and is_throttling_error(e):
+                print(f'SES still throttled after retries, deferring the welcome email: {str(e)}')
+                metrics.mark('Ses')
+                return defer_signup(clean_email, display_name, registered, metrics, locale)
+            error_code = e.response['Error']['Code']
+            print(f'AWS SES Error: {error_code} - {str(e)}')
+            metrics.mark('Ses')
+            metrics.ses_error(error_code)
+
+            # Let the subscriber retry instead of being treated as a duplicate
+            if registered:
+                forget_subscriber(clean_email)
+            return {'status': 'Failed', 'errorCode': error_code}
+
+        print(f'Email sent successfully: {message_id}')
+        return {'status': 'Sent', 'messageId': message_id}
+
+    except Exception:
+        if registered:
+            forget_subscriber(clean_email)
+        raise
+
+
+def enqueue_signup(clean_email, display_name, metrics=NULL_METRICS, locale=DEFAULT_LOCALE):
+    """
+    Queue the welcome email for the consumer; None if the queue failed.
+    """
+    try:
+        send_queue.send(make_job(clean_email, display_name, locale))
+    except Exception as e:
+        # Fall back to sending inline rather than losing the signup
+        print(f'Send queue error: {str(e)}')
+        return None
+    metrics.mark('Enqueue')
+    return {'status': 'Queued'}
+
+
+def defer_signup(clean_email, display_name, registered, metrics=NULL_METRICS, locale=DEFAULT_LOCALE):
+    """
+    Out of response budget for SES: queue the welcome email (202). Without a
+    queue the registration is rolled back and the client is asked to retry (503).
+    A send that timed out may still have been delivered, so a deferred welcome
+    email can arrive twice; it is never lost.
+    """
+    metrics.count('Deferred')
+    if send_queue is not None:
+        outcome = enqueue_signup(clean_email, display_name, metrics, locale)
+        if outcome is not None:
+            return outcome
+    if registered:
+        forget_subscriber(clean_email)
+    return {'status': 'Busy'}
+
+
+def is_deferrable(error):
+    """
+    True for send errors that a queued retry can get past (timeouts, throttling).
+    """
+    if isinstance(error, DEFERRABLE_ERRORS):
+        return True
+    return isinstance(error, ClientError) and is_throttling_error(error)
+
+
+def request_confirmation(clean_email, display_name, headers, metrics=NULL_METRICS, deadline=UNBOUNDED,
+                         locale=DEFAULT_LOCALE):
+    """
+    Send the double opt-in email with a signed, expiring confirm link.
+    """
+    outcome, coalesced = signup_flight.do(
+        f'confirm:{clean_email}', send_confirmation_one, clean_email, display_name, metrics, deadline, locale,
+        keep=is_final
+    )
+    if coalesced:
+        metrics.count('CoalescedSignup')
+    return subscription_response(outcome, headers)
+
+
+def send_confirmation_one(clean_email, display_name, metrics=NULL_METRICS, deadline=UNBOUNDED, locale=DEFAULT_LOCALE):
+    if is_subscribed(clean_email):
+        metrics.count('DuplicateSignup')
+        return {'status': 'AlreadySubscribed'}
+    try:
+        timeout = deadline.call_timeout('Ses', SES_MIN_BUDGET_MS)
+        confirm_url = confirm_url_for(clean_email, display_name, locale=locale)
+        message_id = sending.send_confirmation_email(clean_email, display_name, confirm_url, metrics, timeout, locale)
+        print(f'Confirmation email sent: {message_id}')
+    except DEFERRABLE_ERRORS as e:
+        print(f'Deferring the confirmation email: {str(e)}')
+        return defer_confirmation(clean_email, display_name, metrics, locale)
+    except ClientError as e:
+        if deadline.bounded and is_throttling_error(e):
+            print(f'SES still throttled after retries, deferring the confirmation email: {str(e)}')
+            return defer_confirmation(clean_email, display_name, metrics, locale)
+        error_code = e.response['Error']['Code']
+        print(f'AWS SES Error: {error_code} - {str(e)}')
+        metrics.ses_error(error_code)
+        return {'status': 'Failed', 'errorCode': error_code}
+    metrics.count('ConfirmationSent')
+    return {'status': 'ConfirmationSent', 'messageId': message_id}
+
+
+def defer_confirmation(clean_email, display_name, metrics=NULL_METRICS, locale=DEFAULT_LOCALE):
+    """
+    Out of response budget for the confirm link: queue it for the consumer
+    (202). Nothing is stored before confirmation, so without a queue the
+    client simply retries (503).
+    """
+    metrics.count('Deferred')
+    if send_queue is not None:
+        try:
+            send_queue.send(make_job(clean_email, display_name, locale, CONFIRMATION_JOB))
+            metrics.mark('Enqueue')
+            return {'status': 'Queued'}
+        except Exception as e:
+            print(f'Send queue error: {str(e)}')
+    return {'status': 'Busy'}
+
+
+def is_final(outcome):
+    """
+    Failed or deferred signups are not shared with later duplicates: a retry should try again.
+    """
+    return outcome['status'] not in ('Failed', 'Busy')
+
+
+def subscription_response(outcome, headers):
+    """
+    API response for a single-signup outcome; None means a duplicate request
+    on another container is still being processed.
+    """
+    status = outcome['status'] if outcome is not None else 'Queued'
+    if status == 'Sent':
+        return json_response(200, headers, {
+            'success': True,
+            'message': SUBSCRIPTION_CONFIRMED,
+            'messageId': outcome['messageId']
+        })
+    if status == 'Queued':
+        return message_response(202, headers, SUBSCRIPTION_RECEIVED)
+    if status == 'AlreadySubscribed':
+        return message_response(200, headers, ALREADY_SUBSCRIBED)
+    if status == 'ConfirmationSent':
+        return message_response(200, headers, CONFIRMATION_SENT)
+    if status == 'Busy':
+        return error_response(503, dict(headers, **{'Retry-After': '5'}), SERVICE_BUSY)
+    return error_response(500, headers, sending.ses_error_message(outcome['errorCode']))
+
+
+def handle_confirmation(event, metrics=NULL_METRICS):
+    """
+    GET ?token=... from the confirmation email. The token is checked in memory
+    (signature + expiry); only a valid one records the subscriber and sends the
+    welcome email. Opening the link twice does not send a second welcome email.
+    The welcome email is in the locale of the signup, carried in the token;
+    tokens issued without one fall back to the Accept-Language of the browser
+    opening the link.
+    """
+    client_ip = get_source_ip(event)
+    if client_ip and not within_limit(ip_limiter, f'ip:{client_ip}'):
+        metrics.count('RateLimited')
+        return rate_limited_response({})
+
+    claims = verify_localized_token((event.get('queryStringParameters') or {}).get('token', ''))
+    metrics.mark('Verify')
+    if claims is None:
+        metrics.count('InvalidToken')
+        return confirmation_response('invalid')
+    clean_email, display_name, locale = claims
+
+    # Bounced or complained since the confirm link was sent: never mail it
+    reason = suppression_reason(clean_email)
+    if reason is not None and reason != UNSUBSCRIBE_REASON:
+        metrics.count('Suppressed')
+        return confirmation_response('suppressed')
+    if reason == UNSUBSCRIBE_REASON:
+        lift_unsubscribe(clean_email)
+    registered = register_subscriber(clean_email, display_name)
+    metrics.mark('Dedupe')
+    if registered is False:
+        return confirmation_response('already')
+
+    if locale is None:
+        locale = select_locale(get_accept_language(event))
+    if send_queue is not None and not queue_overflow_only:
+        if enqueue_signup(clean_email, display_name, metrics, locale) is not None:
+            return confirmation_response('confirmed')
+
+    try:
+        message_id = sending.send_welcome_email(clean_email, display_name, metrics, locale=locale)
+        print(f'Email sent successfully: {message_id}')
+    except Exception as e:
+        # Overflow mode: a throttled or timed-out send goes to the queue instead
+        if send_queue is not None and is_deferrable(e):
+            print(f'Welcome email after confirmation deferred: {str(e)}')
+            metrics.count('Deferred')
+            if enqueue_signup(clean_email, display_name, metrics, locale) is not None:
+                return confirmation_response('confirmed')
+        print(f'Welcome email after confirmation failed: {str(e)}')
+        record_send_failure(metrics, e)
+        if registered:
+            forget_subscriber(clean_email)
+        return confirmation_response('error')
+    metrics.count('Confirmed')
+    return confirmation_response('confirmed')
+
+
+def handle_unsubscribe(event, metrics=NULL_METRICS):
+    """
+    /unsubscribe?token=... route. POST (RFC 8058 one-click from the mail client,
+    or the button on our page) unsubscribes; GET only shows that button.
+    """
+    client_ip = get_source_ip(event)
+    if client_ip and not within_limit(ip_limiter, f'ip:{client_ip}'):
+        metrics.count('RateLimited')
+        return rate_limited_response({})
+
+    token = (event.get('queryStringParameters') or {}).get('token', '')
+    clean_email = verify_unsubscribe_token(token)
+    metrics.mark('Verify')
+    if clean_email is None:
+        metrics.count('InvalidToken')
+        return unsubscribe_response('invalid')
+
+    if event.get('httpMethod') != 'POST':
+        return unsubscribe_form_response(clean_email, token)
+
+    try:
+        unsubscribe_subscriber(clean_email)
+    except Exception as e:
+        print(f'Unsubscribe failed: {str(e)}')
+        return unsubscribe_response('error')
+    metrics.mark('Unsubscribe')
+    metrics.count('Unsubscribed')
+    print('Unsubscribe processed')
+    return unsubscribe_response('unsubscribed')
+
+
+def unsubscribe_subscriber(clean_email):
+    """
+    Stop all mail to an address: one suppression write and one keyed delete.
+    The suppression must succeed (errors propagate); the store cleanup is best effort.
+    """
+    suppression_index.suppress_many([(clean_email, UNSUBSCRIBE_REASON)])
+    forget_subscriber(clean_email)
+
+
+def handle_batch_subscription(items, headers, metrics=NULL_METRICS, client_ip='', locale=DEFAULT_LOCALE,
+                              deadline=UNBOUNDED):
+    """
+    Several signups in one request: one validation pass, one batched store
+    write, then one batched enqueue or parallel SES sends within `deadline`.
+    Returns 200 with a result per item, in request order.
+    """
+    if not isinstance(items, list) or not items:
+        return error_response(400, headers, INVALID_BATCH)
+    if len(items) > MAX_BATCH_SUBSCRIPTIONS:
+        return error_response(400, headers, BATCH_TOO_LARGE)
+
+    items = [item if isinstance(item, dict) else {'email': item} for item in items]
+    cleaned = validate_many([item.get('email', '') for item in items])
+    metrics.mark('Validate')
+
+    results = [None] * len(items)
+    pending = []
+    seen = set()
+    for index, (item, clean_email) in enumerate(zip(items, cleaned)):
+        reason = suppression_reason(clean_email) if clean_email and clean_email not in seen else None
+        if not clean_email:
+            results[index] = {'email': item.get('email', ''), 'status': 'InvalidEmail', 'error': INVALID_EMAIL_FORMAT}
+        elif clean_email in seen:
+            results[index] = {'email': clean_email, 'status': 'AlreadySubscribed'}
+        elif reason is not None and reason != UNSUBSCRIBE_REASON:
+            results[index] = {'email': clean_email, 'status': 'Suppressed', 'error': ADDRESS_SUPPRESSED}
+            metrics.count('Suppressed')
+        elif not within_limit(domain_limiter, f"domain:{clean_email.split('@')[1]}"):
+            results[index] = {'email': clean_email, 'status': 'RateLimited', 'error': TOO_MANY_REQUESTS}
+            metrics.count('RateLimited')
+        else:
+            seen.add(clean_email)
+            # Re-subscribing after an unsubscribe (with double opt-in, the confirm link lifts it)
+            if reason == UNSUBSCRIBE_REASON and not confirm_subscriptions:
+                lift_unsubscribe(clean_email)
+            pending.append((index, clean_email, display_name_for(item.get('name', ''), clean_email)))
+
+    if confirm_subscriptions:
+        confirm_batch(pending, results, metrics, locale, deadline)
+    else:
+        subscribe_batch(pending, results, metrics, locale, deadline)
+
+    metrics.count('BatchSubscriptions', len(items))
+    return json_response(200, headers, {
+        'success': all(result['status'] in BATCH_OK_STATUSES for result in results),
+        'results': results
+    })
+
+
+def within_limit(limiter, key, cost=1):
+    """
+    Count a hit against a limiter; an unavailable shared store never blocks a signup.
+    """
+    try:
+        return limiter.hit(key, cost)
+    except Exception as e:
+        print(f'Rate limiter error: {str(e)}')
+        return True
+
+
+def rate_limited_response(headers):
+    return error_response(429, dict(headers, **{'Retry-After': str(ip_limiter.window_seconds)}), TOO_MANY_REQUESTS)
+
+
+def is_suppressed(clean_email):
+    """
+    Check the suppression index; an unavailable index never blocks a send.
+    """
+    try:
+        return suppression_index.is_suppressed(clean_email)
+    except Exception as e:
+        print(f'Suppression index error: {str(e)}')
+        return False
+
+
+def suppression_reason(clean_email):
+    """
+    Why an address is suppressed ('unsubscribe', 'bounce:...', 'complaint:...'),
+    or None if it may be mailed. Only suppressed addresses cost a second lookup.
+    """
+    if not is_suppressed(clean_email):
+        return None
+    try:
+        record = suppression_index.get(clean_email)
+    except Exception as e:
+        print(f'Suppression index error: {str(e)}')
+        return None
+    return record['reason'] if record else None
+
+
+def lift_unsubscribe(clean_email):
+    """
+    An explicit new signup overrides an earlier unsubscribe.
+    """
+    try:
+        suppression_index.remove(clean_email)
+    except Exception as e:
+        print(f'Suppression index error: {str(e)}')
+
+
+def subscribe_batch(pending, results, metrics=NULL_METRICS, locale=DEFAULT_LOCALE, deadline=UNBOUNDED):
+    """
+    Register a batch of (index, email, name) entries and enqueue or send their
+    welcome emails, filling in `results` by index. Sends that do not fit in
+    `deadline` (or stay throttled) are deferred like single signups.
+    """
+    registered = register_subscribers([(email, name) for _, email, name in pending])
+    metrics.mark('Dedupe')
+    to_send = []
+    for entry, added in zip(pending, registered):
+        if added is False:
+            results[entry[0]] = {'email': entry[1], 'status': 'AlreadySubscribed'}
+            metrics.count('DuplicateSignup')
+        else:
+            to_send.append((entry, added))
+
+    queued = False
+    if to_send and send_queue is not None and not queue_overflow_only:
+        try:
+            send_queue.send_many([make_job(email, name, locale) for (_, email, name), _ in to_send])
+            metrics.mark('Enqueue')
+            for (index, email, _), _ in to_send:
+                results[index] = {'email': email, 'status': 'Queued'}
+            queued = True
+        except Exception as e:
+            print(f'Send queue error, sending synchronously: {str(e)}')
+
+    if to_send and not queued:
+        outcomes = sending.send_welcome_emails(
+            [(email, name) for (_, email, name), _ in to_send], locale=locale, deadline=deadline
+        )
+        metrics.mark('Ses')
+        deferred = []
+        for ((index, email, name), added), (message_id, error) in zip(to_send, outcomes):
+            if error is None:
+                results[index] = {'email': email, 'status': 'Sent', 'messageId': message_id}
+                continue
+            if is_deferrable(error):
+                deferred.append((index, email, name, added))
+                continue
+            error_code = sending.error_code_of(error)
+            print(f'AWS SES Error: {error_code} - {str(error)}')
+            metrics.ses_error(error_code)
+            if added:
+                forget_subscriber(email)
+            results[index] = {'email': email, 'status': 'Failed', 'error': sending.ses_error_message(error_code)}
+        if deferred:
+            defer_batch(deferred, results, metrics, locale)
+
+
+def defer_batch(deferred, results, metrics=NULL_METRICS, locale=DEFAULT_LOCALE, kind=None):
+    """
+    Queue the emails (welcome, or confirm links with kind=CONFIRMATION_JOB) of
+    (index, email, name, added) entries whose inline send was throttled, timed
+    out or did not fit in the response budget. Without a queue, or if the
+    queue fails too, they are rolled back and reported as busy.
+    """
+    print(f'Deferring {len(deferred)} batch sends')
+    metrics.count('Deferred', len(deferred))
+    queued = False
+    if send_queue is not None:
+        try:
+            send_queue.send_many([make_job(email, name, locale, kind) for _, email, name, _ in deferred])
+            metrics.mark('Enqueue')
+            queued = True
+        except Exception as e:
+            print(f'Send queue error: {str(e)}')
+    for index, email, _, added in deferred:
+        if queued:
+            results[index] = {'email': email, 'status': 'Queued'}
+            continue
+        if added:
+            forget_subscriber(email)
+        results[index] = {'email': email, 'status': 'Failed', 'error': SERVICE_BUSY}
+
+
+def confirm_batch(pending, results, metrics=NULL_METRICS, locale=DEFAULT_LOCALE, deadline=UNBOUNDED):
+    """
+    Double opt-in for a batch: send confirm links in parallel within
+    `deadline`, store nothing yet. Links that do not fit are deferred.
+    """
+    to_confirm = []
+    for index, email, name in pending:
+        if is_subscribed(email):
+            results[index] = {'email': email, 'status': 'AlreadySubscribed'}
+            metrics.count('DuplicateSignup')
+        else:
+            to_confirm.append((index, email, name))
+
+    def send(entry):
+        timeout = deadline.call_timeout('Ses', SES_MIN_BUDGET_MS)
+        return sending.send_confirmation_email(
+            entry[1], entry[2], confirm_url_for(entry[1], entry[2], locale=locale), timeout=timeout, locale=locale
+        )
+    outcomes = dispatch(send, to_confirm, SEND_CONCURRENCY)
+    metrics.mark('Ses')
+    deferred = []
+    for (index, email, name), (message_id, error) in zip(to_confirm, outcomes):
+        if error is None:
+            results[index] = {'email': email, 'status': 'ConfirmationSent', 'messageId': message_id}
+            continue
+        if is_deferrable(error):
+            deferred.append((index, email, name, None))
+            continue
+        error_code = sending.error_code_of(error)
+        print(f'AWS SES Error: {error_code} - {str(error)}')
+        metrics.ses_error(error_code)
+        results[index] = {'email': email, 'status': 'Failed', 'error': sending.ses_error_message(error_code)}
+    if deferred:
+        defer_batch(deferred, results, metrics, locale, CONFIRMATION_JOB)
+
+
+def is_subscribed(clean_email):
+    """
+    Read-only duplicate check used before sending a confirm link (fails open).
+    """
+    if not might_be_listed(subscriber_prefilter, clean_email):
+        return False
+    try:
+        return subscriber_store.get(clean_email) is not None
+    except Exception as e:
+        print(f'Subscriber store error: {str(e)}')
+        return False
+
+
+def register_subscribers(records):
+    """
+    Batched register_subscriber: one flag per (email, name) record, all None
+    if the store is unavailable.
+    """
+    if not records:
+        return []
+    try:
+        registered = subscriber_store.add_many(records)
+    except Exception as e:
+        print(f'Subscriber store error: {str(e)}')
+        return [None] * len(records)
+    for (clean_email, _), added in zip(records, registered):
+        if added:
+            remember_address(subscriber_prefilter, clean_email)
+    return registered
+
+
+def register_subscriber(clean_email, display_name):
+    """
+    Record a new subscriber with a conditional insert.
+    Returns True if new, False for a duplicate, None if the store is unavailable
+    (the signup then proceeds rather than being lost).
+    """
+    try:
+        registered = subscriber_store.add_if_absent(clean_email, display_name)
+    except Exception as e:
+        print(f'Subscriber store error: {str(e)}')
+        return None
+    if registered:
+        remember_address(subscriber_prefilter, clean_email)
+    return registered
+
+
+def might_be_listed(prefilter, clean_email):
+    """
+    False only when the prefilter is sure the address is not in its list;
+    without a prefilter (or if it fails) the store has to be asked.
+    """
+    if prefilter is None:
+        return True
+    try:
+        return prefilter.might_contain(clean_email)
+    except Exception as e:
+        print(f'Prefilter error: {str(e)}')
+        return True
+
+
+def remember_address(prefilter, clean_email):
+    """
+    Cover an address written since the snapshot was built.
+    """
+    if prefilter is not None:
+        prefilter.add(clean_email)
+
+
+def forget_subscriber(clean_email):
+    """
+    Roll back a registration whose welcome email could not be sent.
+    """
+    try:
+        subscriber_store.discard(clean_email)
+    except Exception as e:
+        print(f'Subscriber store error: {str(e)}')
+
+
+def send_queue_consumer_handler(event, context):
+    """
+    Drain queued welcome email jobs (and deferred confirmation emails) and send them via SES.
+
+    With an SQS event source mapping the jobs arrive in event['Records'] and
+    failed ones are returned as batchItemFailures so SQS redelivers only those.
+    Otherwise (scheduled/manual invocation) the configured queue is polled for
+    up to event['maxJobs'] jobs.
+    """
+    metrics = start_invocation('queue-consumer')
+    if 'Records' in event:
+        records = event['Records']
+        outcomes = send_jobs([record['body'] for record in records])
+        metrics.mark('Ses')
+        failures = []
+        skipped = 0
+        for record, (message_id, error) in zip(records, outcomes):
+            if error is None and message_id is None:
+                skipped += 1
+            elif error is None:
+                print(f'Email sent successfully: {message_id}')
+            else:
+                print(f'Queued send failed: {str(error)}')
+                record_send_failure(metrics, error)
+                failures.append({'itemIdentifier': record['messageId']})
+        metrics.count('Sent', len(records) - len(failures) - skipped)
+        metrics.count('Failed', len(failures))
+        metrics.count('Suppressed', skipped)
+        metrics.emit()
+        return {'batchItemFailures': failures}
+
+    if send_queue is None:
+        metrics.emit()
+        return {'sent': 0, 'failed': 0}
+
+    max_jobs = int(event.get('maxJobs', 100))
+    sent = failed = skipped = 0
+    while sent + failed + skipped < max_jobs:
+        jobs = send_queue.receive(min(MAX_RECEIVE_BATCH, max_jobs - sent - failed - skipped))
+        if not jobs:
+            break
+        outcomes = send_jobs([body for _, body in jobs])
+        metrics.mark('Ses')
+        for (receipt, _), (message_id, error) in zip(jobs, outcomes):
+            if error is None and message_id is None:
+                send_queue.delete(receipt)
+                skipped += 1
+            elif error is None:
+                print(f'Email sent successfully: {message_id}')
+                send_queue.delete(receipt)
+                sent += 1
+            else:
+                print(f'Queued send failed: {str(error)}')
+                record_send_failure(metrics, error)
+                send_queue.release(receipt)
+                failed += 1
+
+    metrics.count('Sent', sent)
+    metrics.count('Failed', failed)
+    metrics.count('Suppressed', skipped)
+    metrics.emit()
+    return {'sent': sent, 'failed': failed, 'suppressed': skipped}
+
+
+def send_jobs(bodies):
+    """
+    Send queued email jobs in parallel; one (message_id, error) pair per job.
+    Jobs for addresses suppressed since they were queued get (None, None).
+    """
+    return dispatch(send_job, bodies, SEND_CONCURRENCY)
+
+
+def send_job(body):
+    job = json.loads(body) if isinstance(body, str) else body
+    clean_email, display_name, locale = decode_localized_job(job)
+    if is_suppressed(clean_email):
+        return None
+    if job_kind(job) == CONFIRMATION_JOB:
+        return sending.send_confirmation_email(
+            clean_email, display_name, confirm_url_for(clean_email, display_name, locale=locale), locale=locale
+        )
+    return sending.send_welcome_email(clean_email, display_name, locale=locale)
+
+
+def record_send_failure(metrics, error):
+    """
+    Count SES error codes from a failed send (other failures are counted as 'Unknown').
+    """
+    metrics.ses_error(sending.error_code_of(error))
+
+
+def bulk_send_handler(event, context):
+    """
+    Bulk newsletter dispatch handler (invoked directly, e.g. by a scheduled rule)
+
+    Expected event:
+    {
+        "recipients": [{"email": "...", "name": "..."}, ...],
+        "template": "optional SES template name",
+        "templateData": {"optional": "default template data"}
+    }
+    """
+    recipients = event.get('recipients') or []
+    template = event.get('template') or NEWSLETTER_TEMPLATE
+
+    # Results keep the input order; invalid addresses are reported without an SES call
+    results = [None] * len(recipients)
+    valid = []
+    positions = []
+    for index, recipient in enumerate(recipients):
+        if isinstance(recipient, str):
+            recipient = {'email': recipient}
+        clean_email = sanitize_email(recipient.get('email', ''))
+        if not clean_email:
+            results[index] = {
+                'email': recipient.get('email', ''),
+                'status': 'InvalidEmail',
+                'error': INVALID_EMAIL_FORMAT
+            }
+            continue
+        if is_suppressed(clean_email):
+            results[index] = {'email': clean_email, 'status': 'Suppressed', 'error': ADDRESS_SUPPRESSED}
+            continue
+        valid.append((clean_email, recipient_template_data(clean_email, recipient.get('name'))))
+        positions.append(index)
+
+    sent_results = send_bulk_templated(
+        sending.get_ses_client(),
+        valid,
+        template=template,
+        source=FROM_EMAIL,
+        reply_to=REPLY_TO_EMAIL,
+        default_template_data=event.get('templateData'),
+        tags=[{'Name': 'newsletter', 'Value': 'bulk'}],
+        concurrency=SEND_CONCURRENCY
+    )
+    for index, result in zip(positions, sent_results):
+        results[index] = result
+
+    sent = sum(1 for result in results if result['status'] == 'Success')
+    print(f'Bulk send complete: {sent} sent, {len(results) - sent} failed')
+
+    return {
+        'success': sent == len(results),
+        'sent': sent,
+        'failed': len(results) - sent,
+        'results': results
+    }
+
+
+def campaign_handler(event, context):
+    """
+    Newsletter campaign runner (invoked directly or by a schedule until it reports complete)
+
+    Expected event:
+    {
+        "campaignId": "weekly-2026-42",
+        "template": "SES template name",
+        "templateData": {"optional": "default template data"},
+        "segments": [{"name": "gmail", "domains": ["gmail.com"], "template": "...", "templateData": {}}]
+    }
+
+    Each invocation continues from the campaign's checkpoint and stops before the
+    Lambda deadline; invoking a finished campaign again sends nothing.
+    """
+    metrics = start_invocation('campaign')
+    try:
+        campaign = parse_campaign(event)
+    except (ValueError, TypeError, AttributeError) as e:
+        return {'success': False, 'error': str(e)}
+
+    try:
+        checkpoint = run_campaign(
+            campaign,
+            subscriber_store,
+            campaign_checkpoints,
+            sending.get_ses_client(),
+            is_suppressed,
+            remaining_ms=getattr(context, 'get_remaining_time_in_millis', None)
+        )
+    except CheckpointConflict:
+        print(f'Campaign {campaign.campaign_id} is already being sent by another invocation')
+        return {'success': False, 'error': 'campaign is already running'}
+    except Exception as e:
+        print(f'Campaign {campaign.campaign_id} failed: {str(e)}')
+        return {'success': False, 'error': str(e)}
+
+    print(f"Campaign {campaign.campaign_id}: {checkpoint['status']}, {checkpoint['sent']} sent, "
+          f"{checkpoint['failed']} failed, {checkpoint['suppressed']} suppressed")
+    metrics.count('Sent', checkpoint['sent'])
+    metrics.emit()
+    return dict(checkpoint, success=True)
+
+
+def import_handler(event, context):
+    """
+    Subscriber import handler (invoked directly after uploading a list to S3)
+
+    Expected event:
+    {
+        "source": "s3://bucket/subscribers.csv",
+        "format": "optional csv | jsonl (default: from the file name)",
+        "queueWelcome": false
+    }
+    """
+    source = event.get('source')
+    if not source:
+        return {'success': False, 'error': 'source is required'}
+    if event.get('queueWelcome') and send_queue is None:
+        return {'success': False, 'error': 'queueWelcome needs SEND_QUEUE_URL'}
+
+    try:
+        stats = import_source(
+            source,
+            subscriber_store,
+            send_queue if event.get('queueWelcome') else None,
+            fmt=event.get('format')
+        )
+    except Exception as e:
+        print(f'Import failed: {str(e)}')
+        return {'success': False, 'error': str(e)}
+
+    print(f'Import complete: {stats}')
+    return dict(stats.as_dict(), success=True)
+
+
+def feedback_handler(event, context):
+    """
+    SES feedback processor: subscribed to the SNS topic that receives SES bounce
+    and complaint notifications (directly, or through an SQS queue).
+    Permanent bounces and complaints from the whole batch are written to the
+    suppression index in one call; store errors raise so the batch is redelivered.
+    """
+    metrics = start_invocation('feedback')
+    entries = []
+    ignored = 0
+    for record in event.get('Records', []):
+        try:
+            found = feedback_entries(notification_from_record(record))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f'Unreadable feedback record: {str(e)}')
+            found = []
+        if not found:
+            ignored += 1
+        entries.extend(found)
+
+    if entries:
+        suppression_index.suppress_many(entries)
+    print(f'Feedback processed: {len(entries)} suppressed, {ignored} ignored')
+
+    metrics.count('Suppressed', len(entries))
+    metrics.emit()
+    return {'suppressed': len(entries), 'ignored': ignored}
+
+
+def snapshot_handler(event, context):
+    """
+    Prefilter snapshot builder (scheduled, e.g. hourly): pages through the
+    subscriber store and writes a Bloom filter snapshot to SUBSCRIBER_SNAPSHOT.
+    An event may name another destination ({"subscribers": "s3://..."}).
+    """
+    destination = (event or {}).get('subscribers') or os.environ.get('SUBSCRIBER_SNAPSHOT', '')
+    if not destination:
+        return {'success': True}
+    try:
+        bloom = rebuild_snapshot(subscriber_store.page, destination)
+    except Exception as e:
+        print(f'Snapshot of subscribers failed: {str(e)}')
+        return {'success': False, 'subscribers': {'error': str(e)}}
+    print(f'Snapshot of subscribers written: {bloom.count} addresses, {bloom.size_bytes} bytes')
+    return {
+        'success': True,
+        'subscribers': {'destination': destination, 'addresses': bloom.count, 'bytes': bloom.size_bytes},
+    }
+
+
+def create_welcome_email_html(name, locale=DEFAULT_LOCALE):
+    """
+    Create HTML email template
+    """
+    return render_welcome_email(name, locale=locale).html
+
+
+def create_welcome_email_text(name, locale=DEFAULT_LOCALE):
+    """
+    Create plain text email template
+    """
+    return render_welcome_email(name, locale=locale).text
@@ -0,0 +1,241 @@
+"""
+Streaming Subscriber Import
+
+Imports lists exported from other providers (CSV or JSONL, optionally
+gzipped) from a local file or an S3 object, without going through one
+HTTP request per address.
+
+The source is read as a stream of lines and processed in fixed-size chunks:
+validate the chunk with validate_many, drop addresses already seen in a
+bounded recently-seen window, insert the rest with the store's add_many and
+optionally enqueue welcome email jobs. Memory use depends on the chunk size
+and the dedupe window, never on the size of the file; duplicates that fall
+outside the window are still caught by the store's conditional insert.
+
+Usage (from lambda/newsletter, store/queue configured by the usual env vars):
+    python -m newsletter_core.importer subscribers.csv [--queue-welcome]
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+from contextlib import contextmanager
+
+from .aws_clients import get_client
+from .bulk_send import chunked
+from .email_validation import validate_many
+from .events import display_name_for
+from .send_queue import create_send_queue, make_job
+from .subscriber_store import RecentlySeenCache, create_subscriber_store
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+IMPORT_DEDUPE_WINDOW = int(os.environ.get('IMPORT_DEDUPE_WINDOW', '100000'))
+PROGRESS_EVERY = 10000
+
+EMAIL_COLUMNS = ('email', 'email_address', 'email address', 'e-mail', 'mail')
+NAME_COLUMNS = ('name', 'first_name', 'first name', 'firstname', 'full_name', 'full name')
+
+
+class ImportStats:
+    """
+    Running counts for one import.
+    """
+
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.queued = 0
+
+    def as_dict(self):
+        return {
+            'read': self.read,
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'queued': self.queued
+        }
+
+    def __str__(self):
+        return (f'{self.read} read, {self.imported} imported, {self.duplicates} duplicates, '
+                f'{self.rejected} rejected, {self.queued} queued')
+
+
+def detect_format(source):
+    """
+    Guess 'csv' or 'jsonl' from the file name (a trailing .gz is ignored).
+    """
+    name = source[:-3] if source.endswith('.gz') else source
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+@contextmanager
+def open_source(source):
+    """
+    Open a local path or s3://bucket/key as a text stream, decompressing .gz on the fly.
+    """
+    if source.startswith('s3://'):
+        bucket, _, key = source[len('s3://'):].partition('/')
+        raw = get_client('s3').get_object(Bucket=bucket, Key=key)['Body']
+    else:
+        raw = open(source, 'rb')
+    try:
+        stream = gzip.GzipFile(fileobj=raw) if source.endswith('.gz') else raw
+        yield io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    finally:
+        raw.close()
+
+
+def _column(header, candidates):
+    for candidate in candidates:
+        if candidate in header:
+            return header.index(candidate)
+    return None
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def iter_csv_records(lines):
+    """
+    Yield (email, name) from CSV lines. A header row naming an email column is
+    used when present; otherwise the first column is the email and the second the name.
+    """
+    reader = csv.reader(lines)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [cell.strip().lower() for cell in first]
+    email_index = _column(header, EMAIL_COLUMNS)
+    name_index = _column(header, NAME_COLUMNS)
+    if email_index is None:
+        email_index, name_index = 0, 1
+        reader_rows = _prepend(first, reader)
+    else:
+        reader_rows = reader
+
+    for row in reader_rows:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        email = row[email_index] if email_index < len(row) else ''
+        name = row[name_index] if name_index is not None and name_index < len(row) else ''
+        yield email, name
+
+
+def iter_jsonl_records(lines):
+    """
+    Yield (email, name) from JSON lines; each line is an object or a bare email string.
+    Unparseable lines yield an empty email so they are counted as rejected.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield '', ''
+            continue
+        if isinstance(record, str):
+            yield record, ''
+        elif isinstance(record, dict):
+            yield record.get('email', ''), record.get('name', '')
+        else:
+            yield '', ''
+
+
+def iter_records(lines, fmt='csv'):
+    if fmt == 'jsonl':
+        return iter_jsonl_records(lines)
+    if fmt == 'csv':
+        return iter_csv_records(lines)
+    raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def print_progress(stats):
+    print(f'Import progress: {stats}')
+
+
+def import_subscribers(records, store, queue=None, batch_size=IMPORT_BATCH_SIZE,
+                       dedupe_window=IMPORT_DEDUPE_WINDOW, progress=print_progress,
+                       progress_every=PROGRESS_EVERY, now=None):
+    """
+    Import an iterable of (email, name) records into `store`, enqueueing a
+    welcome email job on `queue` for every new subscriber when one is given.
+    Returns the ImportStats.
+    """
+    stats = ImportStats()
+    recently_seen = RecentlySeenCache(ttl_seconds=float('inf'), maxsize=dedupe_window)
+    next_progress = progress_every
+
+    for batch in chunked(records, batch_size):
+        stats.read += len(batch)
+        cleaned = validate_many([email for email, _ in batch])
+
+        new_records = []
+        for clean_email, (_, name) in zip(cleaned, batch):
+            if not clean_email:
+                stats.rejected += 1
+            elif recently_seen.seen(clean_email):
+                stats.duplicates += 1
+            else:
+                recently_seen.add(clean_email)
+                new_records.append((clean_email, display_name_for(name, clean_email)))
+
+        if new_records:
+            added = store.add_many(new_records, now)
+            fresh = [record for record, was_added in zip(new_records, added) if was_added]
+            stats.imported += len(fresh)
+            stats.duplicates += len(new_records) - len(fresh)
+            if queue is not None and fresh:
+                stats.queued += queue.send_many([make_job(email, name) for email, name in fresh])
+
+        if progress is not None and stats.read >= next_progress:
+            progress(stats)
+            next_progress = (stats.read // progress_every + 1) * progress_every
+
+    return stats
+
+
+def import_source(source, store, queue=None, fmt=None, **options):
+    """
+    Stream a CSV/JSONL file or S3 object into the subscriber store.
+    """
+    with open_source(source) as lines:
+        return import_subscribers(iter_records(lines, fmt or detect_format(source)), store, queue, **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import subscribers from a CSV or JSONL file or S3 object.')
+    parser.add_argument('source', help='local path or s3://bucket/key (.gz is decompressed)')
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='defaults to the file extension')
+    parser.add_argument('--queue-welcome', action='store_true',
+                        help='enqueue a welcome email for each new subscriber (needs SEND_QUEUE_URL or SEND_QUEUE_DIR)')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--dedupe-window', type=int, default=IMPORT_DEDUPE_WINDOW)
+    args = parser.parse_args(argv)
+
+    queue = None
+    if args.queue_welcome:
+        queue = create_send_queue()
+        if queue is None:
+            parser.error('--queue-welcome needs SEND_QUEUE_URL or SEND_QUEUE_DIR')
+
+    stats = import_source(
+        args.source, create_subscriber_store(), queue, fmt=args.format,
+        batch_size=args.batch_size, dedupe_window=args.dedupe_window
+    )
+    print(f'Import complete: {stats}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
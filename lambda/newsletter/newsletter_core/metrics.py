@@ -0,0 +1,139 @@
+"""
+Hot-path Instrumentation (CloudWatch Embedded Metric Format)
+
+Each invocation records per-phase timings with a monotonic clock and, when
+enabled, prints one EMF JSON line that CloudWatch turns into metrics:
+phase durations, cold/warm starts, and SES error codes.
+
+Disabled by default: start_invocation() then returns a shared no-op object,
+so the instrumented code pays one attribute lookup and call per phase.
+Enable with METRICS_ENABLED=true.
+"""
+
+import json
+import os
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TranquilMindQuest/Newsletter')
+
+_cold_start = True
+
+
+class InvocationMetrics:
+    """
+    Per-invocation recorder. mark(phase) attributes the time since the previous
+    mark (or the start) to `phase`.
+    """
+
+    __slots__ = ('handler', 'cold_start', '_clock', '_last', '_start', 'timings', 'counts', 'error_codes')
+
+    def __init__(self, handler, cold_start, clock=time.perf_counter):
+        self.handler = handler
+        self.cold_start = cold_start
+        self._clock = clock
+        self._start = self._last = clock()
+        self.timings = {}
+        self.counts = {}
+        self.error_codes = []
+
+    def mark(self, phase):
+        now = self._clock()
+        self.timings[phase] = self.timings.get(phase, 0.0) + (now - self._last) * 1000.0
+        self._last = now
+
+    def count(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def ses_error(self, error_code):
+        self.error_codes.append(error_code)
+
+    def to_emf(self, status_code=None, timestamp=None):
+        """
+        Build the EMF records: one for timings/counters, one per SES error code.
+        """
+        timestamp = int(timestamp if timestamp is not None else time.time() * 1000)
+        total_ms = (self._clock() - self._start) * 1000.0
+
+        values = {f'{phase}Time': round(ms, 3) for phase, ms in self.timings.items()}
+        values['TotalTime'] = round(total_ms, 3)
+        definitions = [{'Name': name, 'Unit': 'Milliseconds'} for name in values]
+
+        counters = dict(self.counts)
+        counters['Invocations'] = 1
+        counters['ColdStart'] = 1 if self.cold_start else 0
+        counters['WarmStart'] = 0 if self.cold_start else 1
+        values.update(counters)
+        definitions.extend({'Name': name, 'Unit': 'Count'} for name in counters)
+
+        record = {
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Handler']],
+                    'Metrics': definitions
+                }]
+            },
+            'Handler': self.handler
+        }
+        record.update(values)
+        if status_code is not None:
+            record['StatusCode'] = status_code
+        records = [record]
+
+        for error_code in self.error_codes:
+            records.append({
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': METRICS_NAMESPACE,
+                        'Dimensions': [['Handler', 'ErrorCode']],
+                        'Metrics': [{'Name': 'SESError', 'Unit': 'Count'}]
+                    }]
+                },
+                'Handler': self.handler,
+                'ErrorCode': error_code,
+                'SESError': 1
+            })
+        return records
+
+    def emit(self, status_code=None):
+        for record in self.to_emf(status_code):
+            print(json.dumps(record, separators=(',', ':')))
+
+
+class _NullMetrics:
+    """
+    Shared no-op recorder used when metrics are disabled.
+    """
+
+    __slots__ = ()
+    cold_start = False
+
+    def mark(self, phase):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def ses_error(self, error_code):
+        pass
+
+    def emit(self, status_code=None):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def start_invocation(handler):
+    """
+    Begin recording an invocation; tracks whether it is the container's first.
+    """
+    global _cold_start
+    cold_start = _cold_start
+    _cold_start = False
+    if not METRICS_ENABLED:
+        return NULL_METRICS
+    return InvocationMetrics(handler, cold_start)
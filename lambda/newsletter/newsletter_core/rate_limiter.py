@@ -0,0 +1,255 @@
+"""
+Client-side Rate Limiting for AWS SES
+
+SES enforces a maximum send rate (recipients per second; 1/s on a sandbox
+account). Instead of letting bursts fail with `Throttling`, every send call
+goes through a token bucket sized from the account's send quota, and throttling
+errors that still get through are retried with jittered exponential backoff.
+
+A bounded view (RateLimitedSESClient.bounded) does the same inside a response
+budget: it waits for a token or backs off only while SES_MIN_BUDGET_MS would
+still be left for the call itself, and raises DeadlineExceeded otherwise.
+"""
+
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError, ConnectTimeoutError, ReadTimeoutError
+
+from .aws_clients import get_bounded_client
+from .deadline import SES_MIN_BUDGET_MS, DeadlineExceeded
+
+# Sandbox accounts are limited to 1 recipient per second
+DEFAULT_SEND_RATE = 1.0
+
+THROTTLING_ERROR_CODES = frozenset({'Throttling', 'ThrottlingException', 'TooManyRequestsException'})
+
+# Send operations and how many recipients each call consumes
+SEND_OPERATIONS = frozenset({
+    'send_email',
+    'send_raw_email',
+    'send_templated_email',
+    'send_bulk_templated_email',
+})
+
+_send_rate = None
+_send_rate_lock = threading.Lock()
+
+
+def get_send_rate(ses_client, raise_timeouts=False):
+    """
+    Return the account's max send rate, looked up once per container.
+    SES_MAX_SEND_RATE overrides the lookup (e.g. to share the quota between functions).
+    With `raise_timeouts` (a lookup inside a response budget), a timed-out
+    lookup raises instead of settling on the default rate for the container.
+    """
+    global _send_rate
+    if _send_rate is not None:
+        return _send_rate
+
+    with _send_rate_lock:
+        if _send_rate is None:
+            override = os.environ.get('SES_MAX_SEND_RATE', '')
+            if override:
+                _send_rate = float(override)
+            else:
+                try:
+                    _send_rate = read_max_send_rate(ses_client)
+                except (BotoCoreError, ClientError, KeyError) as e:
+                    if raise_timeouts and isinstance(e, (ConnectTimeoutError, ReadTimeoutError)):
+                        raise
+                    print(f'Could not read SES send quota, using {DEFAULT_SEND_RATE}/s: {str(e)}')
+                    _send_rate = DEFAULT_SEND_RATE
+    return _send_rate
+
+
+def read_max_send_rate(ses_client):
+    """
+    Ask SES for the max send rate (SES v1 GetSendQuota, or SES v2 GetAccount).
+    """
+    if hasattr(ses_client, 'get_send_quota'):
+        return float(ses_client.get_send_quota()['MaxSendRate'])
+    return float(ses_client.get_account()['SendQuota']['MaxSendRate'])
+
+
+def reset_send_rate():
+    """
+    Forget the cached send rate (used by tests).
+    """
+    global _send_rate
+    _send_rate = None
+
+
+def count_recipients(operation, kwargs):
+    """
+    Number of recipients a send call counts against the SES rate.
+    """
+    if operation == 'send_bulk_templated_email':
+        return sum(
+            len(sum(destination.get('Destination', {}).values(), []))
+            for destination in kwargs.get('Destinations', [])
+        ) or 1
+    if operation == 'send_raw_email':
+        return len(kwargs.get('Destinations', [])) or 1
+    return len(sum(kwargs.get('Destination', {}).values(), [])) or 1
+
+
+def is_throttling_error(error):
+    """
+    True for rate throttling that is worth retrying (not the daily quota).
+    """
+    details = error.response.get('Error', {})
+    if details.get('Code') not in THROTTLING_ERROR_CODES:
+        return False
+    return 'daily message quota' not in details.get('Message', '').lower()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Requests larger than the capacity are allowed
+    once the bucket is full and leave it in debt, so long-run pacing holds.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(self.rate, 1.0))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens if available right now; never blocks.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= min(tokens, self.capacity):
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, max_wait=None):
+        """
+        Block until tokens are available, then take them.
+        Returns the number of seconds spent waiting, or None (taking nothing)
+        when that would take longer than `max_wait` seconds.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(self._clock())
+                needed = min(tokens, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            if max_wait is not None and waited + delay > max_wait:
+                return None
+            self._sleep(delay)
+            waited += delay
+
+
+class RateLimitedSESClient:
+    """
+    Wraps a boto3 SES client. Send operations are paced by a token bucket
+    and retried on throttling; every other attribute is passed through.
+    """
+
+    def __init__(self, client, rate=None, max_retries=3, base_delay=0.2, max_delay=5.0,
+                 sleep=time.sleep, clock=time.monotonic):
+        self._client = client
+        self._rate = rate
+        self._bucket = None
+        self._bucket_lock = threading.Lock()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._clock = clock
+        # Set on bounded views: the clock() time by which every call must be done
+        self.expires_at = None
+
+    @property
+    def bucket(self):
+        # Built on first send so cold starts that never send skip the quota lookup
+        if self._bucket is None:
+            self._build_bucket(self._client)
+        return self._bucket
+
+    def _build_bucket(self, quota_client, raise_timeouts=False):
+        with self._bucket_lock:
+            if self._bucket is None:
+                rate = self._rate if self._rate is not None else get_send_rate(quota_client, raise_timeouts)
+                self._bucket = TokenBucket(rate, clock=self._clock, sleep=self._sleep)
+        return self._bucket
+
+    def bounded(self, timeout):
+        """
+        A view with the same pacing (shared token bucket) whose calls all end
+        within `timeout` seconds: each one runs on a client bounded to the time
+        left, and a send waits for a token or backs off after throttling only
+        while SES_MIN_BUDGET_MS would be left for the call; otherwise it raises
+        DeadlineExceeded. On a cold container the quota lookup is bounded too.
+        """
+        view = RateLimitedSESClient(
+            self._client, self._rate, self.max_retries, self.base_delay, self.max_delay, self._sleep, self._clock
+        )
+        view.expires_at = self._clock() + timeout
+        view._bucket = self._bucket or self._build_bucket(view._call_client(), raise_timeouts=True)
+        return view
+
+    def _call_client(self):
+        """
+        The client for the next call: the wrapped one, or on a bounded view
+        one whose timeouts fit the time left.
+        """
+        if self.expires_at is None:
+            return self._client
+        remaining = max(0.0, self.expires_at - self._clock())
+        return get_bounded_client(self._client.meta.service_model.service_name, remaining)
+
+    def _spare_seconds(self):
+        """
+        How long a bounded view may still wait before a call (None when unbounded).
+        """
+        if self.expires_at is None:
+            return None
+        return self.expires_at - self._clock() - SES_MIN_BUDGET_MS / 1000.0
+
+    def __getattr__(self, name):
+        if name not in SEND_OPERATIONS:
+            return getattr(self._call_client(), name)
+
+        def paced_call(**kwargs):
+            return self._send(name, kwargs)
+        return paced_call
+
+    def _send(self, name, kwargs):
+        tokens = count_recipients(name, kwargs)
+        attempt = 0
+        while True:
+            if self.bucket.acquire(tokens, max_wait=self._spare_seconds()) is None:
+                raise DeadlineExceeded(f'{name}: no SES send-rate token within the response budget')
+            try:
+                return getattr(self._call_client(), name)(**kwargs)
+            except ClientError as e:
+                if attempt >= self.max_retries or not is_throttling_error(e):
+                    raise
+                # Full jitter: spread retries from concurrent senders apart
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                spare = self._spare_seconds()
+                if spare is not None and delay > spare:
+                    raise DeadlineExceeded(f'{name}: SES throttled and no response budget left to retry') from e
+                print(f'SES throttled, retrying in {delay:.2f}s (attempt {attempt + 1})')
+                self._sleep(delay)
+                attempt += 1
@@ -0,0 +1,162 @@
+"""
+Raw MIME Welcome Email Sending
+
+SES SendEmail cannot set List-Unsubscribe / List-Unsubscribe-Post, so with
+one-click unsubscribe configured the welcome email goes out through
+SendRawEmail instead.
+
+Building a message with the email package for every recipient would
+re-encode the whole body each time. RawEmailTemplate does that work once
+per template: the static headers, the multipart/alternative boundaries and
+part headers, and every static segment of the HTML and text bodies are
+encoded to quoted-printable bytes up front. Quoted-printable is
+line-local, so a recipient's message is just those pre-encoded segments
+joined with the encoded slot values (name, year, unsubscribe link)
+through soft line breaks, plus the per-recipient To and List-Unsubscribe
+headers.
+"""
+
+import hashlib
+import html
+from datetime import datetime
+from email import quoprimime
+from email.header import Header
+
+from .email_templates import DEFAULT_LOCALE, welcome_template
+from .metrics import NULL_METRICS
+from .unsubscribe import list_unsubscribe_headers
+
+CRLF = '\r\n'
+
+# Joins independently encoded pieces without adding characters to the decoded body
+SOFT_BREAK = '=' + CRLF
+
+
+def encode_qp(text):
+    """
+    Quoted-printable encode a str as UTF-8 with CRLF line ends (76-char lines).
+    """
+    return quoprimime.body_encode(text.encode('utf-8').decode('latin-1'), 76, CRLF)
+
+
+class EncodedBody:
+    """
+    A CompiledTemplate (template_registry.py) whose static segments are already quoted-printable encoded.
+    """
+
+    __slots__ = ('segments', 'slots', 'escape')
+
+    def __init__(self, template, escape=None):
+        self.segments = tuple(encode_qp(segment) for segment in template.segments)
+        self.slots = template.slots
+        self.escape = escape
+
+    def render(self, values):
+        out = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values[slot]
+            out.append(encode_qp(self.escape(value) if self.escape else value))
+            out.append(segment)
+        return SOFT_BREAK.join(out)
+
+
+class RawEmailTemplate:
+    """
+    Precomputed MIME skeleton of one multipart/alternative email.
+    build() only adds the recipient's headers and slot values.
+    """
+
+    def __init__(self, subject, html_template, text_template, from_email, reply_to):
+        self.html = EncodedBody(html_template, escape=html.escape)
+        self.text = EncodedBody(text_template)
+
+        # Boundary derived from the content, so it can never occur in the encoded body
+        digest = hashlib.sha256(
+            ''.join(self.html.segments + self.text.segments).encode('ascii')
+        ).hexdigest()[:24]
+        boundary = f'=_tmq_{digest}'
+
+        self.head = CRLF.join([
+            f'From: {from_email}',
+            f'Reply-To: {reply_to}',
+            f"Subject: {Header(subject, 'utf-8').encode(linesep=CRLF)}",
+            'MIME-Version: 1.0',
+            f'Content-Type: multipart/alternative; boundary="{boundary}"',
+        ]) + CRLF
+        part_headers = 'Content-Type: {}; charset="utf-8"' + CRLF + 'Content-Transfer-Encoding: quoted-printable'
+        self.text_open = CRLF.join(['', f'--{boundary}', part_headers.format('text/plain'), '', ''])
+        self.html_open = CRLF.join(['', f'--{boundary}', part_headers.format('text/html'), '', ''])
+        self.close = CRLF.join(['', f'--{boundary}--', ''])
+
+    def build(self, to_address, values, headers=()):
+        """
+        The complete message as bytes for SendRawEmail.
+        `headers` are extra (name, value) pairs for this recipient.
+        """
+        recipient_headers = ''.join(f'{name}: {value}{CRLF}' for name, value in headers)
+        return ''.join([
+            self.head,
+            f'To: {to_address}{CRLF}',
+            recipient_headers,
+            self.text_open,
+            self.text.render(values),
+            self.html_open,
+            self.html.render(values),
+            self.close,
+        ]).encode('ascii')
+
+
+class SesRawBackend:
+    """
+    Welcome email via SES v1 SendRawEmail with List-Unsubscribe headers.
+    `get_client` is a zero-argument callable returning the (rate-limited) SES client;
+    `unsubscribe_url_for(email)` returns the recipient's signed unsubscribe link.
+    With a `timeout` (seconds), the send uses client.bounded(timeout).
+    Skeletons are built per locale on first use.
+    """
+
+    name = 'v1-raw'
+
+    def __init__(self, get_client, from_email, reply_to, unsubscribe_url_for):
+        self._get_client = get_client
+        self.from_email = from_email
+        self.reply_to = reply_to
+        self.unsubscribe_url_for = unsubscribe_url_for
+        self._templates = {}
+
+    def template(self, locale=DEFAULT_LOCALE):
+        """
+        The RawEmailTemplate for a locale, built on first use.
+        """
+        raw_template = self._templates.get(locale)
+        if raw_template is None:
+            subject, html_template, text_template = welcome_template(locale)
+            raw_template = RawEmailTemplate(subject, html_template, text_template, self.from_email, self.reply_to)
+            self._templates[locale] = raw_template
+        return raw_template
+
+    def send_welcome(self, clean_email, display_name, metrics=NULL_METRICS, timeout=None, locale=DEFAULT_LOCALE):
+        unsubscribe_url = self.unsubscribe_url_for(clean_email)
+        message = self.template(locale).build(
+            clean_email,
+            {'name': display_name, 'year': str(datetime.now().year), 'unsubscribe_url': unsubscribe_url},
+            headers=list_unsubscribe_headers(unsubscribe_url)
+        )
+        metrics.mark('Render')
+
+        client = self._get_client()
+        if timeout is not None:
+            client = client.bounded(timeout)
+        response = client.send_raw_email(
+            Source=self.from_email,
+            Destinations=[clean_email],
+            RawMessage={'Data': message},
+            Tags=[
+                {
+                    'Name': 'newsletter',
+                    'Value': 'subscription'
+                }
+            ]
+        )
+        metrics.mark('Ses')
+        return response['MessageId']
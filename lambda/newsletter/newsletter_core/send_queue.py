@@ -0,0 +1,232 @@
+"""
+Welcome Email Send Queue
+
+Lets the subscription handler accept a signup, enqueue a compact job and
+return 202 right away, while a separate consumer handler drains the jobs and
+talks to SES off the request path.
+
+Backends share one small interface (send / send_many / receive / delete / release):
+- SQSQueue: Amazon SQS, used in production (SEND_QUEUE_URL)
+- FileQueue: one JSON file per job in a directory, for local runs (SEND_QUEUE_DIR)
+- InMemoryQueue: in-process queue for tests
+"""
+
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from .aws_clients import get_client
+from .template_registry import DEFAULT_LOCALE
+
+# SQS returns at most 10 messages per ReceiveMessage call
+MAX_RECEIVE_BATCH = 10
+# ...and accepts at most 10 per SendMessageBatch call
+MAX_SEND_BATCH = 10
+
+# 'always': every signup is queued; 'overflow': signups are sent inline and
+# only queued when the response budget runs out (see deadline.py)
+SEND_QUEUE_MODE = os.environ.get('SEND_QUEUE_MODE', 'always')
+
+# Job kind of a deferred double opt-in email; jobs without a kind are welcome emails
+CONFIRMATION_JOB = 'confirm'
+
+
+def make_job(email, name, locale=DEFAULT_LOCALE, kind=None):
+    """
+    Build a compact job payload (short keys keep queue messages small; the
+    default locale and the welcome kind are left out).
+    """
+    job = {'e': email, 'n': name}
+    if locale != DEFAULT_LOCALE:
+        job['l'] = locale
+    if kind is not None:
+        job['k'] = kind
+    return job
+
+
+def encode_job(job):
+    return json.dumps(job, separators=(',', ':'))
+
+
+def decode_job(body):
+    return decode_localized_job(body)[:2]
+
+
+def decode_localized_job(body):
+    """
+    (email, name, locale) of a job; jobs queued without a locale get the default.
+    """
+    job = json.loads(body) if isinstance(body, str) else body
+    return job['e'], job.get('n') or job['e'].split('@')[0], job.get('l', DEFAULT_LOCALE)
+
+
+def job_kind(job):
+    """
+    Kind of a decoded job (CONFIRMATION_JOB), or None for a welcome email.
+    """
+    return job.get('k')
+
+
+class InMemoryQueue:
+    """
+    In-process FIFO queue. Received jobs stay in flight until deleted or released.
+    """
+
+    def __init__(self):
+        self._pending = OrderedDict()
+        self._inflight = {}
+
+    def send(self, job):
+        receipt = uuid.uuid4().hex
+        self._pending[receipt] = encode_job(job)
+        return receipt
+
+    def send_many(self, jobs):
+        for job in jobs:
+            self.send(job)
+        return len(jobs)
+
+    def receive(self, max_jobs=MAX_RECEIVE_BATCH):
+        received = []
+        while self._pending and len(received) < max_jobs:
+            receipt, body = self._pending.popitem(last=False)
+            self._inflight[receipt] = body
+            received.append((receipt, body))
+        return received
+
+    def delete(self, receipt):
+        self._inflight.pop(receipt, None)
+
+    def release(self, receipt):
+        body = self._inflight.pop(receipt, None)
+        if body is not None:
+            self._pending[receipt] = body
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class FileQueue:
+    """
+    Directory-backed queue: one JSON file per job, claimed by an atomic rename
+    so several local consumers never pick up the same job.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, job):
+        receipt = f'{time.time_ns():020d}-{uuid.uuid4().hex}'
+        tmp_path = os.path.join(self.directory, f'.{receipt}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(encode_job(job))
+        os.replace(tmp_path, os.path.join(self.directory, f'{receipt}.json'))
+        return receipt
+
+    def send_many(self, jobs):
+        for job in jobs:
+            self.send(job)
+        return len(jobs)
+
+    def receive(self, max_jobs=MAX_RECEIVE_BATCH):
+        received = []
+        for filename in sorted(os.listdir(self.directory)):
+            if len(received) >= max_jobs:
+                break
+            if not filename.endswith('.json'):
+                continue
+            receipt = filename[:-len('.json')]
+            inflight_path = os.path.join(self.directory, f'{receipt}.inflight')
+            try:
+                os.rename(os.path.join(self.directory, filename), inflight_path)
+            except FileNotFoundError:
+                continue  # claimed by another consumer
+            with open(inflight_path, encoding='utf-8') as f:
+                received.append((receipt, f.read()))
+        return received
+
+    def delete(self, receipt):
+        try:
+            os.remove(os.path.join(self.directory, f'{receipt}.inflight'))
+        except FileNotFoundError:
+            pass
+
+    def release(self, receipt):
+        try:
+            os.rename(
+                os.path.join(self.directory, f'{receipt}.inflight'),
+                os.path.join(self.directory, f'{receipt}.json')
+            )
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if name.endswith('.json'))
+
+
+class SQSQueue:
+    """
+    Amazon SQS backend. Normally drained by an SQS event source mapping, but
+    receive() allows polling when the consumer is invoked on a schedule.
+    """
+
+    def __init__(self, queue_url, sqs_client=None):
+        self.queue_url = queue_url
+        self._sqs_client = sqs_client
+
+    @property
+    def sqs_client(self):
+        if self._sqs_client is None:
+            self._sqs_client = get_client('sqs')
+        return self._sqs_client
+
+    def send(self, job):
+        response = self.sqs_client.send_message(QueueUrl=self.queue_url, MessageBody=encode_job(job))
+        return response['MessageId']
+
+    def send_many(self, jobs):
+        """
+        Enqueue jobs with SendMessageBatch (10 per call). Returns how many were accepted.
+        """
+        queued = 0
+        for start in range(0, len(jobs), MAX_SEND_BATCH):
+            entries = [
+                {'Id': str(index), 'MessageBody': encode_job(job)}
+                for index, job in enumerate(jobs[start:start + MAX_SEND_BATCH])
+            ]
+            response = self.sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            queued += len(response.get('Successful', []))
+            for failure in response.get('Failed', []):
+                print(f"SQS batch entry failed: {failure.get('Code')} - {failure.get('Message', '')}")
+        return queued
+
+    def receive(self, max_jobs=MAX_RECEIVE_BATCH):
+        response = self.sqs_client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max(1, min(max_jobs, MAX_RECEIVE_BATCH))
+        )
+        return [(message['ReceiptHandle'], message['Body']) for message in response.get('Messages', [])]
+
+    def delete(self, receipt):
+        self.sqs_client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+    def release(self, receipt):
+        self.sqs_client.change_message_visibility(
+            QueueUrl=self.queue_url, ReceiptHandle=receipt, VisibilityTimeout=0
+        )
+
+
+def create_send_queue():
+    """
+    Build the queue configured by environment variables, or None for synchronous sending.
+    """
+    queue_url = os.environ.get('SEND_QUEUE_URL', '')
+    if queue_url:
+        return SQSQueue(queue_url)
+    queue_dir = os.environ.get('SEND_QUEUE_DIR', '')
+    if queue_dir:
+        return FileQueue(queue_dir)
+    return None
@@ -0,0 +1,227 @@
+"""
+Welcome Email Sending via AWS SES
+
+Two interchangeable backends implement
+send_welcome(clean_email, display_name, metrics, timeout, locale):
+- SesV1Backend (default): renders locally and uploads the full body with SES SendEmail
+- SesV2TemplateBackend (SES_BACKEND=v2-template): SES v2 stored template; only
+  TemplateData is sent. If the template cannot be registered, the send falls
+  back to SesV1Backend.
+
+With one-click unsubscribe configured (UNSUBSCRIBE_URL), SesRawBackend
+(raw_email.py) takes the place of SesV1Backend, because only SendRawEmail
+can carry the List-Unsubscribe headers; the v2 backend sends them as
+template headers.
+"""
+
+import os
+
+from botocore.exceptions import ClientError
+
+from .aws_clients import get_single_attempt_client
+from .config import FROM_EMAIL, REPLY_TO_EMAIL, SEND_CONCURRENCY
+from .deadline import SES_MIN_BUDGET_MS, UNBOUNDED
+from .dispatcher import dispatch
+from .email_templates import DEFAULT_LOCALE, render_confirmation_email, render_welcome_email
+from .events import PROCESSING_FAILED
+from .metrics import NULL_METRICS
+from .rate_limiter import RateLimitedSESClient
+from .unsubscribe import unsubscribe_enabled, unsubscribe_url_for
+
+# SES client is created on first use (see get_ses_client) so preflights and
+# rejected requests never pay for importing boto3 on a cold start
+ses_client = None
+sesv2_client = None
+
+SES_BACKEND = os.environ.get('SES_BACKEND', 'v1')
+WELCOME_TEMPLATE_PREFIX = os.environ.get('WELCOME_TEMPLATE_PREFIX', 'tranquilmindquest-welcome')
+
+# Built on first send by get_sending_backend()
+sending_backend = None
+
+# User-facing messages for specific AWS SES errors
+SES_ERROR_MESSAGES = {
+    'MessageRejected': 'Invalid email address. Please check and try again.',
+    'MailFromDomainNotVerifiedException': 'Service temporarily unavailable. Please try again later.',
+    'ConfigurationSetDoesNotExistException': 'Service configuration error. Please contact support.',
+}
+
+
+def get_ses_client():
+    """
+    Return the module-cached SES client, creating it on first use.
+    Sends are paced to the account's SES max send rate and retried on throttling.
+    """
+    global ses_client
+    if ses_client is None:
+        ses_client = RateLimitedSESClient(get_single_attempt_client('ses'))
+    return ses_client
+
+
+def get_sesv2_client():
+    """
+    Return the module-cached SES v2 client (rate-limited like the v1 client).
+    """
+    global sesv2_client
+    if sesv2_client is None:
+        sesv2_client = RateLimitedSESClient(get_single_attempt_client('sesv2'))
+    return sesv2_client
+
+
+def ses_error_message(error_code):
+    return SES_ERROR_MESSAGES.get(error_code, PROCESSING_FAILED)
+
+
+def error_code_of(error):
+    """
+    SES error code of a failed send ('Unknown' for anything but a ClientError).
+    """
+    if isinstance(error, ClientError):
+        return error.response['Error']['Code']
+    return 'Unknown'
+
+
+def send_rendered_email(clean_email, rendered, tag_value, timeout=None):
+    """
+    Send a locally rendered RenderedEmail with SES v1 SendEmail; returns the MessageId.
+    With a `timeout` (seconds) the call runs on a client bounded to it.
+    """
+    client = get_ses_client()
+    if timeout is not None:
+        client = client.bounded(timeout)
+    response = client.send_email(
+        Source=FROM_EMAIL,
+        Destination={
+            'ToAddresses': [clean_email]
+        },
+        ReplyToAddresses=[REPLY_TO_EMAIL],
+        Message={
+            'Subject': {
+                'Data': rendered.subject,
+                'Charset': 'UTF-8'
+            },
+            'Body': {
+                'Html': {
+                    'Data': rendered.html,
+                    'Charset': 'UTF-8'
+                },
+                'Text': {
+                    'Data': rendered.text,
+                    'Charset': 'UTF-8'
+                }
+            }
+        },
+        Tags=[
+            {
+                'Name': 'newsletter',
+                'Value': tag_value
+            }
+        ]
+    )
+    return response['MessageId']
+
+
+class SesV1Backend:
+    """
+    Local rendering + SES v1 SendEmail with the full HTML and text bodies.
+    """
+
+    name = 'v1'
+
+    def send_welcome(self, clean_email, display_name, metrics=NULL_METRICS, timeout=None, locale=DEFAULT_LOCALE):
+        # Welcome email content (rendered from precompiled templates, cached per name and locale)
+        welcome = render_welcome_email(display_name, locale=locale)
+        metrics.mark('Render')
+
+        message_id = send_rendered_email(clean_email, welcome, 'subscription', timeout)
+        metrics.mark('Ses')
+        return message_id
+
+
+class FallbackBackend:
+    """
+    Uses the stored-template backend, falling back to v1 for any send where the
+    template cannot be registered. Send errors themselves are not retried on the
+    fallback, so a message is never sent twice.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = primary.name
+
+    def send_welcome(self, clean_email, display_name, metrics=NULL_METRICS, timeout=None, locale=DEFAULT_LOCALE):
+        try:
+            self.primary.ensure_template(locale, timeout)
+        except Exception as e:
+            print(f'SES template unavailable, using {self.fallback.name} backend: {str(e)}')
+            return self.fallback.send_welcome(clean_email, display_name, metrics, timeout, locale)
+        return self.primary.send_welcome(clean_email, display_name, metrics, timeout, locale)
+
+
+def create_local_backend():
+    """
+    The locally rendering backend: raw MIME when unsubscribe links are signed, else v1.
+    """
+    if unsubscribe_enabled():
+        from .raw_email import SesRawBackend
+        return SesRawBackend(get_ses_client, FROM_EMAIL, REPLY_TO_EMAIL, unsubscribe_url_for)
+    return SesV1Backend()
+
+
+def create_sending_backend(backend_name=None):
+    backend_name = backend_name or SES_BACKEND
+    if backend_name == 'v2-template':
+        from .ses_v2 import SesV2TemplateBackend
+        return FallbackBackend(
+            SesV2TemplateBackend(
+                get_sesv2_client, WELCOME_TEMPLATE_PREFIX, FROM_EMAIL, REPLY_TO_EMAIL,
+                unsubscribe_url_for if unsubscribe_enabled() else None
+            ),
+            create_local_backend()
+        )
+    return create_local_backend()
+
+
+def get_sending_backend():
+    global sending_backend
+    if sending_backend is None:
+        sending_backend = create_sending_backend()
+    return sending_backend
+
+
+def send_welcome_email(clean_email, display_name, metrics=NULL_METRICS, timeout=None, locale=DEFAULT_LOCALE):
+    """
+    Send the welcome email to one subscriber through the configured backend.
+    Returns the SES MessageId; raises ClientError on SES failures (and botocore
+    timeout errors when a `timeout` in seconds is exceeded).
+    """
+    return get_sending_backend().send_welcome(clean_email, display_name, metrics, timeout, locale)
+
+
+def send_confirmation_email(clean_email, display_name, confirm_url, metrics=NULL_METRICS, timeout=None,
+                            locale=DEFAULT_LOCALE):
+    """
+    Send the double opt-in email with its signed confirm link.
+    """
+    rendered = render_confirmation_email(display_name, confirm_url, locale=locale)
+    metrics.mark('Render')
+    message_id = send_rendered_email(clean_email, rendered, 'confirmation', timeout)
+    metrics.mark('Ses')
+    return message_id
+
+
+def send_welcome_emails(recipients, concurrency=SEND_CONCURRENCY, locale=DEFAULT_LOCALE, deadline=UNBOUNDED):
+    """
+    Send welcome emails to several (clean_email, display_name) pairs in parallel,
+    sharing one client (sends are still paced by the rate limiter).
+    Returns one (message_id, error) pair per recipient, in input order;
+    error is the exception for failed sends, otherwise None. Each send gets
+    what is left of `deadline`; one that no longer fits fails with DeadlineExceeded.
+    """
+    backend = get_sending_backend()
+
+    def send(recipient):
+        timeout = deadline.call_timeout('Ses', SES_MIN_BUDGET_MS)
+        return backend.send_welcome(recipient[0], recipient[1], timeout=timeout, locale=locale)
+    return dispatch(send, recipients, concurrency)
@@ -0,0 +1,133 @@
+"""
+SES v2 Stored-Template Sending Backend
+
+The welcome email is registered once as an SES v2 email template, and each
+send only carries `TemplateData` (name, year and unsubscribe link), so SES renders the body
+server-side. Request payloads shrink from several KB to a few hundred bytes
+and no local rendering happens on the send path.
+
+The template name ends with a hash of its content, so changing the template
+files registers a new one on the next deploy/first use rather than sending
+stale content. Each locale is its own stored template, registered the
+first time a signup in that locale is sent.
+
+With one-click unsubscribe configured, the per-recipient List-Unsubscribe
+headers go in the template's `Headers`.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+from .config import DEFAULT_UNSUBSCRIBE_URL
+from .email_templates import DEFAULT_LOCALE, ses_template_content
+from .metrics import NULL_METRICS
+from .unsubscribe import list_unsubscribe_headers
+
+
+def versioned_template_name(prefix, content):
+    digest = hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+    return f'{prefix}-{digest[:12]}'
+
+
+class SesV2TemplateBackend:
+    """
+    Sends the welcome email with SES v2 `SendEmail` and a stored template.
+    `get_client` is a zero-argument callable returning the (rate-limited) sesv2 client;
+    `unsubscribe_url_for(email)`, when given, supplies signed unsubscribe links.
+    With a `timeout` (seconds), the send uses client.bounded(timeout).
+    """
+
+    name = 'v2-template'
+
+    def __init__(self, get_client, template_prefix, from_email, reply_to, unsubscribe_url_for=None):
+        self._get_client = get_client
+        self.unsubscribe_url_for = unsubscribe_url_for
+        self.from_email = from_email
+        self.reply_to = reply_to
+        self.template_prefix = template_prefix
+        self.content = ses_template_content()
+        self.template_name = versioned_template_name(template_prefix, self.content)
+        self._names = {DEFAULT_LOCALE: self.template_name}
+        self._registered = set()
+        self._lock = threading.Lock()
+
+    def template_name_for(self, locale=DEFAULT_LOCALE):
+        template_name = self._names.get(locale)
+        if template_name is None:
+            template_name = versioned_template_name(self.template_prefix, ses_template_content(locale))
+            self._names[locale] = template_name
+        return template_name
+
+    def ensure_template(self, locale=DEFAULT_LOCALE, timeout=None):
+        """
+        Register the locale's template if SES does not have it yet (once per
+        container); returns its name. With a `timeout`, the lookup and
+        registration run on client.bounded(timeout).
+        """
+        template_name = self.template_name_for(locale)
+        if template_name in self._registered:
+            return template_name
+        with self._lock:
+            if template_name in self._registered:
+                return template_name
+            client = self._get_client()
+            if timeout is not None:
+                client = client.bounded(timeout)
+            try:
+                client.get_email_template(TemplateName=template_name)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'NotFoundException':
+                    raise
+                try:
+                    client.create_email_template(
+                        TemplateName=template_name,
+                        TemplateContent=ses_template_content(locale)
+                    )
+                    print(f'Registered SES template: {template_name}')
+                except ClientError as create_error:
+                    # Another container registered it first
+                    if create_error.response['Error']['Code'] != 'AlreadyExistsException':
+                        raise
+            self._registered.add(template_name)
+        return template_name
+
+    def send_welcome(self, clean_email, display_name, metrics=NULL_METRICS, timeout=None, locale=DEFAULT_LOCALE):
+        template_name = self.ensure_template(locale, timeout)
+        unsubscribe_url = (
+            self.unsubscribe_url_for(clean_email) if self.unsubscribe_url_for else DEFAULT_UNSUBSCRIBE_URL
+        )
+        template = {
+            'TemplateName': template_name,
+            'TemplateData': json.dumps({
+                'name': display_name, 'year': str(datetime.now().year), 'unsubscribe_url': unsubscribe_url
+            })
+        }
+        if self.unsubscribe_url_for:
+            template['Headers'] = [
+                {'Name': name, 'Value': value} for name, value in list_unsubscribe_headers(unsubscribe_url)
+            ]
+        client = self._get_client()
+        if timeout is not None:
+            client = client.bounded(timeout)
+        response = client.send_email(
+            FromEmailAddress=self.from_email,
+            Destination={
+                'ToAddresses': [clean_email]
+            },
+            ReplyToAddresses=[self.reply_to],
+            Content={
+                'Template': template
+            },
+            EmailTags=[
+                {
+                    'Name': 'newsletter',
+                    'Value': 'subscription'
+                }
+            ]
+        )
+        metrics.mark('Ses')
+        return response['MessageId']
@@ -0,0 +1,306 @@
+"""
+Subscriber Store
+
+Remembers who already subscribed, so double-clicks and client retries are
+answered without rendering or sending another welcome email.
+
+All backends expose the same conditional insert:
+- add_if_absent(email, name) -> True if the subscriber was new
+- add_many([(email, name), ...]) -> one such flag per record (bulk imports)
+- get(email) -> record dict or None
+- discard(email) -> remove (used to roll back when the welcome email fails)
+- page(after, limit) -> (records, cursor): subscribers after the `after` cursor;
+  pass the returned cursor to get the next page, None once the list is exhausted
+
+Backends:
+- InMemorySubscriberStore: per-container dict (default)
+- SQLiteSubscriberStore: local file database (SUBSCRIBER_DB_PATH)
+- DynamoDBSubscriberStore: DynamoDB table keyed on `email` (SUBSCRIBER_TABLE);
+  takes any client with the low-level put_item/get_item/delete_item API, so a
+  local stand-in can replace boto3
+
+CachedSubscriberStore puts an in-process recently-seen cache in front of a
+backend so repeat signups within the window skip the backend round trip.
+"""
+
+import bisect
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+
+from .aws_clients import get_client
+
+
+class InMemorySubscriberStore:
+    """
+    Dict-backed store; lives as long as the warm container.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def add_if_absent(self, email, name='', now=None):
+        with self._lock:
+            if email in self._records:
+                return False
+            self._records[email] = {
+                'email': email,
+                'name': name,
+                'subscribed_at': int(now if now is not None else time.time())
+            }
+            return True
+
+    def add_many(self, records, now=None):
+        return [self.add_if_absent(email, name, now) for email, name in records]
+
+    def get(self, email):
+        return self._records.get(email)
+
+    def discard(self, email):
+        with self._lock:
+            self._records.pop(email, None)
+
+    def page(self, after=None, limit=100):
+        with self._lock:
+            emails = sorted(self._records)
+            start = bisect.bisect_right(emails, after) if after is not None else 0
+            records = [self._records[email] for email in emails[start:start + limit]]
+        return records, (records[-1]['email'] if len(records) == limit else None)
+
+    def __len__(self):
+        return len(self._records)
+
+
+class SQLiteSubscriberStore:
+    """
+    SQLite-backed store; the primary key makes INSERT OR IGNORE the conditional insert.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS subscribers ('
+            'email TEXT PRIMARY KEY, name TEXT, subscribed_at INTEGER)'
+        )
+
+    def add_if_absent(self, email, name='', now=None):
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO subscribers (email, name, subscribed_at) VALUES (?, ?, ?)',
+                (email, name, int(now if now is not None else time.time()))
+            )
+            return cursor.rowcount == 1
+
+    def add_many(self, records, now=None):
+        """
+        Insert a batch in one transaction (one fsync instead of one per row).
+        """
+        subscribed_at = int(now if now is not None else time.time())
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                added = [
+                    self._conn.execute(
+                        'INSERT OR IGNORE INTO subscribers (email, name, subscribed_at) VALUES (?, ?, ?)',
+                        (email, name, subscribed_at)
+                    ).rowcount == 1
+                    for email, name in records
+                ]
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return added
+
+    def get(self, email):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT email, name, subscribed_at FROM subscribers WHERE email = ?', (email,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'email': row[0], 'name': row[1], 'subscribed_at': row[2]}
+
+    def discard(self, email):
+        with self._lock:
+            self._conn.execute('DELETE FROM subscribers WHERE email = ?', (email,))
+
+    def page(self, after=None, limit=100):
+        # Keyset pagination on the primary key: every page is an index range scan
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT email, name, subscribed_at FROM subscribers WHERE email > ? ORDER BY email LIMIT ?',
+                (after if after is not None else '', limit)
+            ).fetchall()
+        records = [{'email': row[0], 'name': row[1], 'subscribed_at': row[2]} for row in rows]
+        return records, (records[-1]['email'] if len(records) == limit else None)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM subscribers').fetchone()[0]
+
+
+class DynamoDBSubscriberStore:
+    """
+    DynamoDB-backed store using a conditional PutItem on the `email` partition key.
+    """
+
+    def __init__(self, table_name, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client('dynamodb')
+        return self._client
+
+    def add_if_absent(self, email, name='', now=None):
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'email': {'S': email},
+                    'name': {'S': name or ''},
+                    'subscribed_at': {'N': str(int(now if now is not None else time.time()))}
+                },
+                ConditionExpression='attribute_not_exists(email)'
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def add_many(self, records, now=None):
+        # BatchWriteItem cannot carry a condition, so each record stays a conditional put
+        return [self.add_if_absent(email, name, now) for email, name in records]
+
+    def get(self, email):
+        item = self.client.get_item(
+            TableName=self.table_name, Key={'email': {'S': email}}, ConsistentRead=True
+        ).get('Item')
+        if not item:
+            return None
+        return self._record(item)
+
+    @staticmethod
+    def _record(item):
+        return {
+            'email': item['email']['S'],
+            'name': item.get('name', {}).get('S', ''),
+            'subscribed_at': int(item.get('subscribed_at', {}).get('N', '0'))
+        }
+
+    def discard(self, email):
+        self.client.delete_item(TableName=self.table_name, Key={'email': {'S': email}})
+
+    def page(self, after=None, limit=100):
+        """
+        One Scan page; the cursor is the email of DynamoDB's LastEvaluatedKey.
+        """
+        request = {'TableName': self.table_name, 'Limit': limit}
+        if after is not None:
+            request['ExclusiveStartKey'] = {'email': {'S': after}}
+        response = self.client.scan(**request)
+        last_key = response.get('LastEvaluatedKey')
+        records = [self._record(item) for item in response.get('Items', [])]
+        return records, (last_key['email']['S'] if last_key else None)
+
+
+class RecentlySeenCache:
+    """
+    Bounded TTL set of recently seen keys (oldest entries evicted first).
+    """
+
+    def __init__(self, ttl_seconds=300, maxsize=10000, clock=time.monotonic):
+        self.ttl = ttl_seconds
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, key):
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is None:
+                return False
+            if expires < self._clock():
+                del self._entries[key]
+                return False
+            return True
+
+    def add(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = self._clock() + self.ttl
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class CachedSubscriberStore:
+    """
+    Recently-seen cache in front of a backend store.
+    """
+
+    def __init__(self, store, cache=None):
+        self.store = store
+        self.cache = cache if cache is not None else RecentlySeenCache()
+
+    def add_if_absent(self, email, name='', now=None):
+        if self.cache.seen(email):
+            return False
+        added = self.store.add_if_absent(email, name, now)
+        self.cache.add(email)
+        return added
+
+    def add_many(self, records, now=None):
+        added = [False] * len(records)
+        unseen = [index for index, (email, _) in enumerate(records) if not self.cache.seen(email)]
+        if unseen:
+            results = self.store.add_many([records[index] for index in unseen], now)
+            for index, result in zip(unseen, results):
+                added[index] = result
+                self.cache.add(records[index][0])
+        return added
+
+    def get(self, email):
+        return self.store.get(email)
+
+    def discard(self, email):
+        self.cache.discard(email)
+        self.store.discard(email)
+
+    def page(self, after=None, limit=100):
+        return self.store.page(after, limit)
+
+
+def create_subscriber_store():
+    """
+    Build the store configured by environment variables, wrapped in the recently-seen cache.
+    """
+    table_name = os.environ.get('SUBSCRIBER_TABLE', '')
+    db_path = os.environ.get('SUBSCRIBER_DB_PATH', '')
+    if table_name:
+        store = DynamoDBSubscriberStore(table_name)
+    elif db_path:
+        store = SQLiteSubscriberStore(db_path)
+    else:
+        store = InMemorySubscriberStore()
+
+    cache = RecentlySeenCache(
+        ttl_seconds=int(os.environ.get('DUPLICATE_WINDOW_SECONDS', '300')),
+        maxsize=int(os.environ.get('RECENTLY_SEEN_CACHE_SIZE', '10000'))
+    )
+    return CachedSubscriberStore(store, cache)
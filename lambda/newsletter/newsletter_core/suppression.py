@@ -0,0 +1,273 @@
+"""
+Suppression Index
+
+Addresses that hard-bounced or complained are recorded here from SES
+feedback notifications, and every send path checks the index first, so we
+stop paying for (and being penalized for) mail to dead or unwilling
+recipients.
+
+All backends expose the same small interface:
+- suppress_many([(email, reason), ...]) -> record a batch of addresses
+- is_suppressed(email) -> True if the address must not be mailed
+- remove(email) -> lift a suppression (manual cleanup)
+
+Backends:
+- InMemorySuppressionIndex: per-container set (default)
+- SQLiteSuppressionIndex: local file database (SUPPRESSION_DB_PATH)
+- DynamoDBSuppressionIndex: DynamoDB table keyed on `email` (SUPPRESSION_TABLE);
+  feedback batches are written with BatchWriteItem
+
+CachedSuppressionIndex keeps recent lookups (both answers) in the warm
+container, so repeat checks skip the backend round trip.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .aws_clients import get_client
+from .bulk_send import chunked
+from .email_validation import validate_email
+from .subscriber_store import RecentlySeenCache
+
+# DynamoDB accepts at most 25 items per BatchWriteItem call
+MAX_DYNAMODB_BATCH = 25
+
+
+class InMemorySuppressionIndex:
+    """
+    Dict-backed index; lives as long as the warm container.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def suppress_many(self, entries, now=None):
+        suppressed_at = int(now if now is not None else time.time())
+        with self._lock:
+            for email, reason in entries:
+                self._records[email] = {'email': email, 'reason': reason, 'suppressed_at': suppressed_at}
+
+    def is_suppressed(self, email):
+        return email in self._records
+
+    def get(self, email):
+        return self._records.get(email)
+
+    def remove(self, email):
+        with self._lock:
+            self._records.pop(email, None)
+
+    def __len__(self):
+        return len(self._records)
+
+
+class SQLiteSuppressionIndex:
+    """
+    SQLite-backed index; a feedback batch is one transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS suppressions ('
+            'email TEXT PRIMARY KEY, reason TEXT, suppressed_at INTEGER)'
+        )
+
+    def suppress_many(self, entries, now=None):
+        suppressed_at = int(now if now is not None else time.time())
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO suppressions (email, reason, suppressed_at) VALUES (?, ?, ?)',
+                    [(email, reason, suppressed_at) for email, reason in entries]
+                )
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def is_suppressed(self, email):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM suppressions WHERE email = ?', (email,)
+            ).fetchone() is not None
+
+    def get(self, email):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT email, reason, suppressed_at FROM suppressions WHERE email = ?', (email,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'email': row[0], 'reason': row[1], 'suppressed_at': row[2]}
+
+    def remove(self, email):
+        with self._lock:
+            self._conn.execute('DELETE FROM suppressions WHERE email = ?', (email,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM suppressions').fetchone()[0]
+
+
+class DynamoDBSuppressionIndex:
+    """
+    DynamoDB-backed index (partition key `email`, string).
+    """
+
+    def __init__(self, table_name, client=None):
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client('dynamodb')
+        return self._client
+
+    def suppress_many(self, entries, now=None):
+        suppressed_at = str(int(now if now is not None else time.time()))
+        # Last entry wins for an address repeated in one batch (BatchWriteItem rejects duplicate keys)
+        latest = {email: reason for email, reason in entries}
+        for batch in chunked(latest.items(), MAX_DYNAMODB_BATCH):
+            requests = [
+                {'PutRequest': {'Item': {
+                    'email': {'S': email},
+                    'reason': {'S': reason},
+                    'suppressed_at': {'N': suppressed_at}
+                }}}
+                for email, reason in batch
+            ]
+            attempt = 0
+            while requests:
+                if attempt:
+                    # Unprocessed items mean the table is throttling; back off before retrying them
+                    time.sleep(min(0.05 * 2 ** attempt, 1.0))
+                response = self.client.batch_write_item(RequestItems={self.table_name: requests})
+                requests = response.get('UnprocessedItems', {}).get(self.table_name, [])
+                attempt += 1
+
+    def is_suppressed(self, email):
+        return self.get(email) is not None
+
+    def get(self, email):
+        item = self.client.get_item(TableName=self.table_name, Key={'email': {'S': email}}).get('Item')
+        if not item:
+            return None
+        return {
+            'email': item['email']['S'],
+            'reason': item.get('reason', {}).get('S', ''),
+            'suppressed_at': int(item.get('suppressed_at', {}).get('N', '0'))
+        }
+
+    def remove(self, email):
+        self.client.delete_item(TableName=self.table_name, Key={'email': {'S': email}})
+
+
+class CachedSuppressionIndex:
+    """
+    Warm-container cache of lookups in front of a backend index. Both answers
+    are cached for `ttl_seconds`, so a suppression recorded by another container
+    is picked up within that window.
+    """
+
+    def __init__(self, index, ttl_seconds=300, maxsize=10000, clock=time.monotonic):
+        self.index = index
+        self.suppressed = RecentlySeenCache(ttl_seconds, maxsize, clock)
+        self.allowed = RecentlySeenCache(ttl_seconds, maxsize, clock)
+
+    def suppress_many(self, entries, now=None):
+        entries = list(entries)
+        self.index.suppress_many(entries, now)
+        for email, _ in entries:
+            self.allowed.discard(email)
+            self.suppressed.add(email)
+
+    def is_suppressed(self, email):
+        if self.suppressed.seen(email):
+            return True
+        if self.allowed.seen(email):
+            return False
+        suppressed = self.index.is_suppressed(email)
+        (self.suppressed if suppressed else self.allowed).add(email)
+        return suppressed
+
+    def get(self, email):
+        return self.index.get(email)
+
+    def remove(self, email):
+        self.index.remove(email)
+        self.suppressed.discard(email)
+        self.allowed.discard(email)
+
+
+def normalize_address(address):
+    """
+    Lowercased bare address, matching what validate_email stores for subscribers.
+    """
+    return validate_email(address) or address.strip().lower()
+
+
+def feedback_entries(notification):
+    """
+    Addresses to suppress from one SES notification (SNS `Message` payload):
+    permanent bounces and complaints. Transient bounces and deliveries yield nothing.
+    """
+    kind = notification.get('notificationType') or notification.get('eventType')
+    if kind == 'Bounce':
+        bounce = notification.get('bounce', {})
+        if bounce.get('bounceType') != 'Permanent':
+            return []
+        reason = f"bounce:{bounce.get('bounceSubType', 'General')}"
+        recipients = bounce.get('bouncedRecipients', [])
+    elif kind == 'Complaint':
+        complaint = notification.get('complaint', {})
+        reason = f"complaint:{complaint.get('complaintFeedbackType', 'abuse')}"
+        recipients = complaint.get('complainedRecipients', [])
+    else:
+        return []
+    return [
+        (normalize_address(recipient['emailAddress']), reason)
+        for recipient in recipients
+        if recipient.get('emailAddress')
+    ]
+
+
+def notification_from_record(record):
+    """
+    SES notification dict from an SNS record, or from an SQS record carrying an
+    SNS envelope (an SQS queue subscribed to the feedback topic).
+    """
+    if 'Sns' in record:
+        message = record['Sns']['Message']
+    else:
+        body = json.loads(record['body'])
+        message = body.get('Message', body)
+    return json.loads(message) if isinstance(message, str) else message
+
+
+def create_suppression_index():
+    """
+    Build the index configured by environment variables, wrapped in the lookup cache.
+    """
+    table_name = os.environ.get('SUPPRESSION_TABLE', '')
+    db_path = os.environ.get('SUPPRESSION_DB_PATH', '')
+    if table_name:
+        index = DynamoDBSuppressionIndex(table_name)
+    elif db_path:
+        index = SQLiteSuppressionIndex(db_path)
+    else:
+        index = InMemorySuppressionIndex()
+
+    return CachedSuppressionIndex(
+        index,
+        ttl_seconds=int(os.environ.get('SUPPRESSION_CACHE_SECONDS', '300')),
+        maxsize=int(os.environ.get('SUPPRESSION_CACHE_SIZE', '10000'))
+    )
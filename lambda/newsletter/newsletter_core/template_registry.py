@@ -0,0 +1,371 @@
+"""
+Email Template Registry
+
+Email bodies are files in TEMPLATE_DIR (the templates/ directory next to
+this module by default), one pair per template name and locale:
+
+    welcome.en.html / welcome.en.txt
+    welcome.es.html / welcome.es.txt
+
+manifest.json in the same directory holds the subject per name and locale.
+An entry may name another template's `body` to reuse its files, so an A/B
+subject line or a campaign variant is one manifest entry, not a copy of
+the bodies:
+
+    "welcome_b": {"body": "welcome", "subject": {"en": "..."}}
+
+A variant (name, locale) is compiled on first use and kept for the life of
+the container. Compiling inlines the HTML stylesheets (<style> blocks and
+<link rel="stylesheet"> files from the template directory) into style
+attributes, since many mail clients ignore <style>, and splits both bodies
+into CompiledTemplate segments. Rules that cannot be inlined (@media,
+pseudo-classes, other combinators) stay in a <style> block in the head. A
+render never touches the CSS again.
+
+negotiate_locale() picks the best available locale for an Accept-Language
+header: by q-value, then by primary language subtag (es-MX -> es), else
+DEFAULT_LOCALE.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from html.parser import HTMLParser
+
+DEFAULT_LOCALE = 'en'
+TEMPLATE_DIR = os.environ.get('TEMPLATE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Longer Accept-Language headers are cut before parsing (they are client-controlled)
+MAX_ACCEPT_LANGUAGE = 200
+
+# Slots are written as {name} / {year} / {unsubscribe_url}; CSS braces are left untouched
+_SLOT_PATTERN = re.compile(r'\{([a-z_]+)\}')
+
+Variant = namedtuple('Variant', ['subject', 'html', 'text'])
+
+
+class CompiledTemplate:
+    """
+    A template split into alternating static segments and slot names.
+    """
+
+    __slots__ = ('segments', 'slots')
+
+    def __init__(self, source):
+        parts = _SLOT_PATTERN.split(source)
+        self.segments = tuple(parts[0::2])
+        self.slots = tuple(parts[1::2])
+
+    def render(self, values):
+        """
+        Join static segments with the slot values, in template order.
+        """
+        out = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            out.append(values[slot])
+            out.append(segment)
+        return ''.join(out)
+
+
+class TemplateRegistry:
+    """
+    Loads and compiles template variants from a directory, once per container.
+    """
+
+    def __init__(self, directory=TEMPLATE_DIR):
+        self.directory = directory
+        self._manifest = None
+        self._locales = {}
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            with open(os.path.join(self.directory, 'manifest.json'), encoding='utf-8') as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    def locales(self, name):
+        """
+        Locales with a subject and both body files for `name`, as a tuple.
+        """
+        locales = self._locales.get(name)
+        if locales is None:
+            entry = self.manifest[name]
+            body = entry.get('body', name)
+            locales = self._locales[name] = tuple(
+                locale for locale in entry['subject']
+                if all(os.path.exists(self._path(f'{body}.{locale}.{ext}')) for ext in ('html', 'txt'))
+            )
+        return locales
+
+    def variant(self, name, locale=DEFAULT_LOCALE):
+        """
+        The compiled Variant(subject, html, text) of `name` for a locale; an
+        unavailable locale falls back to its primary language, then DEFAULT_LOCALE.
+        Raises KeyError for an unknown name.
+        """
+        variant = self._variants.get((name, locale))
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get((name, locale))
+                if variant is None:
+                    resolved = negotiate_locale(locale, self.locales(name))
+                    variant = self._variants.get((name, resolved)) or self._compile(name, resolved)
+                    self._variants[(name, resolved)] = self._variants[(name, locale)] = variant
+        return variant
+
+    def select_locale(self, name, accept_language):
+        """
+        Best locale of `name` for a request's Accept-Language header.
+        """
+        return negotiate_locale(accept_language, self.locales(name))
+
+    def clear(self):
+        """
+        Forget compiled variants (after template files change).
+        """
+        with self._lock:
+            self._manifest = None
+            self._locales.clear()
+            self._variants.clear()
+
+    def _compile(self, name, locale):
+        entry = self.manifest[name]
+        body = entry.get('body', name)
+        html_source = self.read(f'{body}.{locale}.html')
+        return Variant(
+            subject=entry['subject'][locale],
+            html=CompiledTemplate(inline_css(html_source, self.read)),
+            text=CompiledTemplate(self.read(f'{body}.{locale}.txt')),
+        )
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def read(self, filename):
+        """
+        Text of a file in the template directory (a bare file name; any path is dropped).
+        """
+        with open(self._path(os.path.basename(filename)), encoding='utf-8') as f:
+            return f.read()
+
+
+@lru_cache(maxsize=256)
+def negotiate_locale(accept_language, available, default=DEFAULT_LOCALE):
+    """
+    Best match in `available` (a tuple of lower-case locales) for an
+    Accept-Language header, or `default`.
+    """
+    if not accept_language:
+        return default
+    ranges = []
+    for position, item in enumerate(accept_language[:MAX_ACCEPT_LANGUAGE].split(',')):
+        tag, _, params = item.partition(';')
+        tag = tag.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if tag and quality > 0:
+            ranges.append((-quality, position, tag))
+
+    for _, _, tag in sorted(ranges):
+        if tag == '*':
+            return default
+        if tag in available:
+            return tag
+        primary = tag.split('-', 1)[0]
+        if primary in available:
+            return primary
+    return default
+
+
+# --- CSS inlining (compile time only) ---
+
+_STYLE_BLOCK = re.compile(r'[ \t]*<style\b[^>]*>(.*?)</style>[ \t]*\n?', re.S | re.I)
+_STYLESHEET_LINK = re.compile(r'[ \t]*<link\b[^>]*\brel=["\']?stylesheet\b[^>]*>[ \t]*\n?', re.I)
+_HREF = re.compile(r'\bhref=["\']([^"\']+)["\']', re.I)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+# A compound selector the inliner understands: tag, .class, tag.class, .a.b
+_COMPOUND = re.compile(r'^([a-z][a-z0-9]*)?((?:\.[\w-]+)*)$', re.I)
+
+_VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'
+))
+
+CssRule = namedtuple('CssRule', ['specificity', 'order', 'compounds', 'declarations'])
+
+
+def parse_declarations(text):
+    """
+    'a: 1; b: 2' -> [('a', '1'), ('b', '2')]
+    """
+    declarations = []
+    for item in text.split(';'):
+        prop, colon, value = item.partition(':')
+        if colon and prop.strip() and value.strip():
+            declarations.append((prop.strip().lower(), value.strip()))
+    return declarations
+
+
+def _parse_selector(selector):
+    compounds = []
+    for part in selector.split():
+        match = _COMPOUND.match(part)
+        if match is None or not part:
+            return None
+        tag, classes = match.groups()
+        compounds.append(((tag or '').lower(), frozenset(classes.split('.')[1:])))
+    return compounds or None
+
+
+def _block_end(css, open_brace):
+    depth = 0
+    for index in range(open_brace, len(css)):
+        if css[index] == '{':
+            depth += 1
+        elif css[index] == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(css)
+
+
+def parse_stylesheet(css):
+    """
+    Split CSS into inlinable CssRules and the CSS text that has to stay in a
+    <style> block (at-rules and selectors the inliner does not understand).
+    """
+    css = _CSS_COMMENT.sub('', css)
+    rules, kept = [], []
+    position = 0
+    while True:
+        open_brace = css.find('{', position)
+        if open_brace < 0:
+            break
+        prelude = css[position:open_brace].strip()
+        close_brace = _block_end(css, open_brace)
+        body = css[open_brace + 1:close_brace]
+        position = close_brace + 1
+        if prelude.startswith('@'):
+            kept.append(f'{prelude} {{{body.rstrip()}\n}}')
+            continue
+        declarations = parse_declarations(body)
+        for selector in prelude.split(','):
+            compounds = _parse_selector(selector.strip())
+            if compounds is None:
+                kept.append(f'{selector.strip()} {{ {body.strip()} }}')
+                continue
+            specificity = (sum(len(classes) for _, classes in compounds), sum(1 for tag, _ in compounds if tag))
+            rules.append(CssRule(specificity, len(rules), compounds, declarations))
+    rules.sort(key=lambda rule: (rule.specificity, rule.order))
+    return rules, '\n'.join(kept)
+
+
+def _compound_matches(compound, element):
+    tag, classes = compound
+    return (not tag or tag == element[0]) and classes <= element[1]
+
+
+def _selector_matches(compounds, element, ancestors):
+    if not _compound_matches(compounds[-1], element):
+        return False
+    index = len(ancestors) - 1
+    for compound in reversed(compounds[:-1]):
+        while index >= 0 and not _compound_matches(compound, ancestors[index]):
+            index -= 1
+        if index < 0:
+            return False
+        index -= 1
+    return True
+
+
+def _attribute(name, value):
+    if value is None:
+        return f' {name}'
+    return ' {}="{}"'.format(name, value.replace('&', '&amp;').replace('"', '&quot;'))
+
+
+class _StyleInliner(HTMLParser):
+    """
+    Records, for every start tag matched by a rule, the tag rewritten with
+    the merged style attribute. Declarations already inline win.
+    """
+
+    def __init__(self, rules):
+        super().__init__(convert_charrefs=False)
+        self.rules = rules
+        self.ancestors = []
+        self.edits = []
+
+    def handle_starttag(self, tag, attrs):
+        self._element(tag, attrs, tag in _VOID_ELEMENTS)
+
+    def handle_startendtag(self, tag, attrs):
+        self._element(tag, attrs, True)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.ancestors) - 1, -1, -1):
+            if self.ancestors[index][0] == tag:
+                del self.ancestors[index:]
+                break
+
+    def _element(self, tag, attrs, void):
+        attributes = dict(attrs)
+        element = (tag, frozenset((attributes.get('class') or '').split()))
+        styles = {}
+        for rule in self.rules:
+            if _selector_matches(rule.compounds, element, self.ancestors):
+                styles.update(rule.declarations)
+        if styles:
+            styles.update(parse_declarations(attributes.get('style') or ''))
+            attributes['style'] = '; '.join(f'{prop}: {value}' for prop, value in styles.items()) + ';'
+            closing = '/>' if self.get_starttag_text().endswith('/>') else '>'
+            rewritten = f'<{tag}' + ''.join(_attribute(name, value) for name, value in attributes.items()) + closing
+            self.edits.append((self.getpos(), self.get_starttag_text(), rewritten))
+        if not void:
+            self.ancestors.append(element)
+
+
+def inline_css(source, read_stylesheet):
+    """
+    Move the stylesheets of an HTML document into style attributes.
+    `read_stylesheet(href)` returns the text of a linked stylesheet.
+    """
+    css = []
+
+    def collect_link(match):
+        href = _HREF.search(match.group(0))
+        if href is not None:
+            css.append(read_stylesheet(href.group(1)))
+        return '\0'
+
+    def collect_block(match):
+        css.append(match.group(1))
+        return '\0'
+
+    source = _STYLE_BLOCK.sub(collect_block, _STYLESHEET_LINK.sub(collect_link, source))
+    if not css:
+        return source
+    rules, kept = parse_stylesheet('\n'.join(css))
+    style = f'    <style>\n{kept}\n    </style>\n' if kept else ''
+    source = source.replace('\0', style, 1).replace('\0', '')
+
+    inliner = _StyleInliner(rules)
+    inliner.feed(source)
+    inliner.close()
+    line_starts = [0]
+    for line in source.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    for (line, column), original, rewritten in reversed(inliner.edits):
+        offset = line_starts[line - 1] + column
+        source = source[:offset] + rewritten + source[offset + len(original):]
+    return source
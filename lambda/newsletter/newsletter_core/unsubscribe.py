@@ -0,0 +1,119 @@
+"""
+One-Click Unsubscribe
+
+Every welcome email carries a per-recipient unsubscribe link signed like
+the confirm links (see tokens.py), both in the footer and in the
+List-Unsubscribe header, plus List-Unsubscribe-Post for RFC 8058 one-click
+unsubscribes from the mail client.
+
+The /unsubscribe route verifies the token in memory:
+- POST (the mail client's one-click request, or the button on our page)
+  records the address in the suppression index with reason 'unsubscribe'
+  and drops it from the subscriber store, one keyed write each.
+- GET (the footer link) only shows a page with that button, so link
+  scanners that prefetch URLs never unsubscribe anyone.
+
+Unsubscribe tokens do not expire: the link must keep working for as long
+as the email sits in the inbox.
+"""
+
+import html
+from urllib.parse import quote
+
+from .config import DEFAULT_UNSUBSCRIBE_URL, UNSUBSCRIBE_TOKEN_SECRETS, UNSUBSCRIBE_URL
+from .confirmation import HTML_HEADERS, html_page
+from .events import raw_response
+from .tokens import sign_claims, verify_claims
+
+TOKEN_PURPOSE = 'unsubscribe'
+
+# Suppression reason recorded for unsubscribes (the address may sign up again)
+UNSUBSCRIBE_REASON = 'unsubscribe'
+
+ONE_CLICK_POST = 'List-Unsubscribe=One-Click'
+
+
+def unsubscribe_enabled():
+    """
+    Signed unsubscribe links need both a secret and the public route URL.
+    """
+    return bool(UNSUBSCRIBE_TOKEN_SECRETS and UNSUBSCRIBE_URL)
+
+
+def create_unsubscribe_token(clean_email, secret=None):
+    secret = secret if secret is not None else UNSUBSCRIBE_TOKEN_SECRETS[0]
+    return sign_claims(TOKEN_PURPOSE, [clean_email], secret)
+
+
+def verify_unsubscribe_token(token, secrets=None):
+    """
+    Return the address of a valid unsubscribe token, otherwise None.
+    """
+    claims = verify_claims(TOKEN_PURPOSE, token, secrets if secrets is not None else UNSUBSCRIBE_TOKEN_SECRETS)
+    if claims is None or len(claims) != 1:
+        return None
+    return claims[0]
+
+
+def unsubscribe_url_for(clean_email):
+    """
+    The recipient's signed unsubscribe link, or the static footer link when not configured.
+    """
+    if not unsubscribe_enabled():
+        return DEFAULT_UNSUBSCRIBE_URL
+    separator = '&' if '?' in UNSUBSCRIBE_URL else '?'
+    return f'{UNSUBSCRIBE_URL}{separator}token={quote(create_unsubscribe_token(clean_email))}'
+
+
+def list_unsubscribe_headers(unsubscribe_url):
+    """
+    RFC 2369 / RFC 8058 headers for one recipient, as (name, value) pairs.
+    """
+    return [
+        ('List-Unsubscribe', f'<{unsubscribe_url}>'),
+        ('List-Unsubscribe-Post', ONE_CLICK_POST),
+    ]
+
+
+def is_unsubscribe_route(event):
+    """
+    True for requests to the /unsubscribe resource (REST or HTTP API events).
+    """
+    path = event.get('path') or event.get('rawPath') or ''
+    return path.rstrip('/').endswith('/unsubscribe')
+
+
+# Result pages of the unsubscribe route, built once
+PAGES = {
+    'unsubscribed': (200, html_page(
+        'You have been unsubscribed',
+        "You won't receive any more emails from us. You can sign up again at any time."
+    )),
+    'invalid': (400, html_page('Link invalid', 'This unsubscribe link is not valid. Please use the link from our latest email.')),
+    'error': (500, html_page('Something went wrong', 'We could not process your request. Please try the link again later.')),
+}
+
+
+def unsubscribe_response(outcome):
+    status_code, page = PAGES[outcome]
+    return raw_response(status_code, HTML_HEADERS, page)
+
+
+def unsubscribe_form_response(clean_email, token):
+    """
+    GET page: names the address and POSTs the one-click form back to the same route.
+    """
+    action = html.escape(f'?token={quote(token)}')
+    form = (
+        f'<form method="post" action="{action}">'
+        f'<input type="hidden" name="List-Unsubscribe" value="One-Click">'
+        '<button type="submit" style="padding: 14px 32px; background: #667eea; color: #ffffff; '
+        'border: 0; border-radius: 6px; font-weight: 600; font-size: 16px; cursor: pointer;">'
+        'Unsubscribe</button></form>'
+    )
+    page = html_page(
+        'Unsubscribe from TranquilMindQuest',
+        f'Stop sending the wellness newsletter to <strong>{html.escape(clean_email)}</strong>?',
+        form
+    )
+    return raw_response(200, HTML_HEADERS, page)
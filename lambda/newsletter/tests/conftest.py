@@ -0,0 +1,380 @@
+"""
+Shared pytest fixtures for the newsletter Lambda function tests.
+
+The function folder is the Lambda deployment package, so its modules are
+imported by adding the folder to sys.path rather than installing anything.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from decimal import Decimal
+
+import pytest
+from botocore.exceptions import ClientError
+
+FUNCTION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(FUNCTION_DIR, 'benchmarks')
+for path in (BENCHMARKS_DIR, FUNCTION_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-south-1')
+
+ALLOWED_ORIGIN = 'https://tranquilmindquest.com'
+
+
+def make_event(method='POST', body=None, origin=ALLOWED_ORIGIN, **extra):
+    """
+    Build a minimal API Gateway proxy event.
+    """
+    event = {
+        'httpMethod': method,
+        'headers': {'origin': origin} if origin else {},
+        'body': json.dumps(body) if isinstance(body, dict) else body,
+    }
+    event.update(extra)
+    return event
+
+
+class StubSESClient:
+    """
+    Records SES calls and returns fake message ids.
+    Set `error` to a botocore ClientError to make every call fail.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.raw_calls = []
+        self.bulk_calls = []
+        self.error = None
+
+    def send_email(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        return {'MessageId': f'stub-{len(self.calls)}'}
+
+    def send_raw_email(self, **kwargs):
+        self.raw_calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        return {'MessageId': f'raw-{len(self.raw_calls)}'}
+
+    def send_bulk_templated_email(self, **kwargs):
+        self.bulk_calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        return {'Status': [
+            {'Status': 'Success', 'MessageId': f'bulk-{len(self.bulk_calls)}-{i}'}
+            for i, _ in enumerate(kwargs['Destinations'])
+        ]}
+
+
+# DynamoDB reserved words that are plausible attribute names (the full list has 573);
+# an expression has to refer to these through a #name placeholder
+DYNAMODB_RESERVED_WORDS = frozenset((
+    'action', 'all', 'between', 'by', 'comment', 'count', 'cursor', 'data', 'date', 'day', 'domain', 'exists',
+    'from', 'group', 'hash', 'index', 'item', 'key', 'keys', 'level', 'limit', 'list', 'location', 'map', 'name',
+    'null', 'number', 'order', 'owner', 'path', 'percent', 'range', 'region', 'size', 'source', 'state', 'status',
+    'string', 'table', 'time', 'timestamp', 'ttl', 'type', 'update', 'user', 'value', 'values', 'view', 'year',
+    'zone',
+))
+
+_EXPRESSION_TOKEN = re.compile(r'\s*(<>|<=|>=|[=<>(),+]|[#:]?[A-Za-z_]\w*)')
+
+
+def validation_error(message):
+    return ClientError({'Error': {'Code': 'ValidationException', 'Message': message}}, 'DynamoDB')
+
+
+def _number_or_string(value):
+    return Decimal(value['N']) if 'N' in value else next(iter(value.values()))
+
+
+class _Expression:
+    """
+    Evaluates the subset of condition and update expressions the backends use:
+    comparisons, AND / OR / NOT, attribute_exists / attribute_not_exists,
+    SET (with if_not_exists), ADD on numbers and REMOVE.
+    """
+
+    def __init__(self, text, names, values):
+        self.tokens = []
+        position = 0
+        while position < len(text.rstrip()):
+            match = _EXPRESSION_TOKEN.match(text, position)
+            if match is None:
+                raise validation_error(f'Invalid expression: {text}')
+            self.tokens.append(match.group(1))
+            position = match.end()
+        self.index = 0
+        self.names = names or {}
+        self.values = values or {}
+        self.used = set()
+
+    def peek(self, *expected):
+        token = self.tokens[self.index] if self.index < len(self.tokens) else None
+        return token if not expected or (token or '').upper() in expected else None
+
+    def take(self, *expected):
+        token = self.peek(*expected)
+        if token is None:
+            raise validation_error(f"Syntax error near token {self.index} of {' '.join(self.tokens)}")
+        self.index += 1
+        return token
+
+    def path(self):
+        token = self.take()
+        if token.startswith('#'):
+            if token not in self.names:
+                raise validation_error(f'An expression attribute name used in the document path is not defined: {token}')
+            self.used.add(token)
+            return self.names[token]
+        if token.lower() in DYNAMODB_RESERVED_WORDS:
+            raise validation_error(f'Attribute name is a reserved keyword; reserved keyword: {token}')
+        return token
+
+    def value(self, item):
+        if self.peek().startswith(':'):
+            token = self.take()
+            if token not in self.values:
+                raise validation_error(f'An expression attribute value used in expression is not defined: {token}')
+            self.used.add(token)
+            return self.values[token]
+        if self.peek().lower() == 'if_not_exists':
+            self.take()
+            self.take('(')
+            name = self.path()
+            self.take(',')
+            default = self.value(item)
+            self.take(')')
+            return item.get(name, default)
+        return item.get(self.path())
+
+    def condition(self, item):
+        result = self.conjunction(item)
+        while self.peek('OR'):
+            self.take()
+            result = self.conjunction(item) or result
+        return result
+
+    def conjunction(self, item):
+        result = self.comparison(item)
+        while self.peek('AND'):
+            self.take()
+            result = self.comparison(item) and result
+        return result
+
+    def comparison(self, item):
+        if self.peek('NOT'):
+            self.take()
+            return not self.comparison(item)
+        if self.peek('('):
+            self.take()
+            result = self.condition(item)
+            self.take(')')
+            return result
+        if self.peek('ATTRIBUTE_EXISTS', 'ATTRIBUTE_NOT_EXISTS'):
+            exists = self.take().lower() == 'attribute_exists'
+            self.take('(')
+            name = self.path()
+            self.take(')')
+            return (name in item) == exists
+        left = self.value(item)
+        operator = self.take('=', '<>', '<', '<=', '>', '>=')
+        right = self.value(item)
+        if left is None or right is None:
+            return False
+        left, right = _number_or_string(left), _number_or_string(right)
+        return {
+            '=': left == right, '<>': left != right, '<': left < right,
+            '<=': left <= right, '>': left > right, '>=': left >= right,
+        }[operator]
+
+    def update(self, item):
+        touched = []
+        while self.peek() is not None:
+            action = self.take('SET', 'ADD', 'REMOVE').upper()
+            while True:
+                name = self.path()
+                if action == 'SET':
+                    self.take('=')
+                    item[name] = self.value(item)
+                elif action == 'ADD':
+                    amount = _number_or_string(self.value(item))
+                    item[name] = {'N': str(_number_or_string(item.get(name, {'N': '0'})) + amount)}
+                else:
+                    item.pop(name, None)
+                touched.append(name)
+                if not self.peek(','):
+                    break
+                self.take()
+        return touched
+
+    def projection(self):
+        self.path()
+        while self.peek(','):
+            self.take()
+            self.path()
+
+    def finish(self):
+        if self.peek() is not None:
+            raise validation_error(f"Syntax error near token {self.index} of {' '.join(self.tokens)}")
+
+
+class LocalDynamoDB:
+    """
+    In-memory stand-in for the low-level DynamoDB client, shared by the backend
+    tests: one table whose partition key is `key`. Condition and update
+    expressions are evaluated rather than matched as strings, and like DynamoDB
+    the fake answers ValidationException for a reserved word used without a
+    #name placeholder, an undefined placeholder, or an unused one.
+    Every call is recorded in `requests` as (operation, kwargs).
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.items = {}
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def count(self, operation):
+        return sum(1 for name, _ in self.requests if name == operation)
+
+    def _apply(self, operation, kwargs, item, key=None):
+        """
+        Check the request's expressions against `item` (empty when there is
+        none) and apply its update expression to it, creating the item from
+        `key` when needed; returns the names the update touched.
+        """
+        names, values = kwargs.get('ExpressionAttributeNames'), kwargs.get('ExpressionAttributeValues')
+        used, touched = set(), []
+        for expression_key in ('ProjectionExpression', 'ConditionExpression', 'UpdateExpression'):
+            if not kwargs.get(expression_key):
+                continue
+            expression = _Expression(kwargs[expression_key], names, values)
+            if expression_key == 'ProjectionExpression':
+                expression.projection()
+            elif expression_key == 'UpdateExpression':
+                item.update(item or key)
+                touched = expression.update(item)
+            elif not expression.condition(item):
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException',
+                                             'Message': 'The conditional request failed'}}, operation)
+            expression.finish()
+            used |= expression.used
+        unused = (set(names or ()) | set(values or ())) - used
+        if unused:
+            raise validation_error(f'Value provided in ExpressionAttributeNames or Values unused in expressions: '
+                                   f'{sorted(unused)}')
+        return touched
+
+    def put_item(self, TableName, Item, **kwargs):
+        self.requests.append(('put_item', dict(kwargs, Item=Item)))
+        with self._lock:
+            key = Item[self.key]['S']
+            self._apply('PutItem', kwargs, dict(self.items.get(key, {})))
+            self.items[key] = dict(Item)
+        return {}
+
+    def get_item(self, TableName, Key, ConsistentRead=False, **kwargs):
+        self.requests.append(('get_item', dict(kwargs, Key=Key)))
+        self._apply('GetItem', kwargs, {})
+        item = self.items.get(Key[self.key]['S'])
+        return {'Item': dict(item)} if item else {}
+
+    def update_item(self, TableName, Key, ReturnValues='NONE', **kwargs):
+        self.requests.append(('update_item', dict(kwargs, Key=Key)))
+        with self._lock:
+            key = Key[self.key]['S']
+            item = dict(self.items.get(key, {}))
+            touched = self._apply('UpdateItem', kwargs, item, Key)
+            self.items[key] = item
+        if ReturnValues == 'UPDATED_NEW':
+            return {'Attributes': {name: item[name] for name in touched if name in item}}
+        if ReturnValues == 'ALL_NEW':
+            return {'Attributes': dict(item)}
+        return {}
+
+    def delete_item(self, TableName, Key, **kwargs):
+        self.requests.append(('delete_item', dict(kwargs, Key=Key)))
+        with self._lock:
+            key = Key[self.key]['S']
+            self._apply('DeleteItem', kwargs, dict(self.items.get(key, {})))
+            self.items.pop(key, None)
+        return {}
+
+    def batch_write_item(self, RequestItems):
+        self.requests.append(('batch_write_item', {'RequestItems': RequestItems}))
+        [(table, requests)] = RequestItems.items()
+        if len(requests) > 25:
+            raise validation_error('Too many items requested for the BatchWriteItem call')
+        with self._lock:
+            for request in requests:
+                if 'PutRequest' in request:
+                    item = request['PutRequest']['Item']
+                    self.items[item[self.key]['S']] = dict(item)
+                else:
+                    self.items.pop(request['DeleteRequest']['Key'][self.key]['S'], None)
+        return {'UnprocessedItems': {}}
+
+    def scan(self, TableName, Limit=None, ExclusiveStartKey=None, **kwargs):
+        self.requests.append(('scan', dict(kwargs, Limit=Limit, ExclusiveStartKey=ExclusiveStartKey)))
+        self._apply('Scan', kwargs, {})
+        keys = sorted(self.items)
+        if ExclusiveStartKey:
+            keys = [key for key in keys if key > ExclusiveStartKey[self.key]['S']]
+        page = keys[:Limit] if Limit else keys
+        response = {'Items': [dict(self.items[key]) for key in page]}
+        if len(keys) > len(page):
+            response['LastEvaluatedKey'] = {self.key: {'S': page[-1]}}
+        return response
+
+
+@pytest.fixture
+def stub_ses(monkeypatch):
+    from newsletter_core import sending
+    stub = StubSESClient()
+    monkeypatch.setattr(sending, 'ses_client', stub)
+    return stub
+
+
+@pytest.fixture(autouse=True)
+def fresh_subscriber_store(monkeypatch):
+    """
+    Give every test an empty subscriber store so signups are never treated as duplicates.
+    """
+    from newsletter_core import handlers
+    from newsletter_core.subscriber_store import CachedSubscriberStore, InMemorySubscriberStore
+    store = CachedSubscriberStore(InMemorySubscriberStore())
+    monkeypatch.setattr(handlers, 'subscriber_store', store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def fresh_suppression_index(monkeypatch):
+    """
+    Give every test an empty suppression index.
+    """
+    from newsletter_core import handlers
+    from newsletter_core.suppression import CachedSuppressionIndex, InMemorySuppressionIndex
+    index = CachedSuppressionIndex(InMemorySuppressionIndex())
+    monkeypatch.setattr(handlers, 'suppression_index', index)
+    return index
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    """
+    Give every test fresh per-IP and per-domain limiters (default limits, no shared store).
+    """
+    from newsletter_core import handlers
+    from newsletter_core.abuse_limiter import SlidingWindowLimiter
+    ip_limiter = SlidingWindowLimiter(10, 60)
+    domain_limiter = SlidingWindowLimiter(50, 60)
+    monkeypatch.setattr(handlers, 'ip_limiter', ip_limiter)
+    monkeypatch.setattr(handlers, 'domain_limiter', domain_limiter)
+    return ip_limiter, domain_limiter
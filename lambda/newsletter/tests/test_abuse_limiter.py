@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from conftest import LocalDynamoDB, make_event
+from lambda_function import lambda_handler
+from newsletter_core import handlers
+from newsletter_core.abuse_limiter import (
+    DynamoDBWindowStore,
+    InMemoryWindowStore,
+    SlidingWindowLimiter,
+    SQLiteWindowStore,
+)
+from newsletter_core.events import get_source_ip
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def api_event(body, ip='203.0.113.7'):
+    return make_event(body=body, requestContext={'identity': {'sourceIp': ip}})
+
+
+def test_source_ip_from_rest_and_http_api_events():
+    assert get_source_ip({'requestContext': {'identity': {'sourceIp': '1.2.3.4'}}}) == '1.2.3.4'
+    assert get_source_ip({'requestContext': {'http': {'sourceIp': '5.6.7.8'}}}) == '5.6.7.8'
+    assert get_source_ip({}) == ''
+
+
+def test_limit_within_one_window_then_recovery():
+    clock = FakeClock(1200.0)
+    limiter = SlidingWindowLimiter(3, 60, clock=clock)
+
+    assert [limiter.hit('k') for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit('other')
+
+    # Half way through the next window, half of the previous count still weighs in
+    clock.now += 90
+    assert limiter.hit('k')
+    clock.now += 120
+    assert all(limiter.hit('k') for _ in range(3))
+
+
+def test_in_memory_store_is_bounded():
+    store = InMemoryWindowStore(maxsize=2)
+    for key in ('a', 'b', 'c'):
+        store.increment(key, 1)
+    assert len(store) == 2
+
+
+@pytest.mark.parametrize('make_store', [
+    lambda tmp_path: SQLiteWindowStore(str(tmp_path / 'limits.db')),
+    lambda tmp_path: DynamoDBWindowStore('limits', 60, client=LocalDynamoDB('pk')),
+])
+def test_shared_store_counts_across_containers(tmp_path, make_store):
+    shared = make_store(tmp_path)
+    clock = FakeClock(1200.0)
+    # Two containers, each with its own local tier, sharing one store
+    first = SlidingWindowLimiter(4, 60, shared=shared, clock=clock)
+    second = SlidingWindowLimiter(4, 60, shared=shared, clock=clock)
+
+    assert [first.hit('ip:x'), second.hit('ip:x'), first.hit('ip:x'), second.hit('ip:x')] == [True] * 4
+    assert not first.hit('ip:x')
+    assert shared.increment('ip:x', 20, 0) == (5, 0)
+    assert shared.increment('ip:x', 21, 0) == (0, 5)
+
+
+def test_dynamodb_previous_window_is_read_once():
+    client = LocalDynamoDB('pk')
+    store = DynamoDBWindowStore('limits', 60, client=client)
+    for _ in range(5):
+        store.increment('ip:x', 7)
+    assert client.count('get_item') == 1
+
+
+def test_ip_limit_returns_429_before_any_ses_work(stub_ses):
+    responses = [
+        lambda_handler(api_event({'email': f'user{i}@example.com'}), None)['statusCode']
+        for i in range(12)
+    ]
+
+    assert responses == [200] * 10 + [429] * 2
+    assert len(stub_ses.calls) == 10
+    rejected = lambda_handler(api_event({'email': 'late@example.com'}), None)
+    assert rejected['headers']['Retry-After'] == '60'
+    assert json.loads(rejected['body'])['success'] is False
+    # Another client is unaffected
+    assert lambda_handler(api_event({'email': 'other@example.com'}, ip='198.51.100.1'), None)['statusCode'] == 200
+
+
+def test_domain_limit_spans_clients(stub_ses, monkeypatch):
+    monkeypatch.setattr(handlers, 'domain_limiter', SlidingWindowLimiter(2, 60))
+    statuses = [
+        lambda_handler(api_event({'email': f'user{i}@spam.test'}, ip=f'198.51.100.{i}'), None)['statusCode']
+        for i in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+    assert len(stub_ses.calls) == 2
+
+
+def test_batch_counts_once_against_ip_limit(stub_ses, fresh_limiters):
+    ip_limiter, _ = fresh_limiters
+    response = lambda_handler(api_event({'subscriptions': [f'u{i}@example.com' for i in range(11)]}), None)
+
+    assert response['statusCode'] == 200
+    assert len(stub_ses.calls) == 11
+    # The batch used one of the client's ten requests
+    assert ip_limiter.hit('ip:203.0.113.7', cost=9)
+    assert not ip_limiter.hit('ip:203.0.113.7')
+
+
+def test_limiter_errors_fail_open(stub_ses, monkeypatch):
+    class BrokenStore:
+        def increment(self, key, window, cost=1):
+            raise RuntimeError('table unavailable')
+
+    monkeypatch.setattr(handlers, 'ip_limiter', SlidingWindowLimiter(10, 60, shared=BrokenStore()))
+    assert lambda_handler(api_event({'email': 'ok@example.com'}), None)['statusCode'] == 200
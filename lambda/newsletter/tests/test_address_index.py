@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+import bench_address_index
+from conftest import make_event
+from lambda_function import lambda_handler, snapshot_handler
+from newsletter_core import address_index, handlers
+from newsletter_core.address_index import (
+    AddressPrefilter,
+    BloomFilter,
+    build_filter,
+    create_prefilter,
+    write_snapshot,
+)
+
+MEMBERS = [f'member{i}@example.com' for i in range(5000)]
+
+
+class CountingStore:
+    """
+    Wraps a store or index and counts the lookups that reach it.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.lookups = 0
+
+    def get(self, email):
+        self.lookups += 1
+        return self.inner.get(email)
+
+    def is_suppressed(self, email):
+        self.lookups += 1
+        return self.inner.is_suppressed(email)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def test_no_false_negatives_and_fp_rate_near_target():
+    bloom = build_filter(MEMBERS, fp_rate=0.01)
+    outside = [f'outsider{i}@example.org' for i in range(20000)]
+
+    assert all(address in bloom for address in MEMBERS)
+    assert bloom.count == len(MEMBERS)
+    assert sum(address in bloom for address in outside) / len(outside) < 0.02
+
+
+@pytest.mark.parametrize('mmap_threshold', [0, 1 << 30])
+def test_snapshot_roundtrip_read_and_mmap(tmp_path, mmap_threshold):
+    bloom = build_filter(MEMBERS)
+    path = str(tmp_path / 'subscribers.bloom')
+    write_snapshot(bloom, path)
+
+    loaded = BloomFilter.load(path, mmap_threshold)
+
+    assert (loaded.bit_count, loaded.hash_count, loaded.count) == (bloom.bit_count, bloom.hash_count, len(MEMBERS))
+    assert all(address in loaded for address in MEMBERS[:500])
+    assert loaded.to_bytes() == bloom.to_bytes()
+
+
+def test_unreadable_snapshot_means_no_prefilter(tmp_path):
+    path = tmp_path / 'broken.bloom'
+    path.write_bytes(b'not a snapshot at all, just some bytes')
+
+    assert create_prefilter(str(path)) is None
+    assert create_prefilter(str(tmp_path / 'missing.bloom')) is None
+    assert create_prefilter('') is None
+
+
+def test_prefilter_tracks_local_writes_and_reloads_changed_snapshots(tmp_path):
+    path = str(tmp_path / 'suppressions.bloom')
+    write_snapshot(build_filter(['old@example.com']), path)
+    now = [0.0]
+    prefilter = AddressPrefilter(path, BloomFilter.load(path), refresh_seconds=60, clock=lambda: now[0])
+    prefilter.refresh()
+
+    prefilter.add('local@example.com')
+    write_snapshot(build_filter(['old@example.com', 'new@example.com']), path)
+    assert prefilter.might_contain('local@example.com')
+    assert not prefilter.might_contain('new@example.com')
+
+    now[0] = 61.0
+    assert prefilter.might_contain('new@example.com')
+
+
+def test_stale_snapshot_does_not_let_a_complaint_through(stub_ses, monkeypatch, tmp_path,
+                                                         fresh_subscriber_store, fresh_suppression_index):
+    # Snapshot built before the complaint (recorded by another container) came in
+    path = str(tmp_path / 'subscribers.bloom')
+    write_snapshot(build_filter(['ana@example.com']), path)
+    monkeypatch.setattr(handlers, 'subscriber_prefilter', create_prefilter(path))
+    fresh_suppression_index.suppress_many([('complainer@example.com', 'complaint:abuse')])
+    suppressions = CountingStore(fresh_suppression_index)
+    monkeypatch.setattr(handlers, 'suppression_index', suppressions)
+
+    response = lambda_handler(make_event(body={'email': 'complainer@example.com'}), None)
+
+    assert response['statusCode'] == 400
+    assert json.loads(response['body'])['error'] == handlers.ADDRESS_SUPPRESSED
+    assert suppressions.lookups > 0
+    assert stub_ses.calls == []
+
+
+def test_confirm_mode_duplicate_check_uses_the_subscriber_prefilter(stub_ses, monkeypatch,
+                                                                     fresh_subscriber_store):
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr('newsletter_core.confirmation.CONFIRM_TOKEN_SECRETS', [b'secret'])
+    subscribers = CountingStore(fresh_subscriber_store)
+    monkeypatch.setattr(handlers, 'subscriber_store', subscribers)
+    monkeypatch.setattr(handlers, 'subscriber_prefilter', AddressPrefilter('unused', build_filter([])))
+
+    response = lambda_handler(make_event(body={'email': 'fresh@example.com'}), None)
+    assert response['statusCode'] == 200
+    assert subscribers.lookups == 0
+
+    # Registered after the snapshot was built: the local additions cover it
+    handlers.register_subscriber('fresh@example.com', 'Fresh')
+    again = lambda_handler(make_event(body={'email': 'fresh@example.com'}), None)
+    assert json.loads(again['body'])['message'] == handlers.ALREADY_SUBSCRIBED
+    assert subscribers.lookups == 1
+
+
+def test_snapshot_handler_writes_the_subscriber_list(tmp_path, fresh_subscriber_store):
+    fresh_subscriber_store.add_many([('ana@example.com', 'Ana'), ('bo@example.com', 'Bo')])
+    destination = str(tmp_path / 'subs.bloom')
+
+    result = snapshot_handler({'subscribers': destination}, None)
+
+    assert result['success'] is True
+    assert result['subscribers']['addresses'] == 2
+    assert 'ana@example.com' in BloomFilter.load(destination)
+
+
+def test_benchmark_reports_memory_and_fp_rate():
+    [result] = bench_address_index.run(count=20000, probes=5000, fp_rates=(0.01,))
+
+    assert result['bytes_per_million'] < 1.3 * 2**20
+    assert result['fp_measured'] < 0.02
+    assert address_index.HEADER.size == 32
@@ -0,0 +1,67 @@
+import pytest
+
+from newsletter_core import aws_clients, sending
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    aws_clients.clear_clients()
+    yield
+    aws_clients.clear_clients()
+
+
+def test_default_settings():
+    settings = aws_clients.client_settings({})
+    assert settings['connect_timeout'] == 2.0
+    assert settings['read_timeout'] == 5.0
+    assert settings['retries'] == {'mode': 'adaptive', 'max_attempts': 3}
+    assert settings['tcp_keepalive'] is True
+    assert settings['max_pool_connections'] == 10
+
+
+def test_settings_from_environment(monkeypatch):
+    monkeypatch.setenv('BOTO_READ_TIMEOUT', '1.5')
+    monkeypatch.setenv('BOTO_RETRY_MODE', 'standard')
+    monkeypatch.setenv('BOTO_TCP_KEEPALIVE', 'false')
+    monkeypatch.setenv('BOTO_MAX_POOL_CONNECTIONS', '32')
+
+    config = aws_clients.build_client_config()
+
+    assert config.read_timeout == 1.5
+    assert config.retries['mode'] == 'standard'
+    assert config.tcp_keepalive is False
+    assert config.max_pool_connections == 32
+
+
+def test_clients_are_cached_and_tuned():
+    client = aws_clients.get_client('ses', region_name='ap-south-1')
+    assert aws_clients.get_client('ses', region_name='ap-south-1') is client
+    assert client.meta.config.connect_timeout == 2.0
+    assert client.meta.config.retries['mode'] == 'adaptive'
+
+    local = aws_clients.get_client('ses', region_name='ap-south-1', endpoint_url='http://127.0.0.1:9')
+    assert local is not client
+    assert local.meta.endpoint_url == 'http://127.0.0.1:9'
+
+
+def test_ses_clients_leave_retries_to_the_rate_limiter(monkeypatch):
+    monkeypatch.setattr(sending, 'ses_client', None)
+
+    client = sending.get_ses_client()._client
+
+    assert client is aws_clients.get_single_attempt_client('ses')
+    assert client.meta.config.retries['total_max_attempts'] == 1
+    assert client.meta.config.read_timeout == 5.0
+
+
+def test_bounded_clients_fit_their_timeout_tier():
+    client = aws_clients.get_bounded_client('ses', 0.8, region_name='ap-south-1')
+    config = client.meta.config
+
+    assert aws_clients.get_bounded_client('ses', 0.6, region_name='ap-south-1') is client
+    assert config.connect_timeout + config.read_timeout == 0.5
+    assert config.retries['total_max_attempts'] == 1
+    # Never longer than the regular client's own timeouts
+    assert aws_clients.timeout_tier(60, limit=7) == 5.0
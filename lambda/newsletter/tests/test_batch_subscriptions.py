@@ -0,0 +1,91 @@
+import json
+
+from botocore.exceptions import ClientError
+
+from conftest import StubSESClient, make_event
+from lambda_function import lambda_handler
+from newsletter_core import handlers, sending
+from newsletter_core.config import MAX_BATCH_SUBSCRIPTIONS
+from newsletter_core.send_queue import InMemoryQueue, decode_job
+
+
+def batch_event(subscriptions):
+    return make_event(body={'subscriptions': subscriptions})
+
+
+def results_of(response):
+    return json.loads(response['body'])['results']
+
+
+def test_batch_sends_each_new_subscriber(stub_ses):
+    response = lambda_handler(batch_event([
+        {'email': 'Ana@Example.com', 'name': 'Ana'},
+        'bo@example.com',
+        {'email': 'nope'},
+        {'email': 'ana@example.com'},
+    ]), None)
+
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body['success'] is False
+    assert [result['status'] for result in body['results']] == ['Sent', 'Sent', 'InvalidEmail', 'AlreadySubscribed']
+    assert sorted(call['Destination']['ToAddresses'][0] for call in stub_ses.calls) == [
+        'ana@example.com', 'bo@example.com'
+    ]
+    assert {result['messageId'] for result in body['results'][:2]} <= {'stub-1', 'stub-2'}
+
+
+def test_batch_skips_existing_subscribers(stub_ses, fresh_subscriber_store):
+    fresh_subscriber_store.add_if_absent('ana@example.com', 'Ana')
+
+    response = lambda_handler(batch_event(['ana@example.com', 'bo@example.com']), None)
+
+    assert [result['status'] for result in results_of(response)] == ['AlreadySubscribed', 'Sent']
+    assert json.loads(response['body'])['success'] is True
+    assert len(stub_ses.calls) == 1
+
+
+def test_batch_failed_send_is_rolled_back(monkeypatch, fresh_subscriber_store):
+    class PartlyFailingSES(StubSESClient):
+        def send_email(self, **kwargs):
+            if kwargs['Destination']['ToAddresses'] == ['bad@example.com']:
+                raise ClientError({'Error': {'Code': 'MessageRejected', 'Message': 'rejected'}}, 'SendEmail')
+            return super().send_email(**kwargs)
+
+    monkeypatch.setattr(sending, 'ses_client', PartlyFailingSES())
+
+    results = results_of(lambda_handler(batch_event(['good@example.com', 'bad@example.com']), None))
+
+    assert results[0]['status'] == 'Sent'
+    assert results[1]['status'] == 'Failed'
+    assert results[1]['error'] == sending.SES_ERROR_MESSAGES['MessageRejected']
+    assert fresh_subscriber_store.get('bad@example.com') is None
+    assert fresh_subscriber_store.get('good@example.com') is not None
+
+
+def test_batch_is_enqueued_in_queue_mode(stub_ses, monkeypatch):
+    queue = InMemoryQueue()
+    monkeypatch.setattr(handlers, 'send_queue', queue)
+
+    response = lambda_handler(batch_event([{'email': 'a@example.com', 'name': 'A'}, 'b@example.com']), None)
+
+    assert [result['status'] for result in results_of(response)] == ['Queued', 'Queued']
+    assert stub_ses.calls == []
+    assert [decode_job(body) for _, body in queue.receive()] == [('a@example.com', 'A'), ('b@example.com', 'b')]
+
+
+def test_malformed_batches_are_rejected(stub_ses):
+    for subscriptions in ([], 'a@example.com', ['a@example.com'] * (MAX_BATCH_SUBSCRIPTIONS + 1)):
+        response = lambda_handler(batch_event(subscriptions), None)
+        assert response['statusCode'] == 400
+    assert stub_ses.calls == []
+
+
+def test_send_welcome_emails_keeps_input_order(stub_ses):
+    recipients = [(f'user{i}@example.com', f'User {i}') for i in range(20)]
+
+    outcomes = sending.send_welcome_emails(recipients, concurrency=4)
+
+    assert len(outcomes) == 20
+    assert all(error is None for _, error in outcomes)
+    assert all(message_id.startswith('stub-') for message_id, _ in outcomes)
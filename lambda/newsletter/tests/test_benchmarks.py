@@ -0,0 +1,64 @@
+import bench_handler
+import harness
+
+
+def test_handler_benchmark_scenarios_run():
+    results = bench_handler.run(iterations=20, warmup=2, alloc_iterations=5)
+    assert set(results) == {
+        'preflight', 'forbidden_origin', 'invalid_email', 'valid_signup', 'duplicate_signup', 'ses_error'
+    }
+    for metrics in results.values():
+        assert metrics['ops_per_sec'] > 0
+        assert metrics['p50_us'] <= metrics['p95_us'] <= metrics['p99_us']
+
+
+def test_scenarios_exercise_the_expected_paths():
+    scenarios = bench_handler.build_scenarios()
+    with harness.quiet():
+        statuses = {name: run(0)['statusCode'] for name, run in scenarios.items()}
+    assert statuses == {
+        'preflight': 200, 'forbidden_origin': 403, 'invalid_email': 400,
+        'valid_signup': 200, 'duplicate_signup': 200, 'ses_error': 500,
+    }
+
+
+def test_compare_flags_regressions_only_beyond_tolerance():
+    baseline = {'s': {'p50_us': 10.0, 'p99_us': 20.0, 'alloc_bytes': 1000, 'ops_per_sec': 1000}}
+    steady = {'s': {'p50_us': 12.0, 'p99_us': 24.0, 'alloc_bytes': 1000, 'ops_per_sec': 900}}
+    slower = {'s': {'p50_us': 40.0, 'p99_us': 24.0, 'alloc_bytes': 2000, 'ops_per_sec': 300}}
+
+    assert harness.compare_to_baseline(steady, baseline) == []
+    regressions = harness.compare_to_baseline(slower, baseline)
+    assert any('p50_us' in line for line in regressions)
+    assert any('alloc_bytes' in line for line in regressions)
+    assert any('ops_per_sec' in line for line in regressions)
+
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert harness.percentile(samples, 50) == 50
+    assert harness.percentile(samples, 99) == 99
+    assert harness.percentile([], 50) == 0.0
+
+
+def test_cached_ses_client_reuses_one_connection(monkeypatch):
+    from local_ses import LocalSESServer
+    from newsletter_core import aws_clients
+
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    aws_clients.clear_clients()
+    try:
+        with LocalSESServer() as server:
+            client = aws_clients.get_client('ses', region_name='ap-south-1', endpoint_url=server.endpoint_url)
+            for i in range(5):
+                response = client.send_email(
+                    Source='newsletter@tranquilmindquest.com',
+                    Destination={'ToAddresses': [f'user{i}@example.com']},
+                    Message={'Subject': {'Data': 'Hi'}, 'Body': {'Text': {'Data': 'Hello'}}},
+                )
+                assert response['MessageId']
+            assert server.requests == 5
+            assert server.connections == 1
+    finally:
+        aws_clients.clear_clients()
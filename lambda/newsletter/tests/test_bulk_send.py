@@ -0,0 +1,39 @@
+import json
+
+from botocore.exceptions import ClientError
+
+from newsletter_core.bulk_send import chunked
+from lambda_function import bulk_send_handler
+
+
+def test_chunked_splits_into_bounded_batches():
+    assert [len(batch) for batch in chunked(range(120), 50)] == [50, 50, 20]
+
+
+def test_recipients_are_sent_in_batches_of_fifty(stub_ses):
+    recipients = [{'email': f'user{i}@example.com'} for i in range(120)]
+    result = bulk_send_handler({'recipients': recipients}, None)
+
+    assert [len(call['Destinations']) for call in stub_ses.bulk_calls] == [50, 50, 20]
+    assert result['sent'] == 120
+    assert result['results'][0]['messageId'] == 'bulk-1-0'
+    first = stub_ses.bulk_calls[0]['Destinations'][0]
+    assert json.loads(first['ReplacementTemplateData']) == {
+        'name': 'user0', 'unsubscribe_url': 'https://tranquilmindquest.com/unsubscribe'
+    }
+
+
+def test_invalid_recipients_keep_their_position(stub_ses):
+    result = bulk_send_handler({'recipients': ['a@example.com', 'bad', {'email': 'b@example.com', 'name': 'Bo'}]}, None)
+
+    assert [r['status'] for r in result['results']] == ['Success', 'InvalidEmail', 'Success']
+    assert result['failed'] == 1
+    assert sum(len(call['Destinations']) for call in stub_ses.bulk_calls) == 2
+
+
+def test_batch_error_is_reported_per_destination(stub_ses):
+    stub_ses.error = ClientError({'Error': {'Code': 'TemplateDoesNotExist', 'Message': 'no'}}, 'SendBulkTemplatedEmail')
+    result = bulk_send_handler({'recipients': ['a@example.com', 'b@example.com']}, None)
+
+    assert result['sent'] == 0
+    assert {r['status'] for r in result['results']} == {'TemplateDoesNotExist'}
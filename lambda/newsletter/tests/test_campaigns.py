@@ -0,0 +1,157 @@
+import json
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from conftest import LocalDynamoDB
+from lambda_function import campaign_handler
+from newsletter_core import handlers
+from newsletter_core.campaigns import (
+    CheckpointConflict,
+    DynamoDBCheckpointStore,
+    InMemoryCheckpointStore,
+    SQLiteCheckpointStore,
+    new_checkpoint,
+    parse_campaign,
+    run_campaign,
+)
+from newsletter_core.subscriber_store import InMemorySubscriberStore
+
+
+def sent_addresses_of(call):
+    return [destination['Destination']['ToAddresses'][0] for destination in call['Destinations']]
+
+
+def sent_addresses(stub):
+    return [address for call in stub.bulk_calls for address in sent_addresses_of(call)]
+
+
+def make_store(count=25):
+    store = InMemorySubscriberStore()
+    store.add_many([(f'user{i:02d}@example.com', f'User {i}') for i in range(count)])
+    return store
+
+
+CAMPAIGN = parse_campaign({'campaignId': 'weekly-42', 'template': 'newsletter'})
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'dynamodb'])
+def checkpoints(request, tmp_path):
+    if request.param == 'memory':
+        return InMemoryCheckpointStore()
+    if request.param == 'sqlite':
+        return SQLiteCheckpointStore(str(tmp_path / 'campaigns.db'))
+    return DynamoDBCheckpointStore('campaigns', client=LocalDynamoDB('campaign_id'))
+
+
+def test_checkpoint_saves_are_conditional_on_version(checkpoints):
+    first = checkpoints.save(new_checkpoint('c1', now=0))
+    second = checkpoints.save(dict(first, sent=5))
+
+    assert checkpoints.load('c1') == second
+    with pytest.raises(CheckpointConflict):
+        checkpoints.save(dict(first, sent=99))
+    with pytest.raises(CheckpointConflict):
+        checkpoints.save(new_checkpoint('c1'))
+
+
+def test_runs_to_completion_once(stub_ses, checkpoints):
+    store = make_store()
+
+    checkpoint = run_campaign(CAMPAIGN, store, checkpoints, stub_ses, chunk_size=10)
+    again = run_campaign(CAMPAIGN, store, checkpoints, stub_ses, chunk_size=10)
+
+    assert checkpoint['status'] == 'complete'
+    assert (checkpoint['sent'], checkpoint['chunks']) == (25, 3)
+    assert again == checkpoint
+    assert sorted(sent_addresses(stub_ses)) == [f'user{i:02d}@example.com' for i in range(25)]
+    data = json.loads(stub_ses.bulk_calls[0]['Destinations'][0]['ReplacementTemplateData'])
+    assert data['name'] == 'User 0' and data['unsubscribe_url']
+
+
+def test_pauses_before_the_deadline_and_resumes(stub_ses):
+    store, checkpoints = make_store(), InMemoryCheckpointStore()
+    remaining = iter([60000, 60000, 500])
+
+    paused = run_campaign(CAMPAIGN, store, checkpoints, stub_ses, remaining_ms=lambda: next(remaining),
+                          chunk_size=10, reserve_ms=1000)
+    assert (paused['status'], paused['sent']) == ('running', 20)
+
+    finished = run_campaign(CAMPAIGN, store, checkpoints, stub_ses, chunk_size=10)
+    assert (finished['status'], finished['sent']) == ('complete', 25)
+    assert len(sent_addresses(stub_ses)) == len(set(sent_addresses(stub_ses))) == 25
+
+
+class ProcessDied(BaseException):
+    """
+    Stands in for the Lambda runtime killing the invocation (timeout, out of memory).
+    """
+
+
+def test_crash_mid_chunk_is_not_resent(stub_ses):
+    store, checkpoints = make_store(), InMemoryCheckpointStore()
+    send = stub_ses.send_bulk_templated_email
+    calls = []
+
+    def crash_on_second_chunk(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 2:
+            raise ProcessDied('Task timed out')
+        return send(**kwargs)
+    stub_ses.send_bulk_templated_email = crash_on_second_chunk
+
+    with pytest.raises(ProcessDied):
+        run_campaign(CAMPAIGN, store, checkpoints, stub_ses, chunk_size=10)
+    resumed = run_campaign(CAMPAIGN, store, checkpoints, stub_ses, chunk_size=10)
+
+    assert resumed['status'] == 'complete'
+    assert (resumed['sent'], resumed['interrupted']) == (15, 1)
+    assert len(set(sent_addresses(stub_ses))) == 15
+
+
+def test_failed_chunk_is_sent_on_the_next_run(stub_ses, checkpoints):
+    store = make_store()
+    send = stub_ses.send_bulk_templated_email
+    calls = []
+
+    def fail_on_second_chunk(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 2:
+            raise EndpointConnectionError(endpoint_url='https://email.ap-south-1.amazonaws.com')
+        return send(**kwargs)
+    stub_ses.send_bulk_templated_email = fail_on_second_chunk
+
+    with pytest.raises(EndpointConnectionError):
+        run_campaign(CAMPAIGN, store, checkpoints, stub_ses, chunk_size=10)
+    resumed = run_campaign(CAMPAIGN, store, checkpoints, stub_ses, chunk_size=10)
+
+    assert resumed['status'] == 'complete'
+    assert (resumed['sent'], resumed['interrupted']) == (25, 0)
+    assert sorted(sent_addresses(stub_ses)) == [f'user{i:02d}@example.com' for i in range(25)]
+
+
+def test_segments_and_suppression(stub_ses):
+    store = InMemorySubscriberStore()
+    store.add_many([('ana@gmail.com', 'Ana'), ('bo@example.com', 'Bo'), ('cy@example.com', 'Cy')])
+    campaign = parse_campaign({
+        'campaignId': 'weekly-43', 'template': 'newsletter',
+        'segments': [{'name': 'gmail', 'domains': ['Gmail.com'], 'template': 'newsletter-gmail'}]
+    })
+
+    checkpoint = run_campaign(campaign, store, InMemoryCheckpointStore(), stub_ses,
+                              is_suppressed=lambda email: email == 'cy@example.com')
+
+    templates = {call['Template']: sent_addresses_of(call) for call in stub_ses.bulk_calls}
+    assert templates == {'newsletter-gmail': ['ana@gmail.com'], 'newsletter': ['bo@example.com']}
+    assert (checkpoint['sent'], checkpoint['suppressed']) == (2, 1)
+
+
+def test_handler_validates_and_reports(stub_ses, monkeypatch, fresh_subscriber_store):
+    monkeypatch.setattr(handlers, 'campaign_checkpoints', InMemoryCheckpointStore())
+    fresh_subscriber_store.add_many([('ana@example.com', 'Ana')])
+
+    assert campaign_handler({'template': 'newsletter'}, None)['success'] is False
+    result = campaign_handler({'campaignId': 'weekly-44', 'template': 'newsletter'}, None)
+
+    assert result['success'] is True
+    assert (result['status'], result['sent']) == ('complete', 1)
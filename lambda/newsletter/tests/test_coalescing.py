@@ -0,0 +1,159 @@
+import json
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+from conftest import LocalDynamoDB, make_event
+from lambda_function import lambda_handler
+from newsletter_core import handlers
+from newsletter_core.coalescing import DynamoDBFlightStore, SingleFlight, SQLiteFlightStore
+
+
+@pytest.fixture(params=['sqlite', 'dynamodb'])
+def shared_store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteFlightStore(str(tmp_path / 'flights.db'))
+    return DynamoDBFlightStore('flights', client=LocalDynamoDB('pk'))
+
+
+def run_concurrently(*funcs):
+    results = [None] * len(funcs)
+
+    def run(index, func):
+        results[index] = func()
+    threads = [threading.Thread(target=run, args=(i, func)) for i, func in enumerate(funcs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def blocking_leader(flight, key, outcome, started, release, calls):
+    def work():
+        calls.append(key)
+        started.set()
+        release.wait(5)
+        return outcome
+    return lambda: flight.do(key, work)
+
+
+def test_threads_share_one_call_and_its_exception():
+    flight = SingleFlight()
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def duplicate():
+        started.wait(5)
+        threading.Timer(0.2, release.set).start()
+        return flight.do('k', lambda: calls.append('duplicate') or 'second')
+
+    leader, follower = run_concurrently(
+        blocking_leader(flight, 'k', {'status': 'Sent'}, started, release, calls), duplicate
+    )
+
+    assert calls == ['k']
+    assert leader == ({'status': 'Sent'}, False)
+    assert follower == ({'status': 'Sent'}, True)
+    # Once the call is done, the next one runs again
+    assert flight.do('k', lambda: 'fresh') == ('fresh', False)
+
+    def boom():
+        raise RuntimeError('SES down')
+    with pytest.raises(RuntimeError):
+        flight.do('k', boom)
+
+
+def test_shared_store_coalesces_across_containers(shared_store):
+    first, second = SingleFlight(shared_store, poll_seconds=0.01), SingleFlight(shared_store, poll_seconds=0.01)
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def other_container():
+        started.wait(5)
+        threading.Timer(0.2, release.set).start()
+        return second.do('k', lambda: calls.append('duplicate'))
+
+    leader, follower = run_concurrently(
+        blocking_leader(first, 'k', {'status': 'Sent', 'messageId': 'm-1'}, started, release, calls), other_container
+    )
+
+    assert calls == ['k']
+    assert leader == ({'status': 'Sent', 'messageId': 'm-1'}, False)
+    assert follower == ({'status': 'Sent', 'messageId': 'm-1'}, True)
+    # Duplicates arriving until the lock expires still get the outcome
+    assert second.do('k', lambda: calls.append('late')) == ({'status': 'Sent', 'messageId': 'm-1'}, True)
+
+
+def test_unfinished_and_released_flights(shared_store):
+    now = [1000.0]
+    flight = SingleFlight(shared_store, lock_seconds=10, wait_seconds=0.5, poll_seconds=0.1,
+                          clock=lambda: now[0], sleep=lambda seconds: now.__setitem__(0, now[0] + seconds))
+    shared_store.claim('busy', 'other', now[0] + 10, now[0])
+
+    # Still in flight elsewhere after the wait: no outcome
+    assert flight.do('busy', lambda: 'ran') == (None, True)
+    # A lock past its expiry (crashed leader) is taken over
+    now[0] += 20
+    assert flight.do('busy', lambda: {'status': 'Sent'}) == ({'status': 'Sent'}, False)
+    # Outcomes that are not kept are released for the next request
+    assert flight.do('failed', lambda: {'status': 'Failed'}, keep=lambda outcome: False) == ({'status': 'Failed'}, False)
+    assert shared_store.lookup('failed', now[0]) == (False, None)
+
+
+def test_broken_store_runs_uncoalesced():
+    class BrokenStore:
+        def claim(self, *args):
+            raise RuntimeError('throttled')
+
+    assert SingleFlight(BrokenStore()).do('k', lambda: 'ran') == ('ran', False)
+
+
+def test_double_submit_sends_one_welcome_email(stub_ses, monkeypatch):
+    monkeypatch.setattr(handlers, 'signup_flight', SingleFlight())
+    started, release = threading.Event(), threading.Event()
+    send = stub_ses.send_email
+
+    def slow_send(**kwargs):
+        started.set()
+        release.wait(5)
+        return send(**kwargs)
+    stub_ses.send_email = slow_send
+
+    def submit():
+        return lambda_handler(make_event(body={'email': 'Ana@Example.com', 'name': 'Ana'}), None)
+
+    def resubmit():
+        started.wait(5)
+        threading.Timer(0.2, release.set).start()
+        return lambda_handler(make_event(body={'email': 'ana@example.com', 'name': 'Ana'}), None)
+
+    first, second = run_concurrently(submit, resubmit)
+
+    assert len(stub_ses.calls) == 1
+    assert first['statusCode'] == second['statusCode'] == 200
+    assert json.loads(first['body'])['messageId'] == json.loads(second['body'])['messageId']
+
+
+def test_failed_signup_is_not_shared_with_a_retry(stub_ses, monkeypatch, tmp_path):
+    monkeypatch.setattr(handlers, 'signup_flight', SingleFlight(SQLiteFlightStore(str(tmp_path / 'flights.db'))))
+    stub_ses.error = ClientError({'Error': {'Code': 'Throttling', 'Message': 'slow down'}}, 'SendEmail')
+
+    failed = lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+    stub_ses.error = None
+    retried = lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+
+    assert failed['statusCode'] == 500
+    assert retried['statusCode'] == 200
+    assert len(stub_ses.calls) == 2
+
+
+def test_local_dynamodb_rejects_reserved_words_without_placeholders():
+    client = LocalDynamoDB('pk')
+    client.put_item(TableName='flights', Item={'pk': {'S': 'k'}, 'owner': {'S': 'a'}})
+
+    with pytest.raises(ClientError, match='reserved keyword: owner'):
+        client.delete_item(TableName='flights', Key={'pk': {'S': 'k'}}, ConditionExpression='owner = :owner',
+                           ExpressionAttributeValues={':owner': {'S': 'a'}})
+    client.delete_item(TableName='flights', Key={'pk': {'S': 'k'}}, ConditionExpression='#owner = :owner',
+                       ExpressionAttributeNames={'#owner': 'owner'}, ExpressionAttributeValues={':owner': {'S': 'a'}})
+    assert client.get_item(TableName='flights', Key={'pk': {'S': 'k'}}) == {}
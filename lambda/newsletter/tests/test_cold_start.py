@@ -0,0 +1,64 @@
+"""
+Cold-start budget: preflight and validation failures must not import boto3,
+and a fresh interpreter must import the handler and answer them within budget.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import FUNCTION_DIR, make_event
+
+REPO_ROOT = os.path.dirname(os.path.dirname(FUNCTION_DIR))
+AWS_HANDLER = os.path.join(REPO_ROOT, 'aws', 'lambda-newsletter-handler.py')
+
+# Measured at ~70 ms locally versus ~400 ms with an eager boto3 client
+COLD_START_BUDGET_MS = float(os.environ.get('COLD_START_BUDGET_MS', '250'))
+
+PROBE = '''
+import importlib.util, json, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('handler', sys.argv[1])
+handler = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(handler)
+response = handler.lambda_handler(json.loads(sys.argv[2]), None)
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({'status': response['statusCode'], 'ms': elapsed_ms, 'boto3': 'boto3' in sys.modules}))
+'''
+
+
+def cold_invoke(handler_path, event):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(handler_path))
+    env.pop('SEND_QUEUE_URL', None)
+    env.pop('SUBSCRIBER_TABLE', None)
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, handler_path, json.dumps(event)],
+        capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('event, status', [
+    (make_event('OPTIONS'), 200),
+    (make_event(body={'email': 'a@example.com'}, origin='https://evil.test'), 403),
+    (make_event(body={'email': 'not-an-email'}), 400),
+])
+def test_lambda_function_cold_paths_skip_boto3(event, status):
+    result = cold_invoke(os.path.join(FUNCTION_DIR, 'lambda_function.py'), event)
+    assert result['status'] == status
+    assert result['boto3'] is False
+    assert result['ms'] < COLD_START_BUDGET_MS
+
+
+@pytest.mark.parametrize('event, status', [
+    (make_event('OPTIONS'), 200),
+    (make_event(body={'email': 'not-an-email'}), 400),
+])
+def test_aws_handler_cold_paths_skip_boto3(event, status):
+    result = cold_invoke(AWS_HANDLER, event)
+    assert result['status'] == status
+    assert result['boto3'] is False
+    assert result['ms'] < COLD_START_BUDGET_MS
@@ -0,0 +1,136 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from conftest import make_event
+from lambda_function import lambda_handler
+from newsletter_core import confirmation, handlers
+from newsletter_core.confirmation import create_token, verify_token
+from newsletter_core.email_templates import render_confirmation_email
+
+SECRET = b'test-secret'
+CONFIRM_URL = 'https://api.tranquilmindquest.com/subscribe'
+
+
+@pytest.fixture
+def confirm_mode(monkeypatch):
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr(confirmation, 'CONFIRM_TOKEN_SECRETS', [SECRET])
+    monkeypatch.setattr(confirmation, 'CONFIRM_URL', CONFIRM_URL)
+    monkeypatch.setattr(confirmation, 'CONFIRM_REDIRECT_URL', '')
+
+
+def confirm_event(token):
+    # Opened from an email client: no Origin header
+    return make_event('GET', origin=None, queryStringParameters={'token': token})
+
+
+def token_from(ses_call):
+    text = ses_call['Message']['Body']['Text']['Data']
+    url = next(line for line in text.splitlines() if line.startswith(CONFIRM_URL))
+    return parse_qs(urlparse(url).query)['token'][0]
+
+
+def test_token_round_trip_and_expiry():
+    token = create_token('ana@example.com', 'Ána', SECRET, ttl_seconds=60, now=1000)
+
+    assert verify_token(token, [SECRET], now=1059) == ('ana@example.com', 'Ána')
+    assert verify_token(token, [SECRET], now=1061) is None
+    assert verify_token(token, [b'other'], now=1000) is None
+    # Rotated secrets: old links still verify while the old secret is listed
+    assert verify_token(token, [b'new', SECRET], now=1000) == ('ana@example.com', 'Ána')
+
+
+def test_tampered_or_malformed_tokens_are_rejected():
+    token = create_token('ana@example.com', 'Ana', SECRET, ttl_seconds=60, now=1000)
+    payload, signature = token.split('.')
+    forged = create_token('eve@example.com', 'Eve', b'guess', ttl_seconds=60, now=1000).split('.')[0]
+
+    for bad in (f'{forged}.{signature}', payload, '', 'a.b.c', 'é.é', f'{payload}.!!!', None):
+        assert verify_token(bad, [SECRET], now=1000) is None
+
+
+def test_signup_sends_only_a_confirmation(stub_ses, confirm_mode, fresh_subscriber_store):
+    response = lambda_handler(make_event(body={'email': 'ana@example.com', 'name': 'Ana'}), None)
+
+    assert response['statusCode'] == 200
+    assert 'confirm' in json.loads(response['body'])['message']
+    assert fresh_subscriber_store.get('ana@example.com') is None
+    [call] = stub_ses.calls
+    assert call['Message']['Subject']['Data'] == 'Please confirm your TranquilMindQuest subscription'
+    assert call['Tags'] == [{'Name': 'newsletter', 'Value': 'confirmation'}]
+    assert verify_token(token_from(call)) == ('ana@example.com', 'Ana')
+
+
+def test_confirm_link_records_subscriber_and_sends_welcome_once(stub_ses, confirm_mode, fresh_subscriber_store):
+    lambda_handler(make_event(body={'email': 'ana@example.com', 'name': 'Ana'}), None)
+    token = token_from(stub_ses.calls[0])
+
+    first = lambda_handler(confirm_event(token), None)
+    second = lambda_handler(confirm_event(token), None)
+
+    assert first['statusCode'] == 200
+    assert first['headers']['Content-Type'].startswith('text/html')
+    assert 'confirmed' in first['body']
+    assert second['statusCode'] == 200
+    assert fresh_subscriber_store.get('ana@example.com')['name'] == 'Ana'
+    assert len(stub_ses.calls) == 2
+    assert stub_ses.calls[1]['Message']['Subject']['Data'].startswith('Welcome')
+
+    # Signing up again after confirming is a duplicate: no new confirm link
+    again = lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+    assert json.loads(again['body'])['message'] == handlers.ALREADY_SUBSCRIBED
+    assert len(stub_ses.calls) == 2
+
+
+def test_invalid_token_is_rejected_without_store_access(stub_ses, confirm_mode, monkeypatch):
+    class NoStore:
+        def __getattr__(self, name):
+            raise AssertionError('store must not be touched')
+
+    monkeypatch.setattr(handlers, 'subscriber_store', NoStore())
+    response = lambda_handler(confirm_event('not-a-token'), None)
+
+    assert response['statusCode'] == 400
+    assert stub_ses.calls == []
+
+
+def test_confirm_link_after_a_complaint_sends_nothing(stub_ses, confirm_mode, fresh_subscriber_store,
+                                                      fresh_suppression_index):
+    lambda_handler(make_event(body={'email': 'ana@example.com', 'name': 'Ana'}), None)
+    fresh_suppression_index.suppress_many([('ana@example.com', 'complaint:abuse')])
+
+    response = lambda_handler(confirm_event(token_from(stub_ses.calls[0])), None)
+
+    assert response['statusCode'] == 400
+    assert 'no longer send' in response['body']
+    assert fresh_subscriber_store.get('ana@example.com') is None
+    assert len(stub_ses.calls) == 1
+
+
+def test_confirmation_redirect(stub_ses, confirm_mode, monkeypatch):
+    monkeypatch.setattr(confirmation, 'CONFIRM_REDIRECT_URL', 'https://tranquilmindquest.com/confirmed.html')
+    token = create_token('ana@example.com', 'Ana')
+
+    response = lambda_handler(confirm_event(token), None)
+
+    assert response['statusCode'] == 302
+    assert response['headers']['Location'] == 'https://tranquilmindquest.com/confirmed.html?status=confirmed'
+
+
+def test_batch_sends_confirmations(stub_ses, confirm_mode, fresh_subscriber_store):
+    fresh_subscriber_store.add_if_absent('old@example.com', 'Old')
+
+    response = lambda_handler(make_event(body={'subscriptions': ['a@example.com', 'old@example.com']}), None)
+
+    assert [r['status'] for r in json.loads(response['body'])['results']] == ['ConfirmationSent', 'AlreadySubscribed']
+    assert len(stub_ses.calls) == 1
+    assert fresh_subscriber_store.get('a@example.com') is None
+
+
+def test_confirmation_email_escapes_name_and_link():
+    rendered = render_confirmation_email('<b>Ana</b>', 'https://x.test/c?token=a&b')
+    assert '&lt;b&gt;Ana&lt;/b&gt;' in rendered.html
+    assert 'token=a&amp;b' in rendered.html
+    assert 'https://x.test/c?token=a&b' in rendered.text
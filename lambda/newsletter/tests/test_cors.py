@@ -0,0 +1,44 @@
+import copy
+import json
+
+import pytest
+
+from conftest import make_event
+from lambda_function import lambda_handler
+from newsletter_core import cors, events
+
+
+def test_allowed_origins_share_prebuilt_headers():
+    origin, headers = cors.lookup_cors('https://tranquilmindquest.com')
+    assert origin == 'https://tranquilmindquest.com'
+    assert headers is cors.lookup_cors('https://tranquilmindquest.com')[1]
+    assert headers['Access-Control-Allow-Origin'] == origin
+
+
+def test_denied_origin_gets_headers_without_allow_origin():
+    origin, headers = cors.lookup_cors('https://evil.test')
+    assert origin is None
+    assert headers is cors.DENIED_CORS_HEADERS
+    assert 'Access-Control-Allow-Origin' not in headers
+
+
+def test_shared_headers_are_read_only_but_serializable():
+    headers = cors.CORS_HEADERS_BY_ORIGIN['https://tranquilmindquest.com']
+    with pytest.raises(TypeError):
+        headers['X-Extra'] = '1'
+    with pytest.raises(TypeError):
+        headers.update({'X-Extra': '1'})
+    assert json.loads(json.dumps(headers)) == dict(headers)
+    mutable = copy.deepcopy(headers)
+    mutable['X-Extra'] = '1'
+    assert type(mutable) is dict
+
+
+def test_fixed_error_bodies_are_serialized_once(stub_ses):
+    first = lambda_handler(make_event(body={'email': 'bad'}), None)
+    second = lambda_handler(make_event(body={'email': 'worse'}), None)
+    assert first['body'] is second['body']
+    assert json.loads(first['body']) == {'success': False, 'error': events.INVALID_EMAIL_FORMAT}
+
+    forbidden = lambda_handler(make_event(body={'email': 'a@example.com'}, origin='https://evil.test'), None)
+    assert forbidden['body'] is events.error_body(events.ORIGIN_NOT_ALLOWED)
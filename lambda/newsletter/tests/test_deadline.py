@@ -0,0 +1,324 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+from conftest import StubSESClient, make_event
+from lambda_function import lambda_handler
+from newsletter_core import handlers, rate_limiter, sending
+from newsletter_core.deadline import UNBOUNDED, Deadline, DeadlineExceeded, deadline_from_context
+from newsletter_core.rate_limiter import RateLimitedSESClient
+from newsletter_core.events import SERVICE_BUSY
+from newsletter_core.send_queue import CONFIRMATION_JOB, InMemoryQueue, decode_job, job_kind
+
+SLOW_SES_SECONDS = 2.0
+
+
+class SlowSESClient(StubSESClient):
+    """
+    SES stub that takes SLOW_SES_SECONDS per send. A bounded view gives up
+    after its timeout with the error botocore raises for a read timeout.
+    """
+
+    def __init__(self, latency=SLOW_SES_SECONDS, timeout=None):
+        super().__init__()
+        self.latency = latency
+        self.timeout = timeout
+        self.timeouts = []
+
+    def bounded(self, timeout):
+        self.timeouts.append(timeout)
+        view = SlowSESClient(self.latency, timeout)
+        view.calls = self.calls
+        return view
+
+    def send_email(self, **kwargs):
+        if self.timeout is not None and self.timeout < self.latency:
+            time.sleep(self.timeout)
+            raise ReadTimeoutError(endpoint_url='https://email.ap-south-1.amazonaws.com')
+        time.sleep(self.latency)
+        return super().send_email(**kwargs)
+
+
+def lambda_context(remaining_ms):
+    return SimpleNamespace(get_remaining_time_in_millis=lambda: remaining_ms)
+
+
+@pytest.fixture
+def slow_ses(monkeypatch):
+    client = SlowSESClient()
+    monkeypatch.setattr(sending, 'ses_client', client)
+    return client
+
+
+@pytest.fixture
+def overflow_queue(monkeypatch):
+    queue = InMemoryQueue()
+    monkeypatch.setattr(handlers, 'send_queue', queue)
+    monkeypatch.setattr(handlers, 'queue_overflow_only', True)
+    return queue
+
+
+def subscribe(remaining_ms, email='ana@example.com'):
+    started = time.perf_counter()
+    response = lambda_handler(make_event(body={'email': email, 'name': 'Ana'}), lambda_context(remaining_ms))
+    return response, time.perf_counter() - started
+
+
+def test_budget_comes_from_the_lambda_context():
+    clock = lambda: 100.0
+
+    assert deadline_from_context(None) is UNBOUNDED
+    assert deadline_from_context(lambda_context(3000), reserve_ms=500, cap_ms=0, clock=clock).remaining_ms() == 2500
+    assert deadline_from_context(lambda_context(60000), reserve_ms=500, cap_ms=8000, clock=clock).remaining_ms() == 8000
+    assert UNBOUNDED.call_timeout('Ses', 300) is None
+    with pytest.raises(DeadlineExceeded):
+        Deadline(200, clock).call_timeout('Ses', 300)
+
+
+def test_slow_ses_is_deferred_to_the_queue_within_the_budget(slow_ses, overflow_queue, fresh_subscriber_store):
+    response, elapsed = subscribe(remaining_ms=1500)
+
+    assert response['statusCode'] == 202
+    assert elapsed < 1.5
+    assert 0 < slow_ses.timeouts[0] <= 1.0
+    [(_, body)] = overflow_queue.receive()
+    assert decode_job(body) == ('ana@example.com', 'Ana')
+    assert fresh_subscriber_store.get('ana@example.com') is not None
+
+
+def test_overflow_mode_sends_inline_when_there_is_time(stub_ses, overflow_queue, monkeypatch):
+    monkeypatch.setattr(stub_ses, 'bounded', lambda timeout: stub_ses, raising=False)
+
+    response, _ = subscribe(remaining_ms=10000)
+
+    assert response['statusCode'] == 200
+    assert len(stub_ses.calls) == 1
+    assert overflow_queue.receive() == []
+
+
+def test_without_a_queue_the_client_is_asked_to_retry(slow_ses, fresh_subscriber_store):
+    response, elapsed = subscribe(remaining_ms=1500)
+
+    assert response['statusCode'] == 503
+    assert response['headers']['Retry-After'] == '5'
+    assert elapsed < 1.5
+    # Rolled back, so the retry is not treated as a duplicate
+    assert fresh_subscriber_store.get('ana@example.com') is None
+
+
+def test_exhausted_budget_skips_ses_entirely(slow_ses, overflow_queue):
+    response, elapsed = subscribe(remaining_ms=600)
+
+    assert response['statusCode'] == 202
+    assert slow_ses.timeouts == [] and slow_ses.calls == []
+    assert elapsed < 0.1
+
+
+def test_throttling_with_a_deadline_is_deferred(stub_ses, overflow_queue, monkeypatch):
+    monkeypatch.setattr(stub_ses, 'bounded', lambda timeout: stub_ses, raising=False)
+    stub_ses.error = ClientError({'Error': {'Code': 'Throttling', 'Message': 'Maximum sending rate exceeded.'}},
+                                 'SendEmail')
+
+    response, _ = subscribe(remaining_ms=10000)
+
+    assert response['statusCode'] == 202
+    assert len(overflow_queue.receive()) == 1
+
+
+def test_confirmation_without_budget_answers_busy(slow_ses, monkeypatch):
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr('newsletter_core.confirmation.CONFIRM_TOKEN_SECRETS', [b'secret'])
+
+    response, elapsed = subscribe(remaining_ms=1500)
+
+    assert response['statusCode'] == 503
+    assert elapsed < 1.5
+
+
+def test_confirmation_without_budget_is_queued_when_a_queue_exists(slow_ses, overflow_queue, monkeypatch):
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr('newsletter_core.confirmation.CONFIRM_TOKEN_SECRETS', [b'secret'])
+
+    response, _ = subscribe(remaining_ms=1500)
+
+    assert response['statusCode'] == 202
+    assert slow_ses.calls == []
+    monkeypatch.setattr(slow_ses, 'latency', 0)
+    assert handlers.send_queue_consumer_handler({}, None)['sent'] == 1
+    assert 'token=' in slow_ses.calls[0]['Message']['Body']['Text']['Data']
+
+
+def test_overflow_mode_sends_batches_and_confirm_links_inline(stub_ses, overflow_queue, monkeypatch):
+    batch = lambda_handler(make_event(body={'subscriptions': ['a@example.com', 'b@example.com']}), None)
+    assert [r['status'] for r in json.loads(batch['body'])['results']] == ['Sent', 'Sent']
+
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr('newsletter_core.confirmation.CONFIRM_TOKEN_SECRETS', [b'secret'])
+    token = handlers.confirm_url_for('cy@example.com', 'Cy').split('token=')[1]
+    lambda_handler(make_event('GET', origin=None, queryStringParameters={'token': token}), None)
+
+    assert len(stub_ses.calls) == 3
+    assert overflow_queue.receive() == []
+
+
+def test_overflow_mode_queues_throttled_batch_items(stub_ses, overflow_queue):
+    stub_ses.error = ClientError({'Error': {'Code': 'Throttling', 'Message': 'Maximum sending rate exceeded.'}},
+                                 'SendEmail')
+
+    batch = lambda_handler(make_event(body={'subscriptions': ['a@example.com', 'b@example.com']}), None)
+
+    assert [r['status'] for r in json.loads(batch['body'])['results']] == ['Queued', 'Queued']
+    assert len(overflow_queue.receive()) == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class SESService(StubSESClient):
+    """
+    StubSESClient with the `meta` a bounded view reads its service name from;
+    the first sends fail with the given errors.
+    """
+
+    meta = SimpleNamespace(service_model=SimpleNamespace(service_name='ses'))
+
+    def __init__(self, failures=()):
+        super().__init__()
+        self.failures = list(failures)
+        self.get_send_quota = lambda: {'MaxSendRate': 1.0}
+
+    def send_email(self, **kwargs):
+        if self.failures:
+            self.calls.append(kwargs)
+            raise self.failures.pop(0)
+        return super().send_email(**kwargs)
+
+
+def throttling():
+    return ClientError({'Error': {'Code': 'Throttling', 'Message': 'Maximum sending rate exceeded.'}}, 'SendEmail')
+
+
+def test_bounded_views_share_the_bucket_and_wait_within_the_budget(monkeypatch):
+    built = []
+    ses = SESService()
+    monkeypatch.setattr(rate_limiter, 'get_bounded_client',
+                        lambda service_name, timeout: built.append((service_name, timeout)) or ses)
+    clock = FakeClock()
+    paced = RateLimitedSESClient(ses, rate=1, sleep=clock.sleep, clock=clock)
+
+    paced.bounded(2.0).send_email(Destination={'ToAddresses': ['a@b.co']})
+    # The bucket is empty: the next token comes after 1 s, which leaves enough of a 2 s budget
+    paced.bounded(2.0).send_email(Destination={'ToAddresses': ['c@d.co']})
+    assert clock.now == pytest.approx(1.0)
+    assert built[-1] == ('ses', pytest.approx(1.0))
+    # ...but not of a 1 s budget, and nothing is waited for or sent then
+    with pytest.raises(DeadlineExceeded, match='no SES send-rate token'):
+        paced.bounded(1.0).send_email(Destination={'ToAddresses': ['e@f.co']})
+    assert clock.now == pytest.approx(1.0) and len(ses.calls) == 2
+
+
+def test_bounded_throttled_sends_retry_while_the_budget_allows(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, 'uniform', lambda low, high: high)
+    ses = SESService([throttling(), throttling()])
+    monkeypatch.setattr(rate_limiter, 'get_bounded_client', lambda service_name, timeout: ses)
+    clock = FakeClock()
+    paced = RateLimitedSESClient(ses, rate=100, sleep=clock.sleep, clock=clock)
+
+    assert paced.bounded(2.0).send_email(Destination={'ToAddresses': ['a@b.co']})['MessageId']
+    assert len(ses.calls) == 3
+
+    ses.failures = [throttling()]
+    with pytest.raises(DeadlineExceeded, match='no response budget left to retry'):
+        paced.bounded(0.4).send_email(Destination={'ToAddresses': ['c@d.co']})
+
+
+def test_cold_quota_lookup_runs_on_the_bounded_client(monkeypatch):
+    quota_client = StubSESClient()
+    quota_lookups = []
+    monkeypatch.setattr(rate_limiter, 'get_bounded_client', lambda service_name, timeout: quota_client)
+    monkeypatch.setattr(rate_limiter, 'get_send_rate',
+                        lambda client, raise_timeouts=False: quota_lookups.append((client, raise_timeouts)) or 1.0)
+    inner = SimpleNamespace(meta=SimpleNamespace(service_model=SimpleNamespace(service_name='ses')))
+    paced = RateLimitedSESClient(inner)
+
+    paced.bounded(0.7).send_email(Destination={'ToAddresses': ['a@b.co']})
+
+    assert quota_lookups == [(quota_client, True)]
+    assert paced.bounded(0.7).bucket is paced.bucket
+    assert len(quota_client.calls) == 1
+
+
+@pytest.fixture
+def paced_ses(monkeypatch):
+    """
+    A real rate limiter at 1/s on a fake clock (`.clock`), over a stub SES.
+    """
+    ses = SESService()
+    ses.clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'get_bounded_client', lambda service_name, timeout: ses)
+    monkeypatch.setattr(sending, 'ses_client',
+                        RateLimitedSESClient(ses, rate=1, sleep=ses.clock.sleep, clock=ses.clock))
+    return ses
+
+
+def test_bursts_and_throttling_are_absorbed_within_a_realistic_budget(paced_ses, monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, 'uniform', lambda low, high: high)
+    ses = paced_ses
+
+    # Back-to-back signups at 1/s: the second one waits for its token
+    first, _ = subscribe(remaining_ms=10000, email='ana@example.com')
+    second, _ = subscribe(remaining_ms=10000, email='bo@example.com')
+    # A throttled send is retried after a backoff
+    ses.failures = [throttling()]
+    third, _ = subscribe(remaining_ms=10000, email='cy@example.com')
+
+    assert [r['statusCode'] for r in (first, second, third)] == [200, 200, 200]
+    assert len(ses.calls) == 4
+    # One token per send attempt at 1/s: the retry waits out the backoff and then its own token
+    assert ses.clock.now == pytest.approx(3.0)
+
+
+def subscribe_batch(emails, remaining_ms):
+    response = lambda_handler(make_event(body={'subscriptions': emails}), lambda_context(remaining_ms))
+    return sorted(result['status'] for result in json.loads(response['body'])['results'])
+
+
+def test_batch_sends_that_do_not_fit_the_budget_are_queued(paced_ses, overflow_queue, fresh_subscriber_store):
+    emails = ['a@example.com', 'b@example.com', 'c@example.com']
+
+    # A 1 s budget at 1/s has room for one send; the others would wait past it
+    assert subscribe_batch(emails, remaining_ms=1500) == ['Queued', 'Queued', 'Sent']
+    assert len(paced_ses.calls) == 1 and len(overflow_queue.receive()) == 2
+    assert all(fresh_subscriber_store.get(email) is not None for email in emails)
+
+
+def test_batch_sends_that_do_not_fit_without_a_queue_are_rolled_back(paced_ses, fresh_subscriber_store):
+    emails = ['a@example.com', 'b@example.com']
+
+    response = lambda_handler(make_event(body={'subscriptions': emails}), lambda_context(1500))
+
+    results = json.loads(response['body'])['results']
+    assert sorted(result['status'] for result in results) == ['Failed', 'Sent']
+    [failed] = [result for result in results if result['status'] == 'Failed']
+    assert failed['error'] == SERVICE_BUSY
+    assert fresh_subscriber_store.get(failed['email']) is None
+
+
+def test_batch_confirm_links_that_do_not_fit_are_queued(paced_ses, overflow_queue, monkeypatch):
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr('newsletter_core.confirmation.CONFIRM_TOKEN_SECRETS', [b'secret'])
+
+    assert subscribe_batch(['a@example.com', 'b@example.com'], remaining_ms=1500) == ['ConfirmationSent', 'Queued']
+    [(_, body)] = overflow_queue.receive()
+    assert job_kind(json.loads(body)) == CONFIRMATION_JOB
@@ -0,0 +1,62 @@
+import threading
+import time
+
+import bench_parallel_send
+from newsletter_core import dispatcher
+from newsletter_core.dispatcher import dispatch
+from newsletter_core.rate_limiter import RateLimitedSESClient
+
+
+def test_results_keep_input_order_and_capture_errors():
+    def work(n):
+        if n == 3:
+            raise ValueError('bad item')
+        return n * 2
+
+    outcomes = dispatch(work, range(6), concurrency=3)
+
+    assert [result for result, _ in outcomes] == [0, 2, 4, None, 8, 10]
+    assert isinstance(outcomes[3][1], ValueError)
+    assert all(error is None for i, (_, error) in enumerate(outcomes) if i != 3)
+
+
+def test_concurrency_limit_is_respected():
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0}
+
+    def work(_):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        time.sleep(0.01)
+        with lock:
+            state['active'] -= 1
+
+    dispatch(work, range(30), concurrency=4)
+    assert 1 < state['peak'] <= 4
+
+
+def test_one_pool_serves_every_batch_size():
+    for size in range(2, 12):
+        dispatch(lambda item: item, range(size))
+    dispatch(lambda item: item, range(6), concurrency=3)
+
+    workers = [thread for thread in threading.enumerate() if thread.name.startswith('send_')]
+    assert len(workers) <= dispatcher.SEND_CONCURRENCY
+
+
+def test_empty_input():
+    assert dispatch(lambda item: item, [], concurrency=8) == []
+
+
+def test_throughput_scales_with_concurrency():
+    results = bench_parallel_send.run(count=48, latency_ms=20.0, rate=10000.0, levels=(1, 8))
+    assert results[8] > results[1] * 4
+
+
+def test_shared_rate_limit_holds_across_workers():
+    client = RateLimitedSESClient(bench_parallel_send.SlowSESClient(0), rate=20)
+    start = time.monotonic()
+    dispatch(lambda i: client.send_email(Destination={'ToAddresses': [f'u{i}@example.com']}), range(30), 8)
+    # 20 tokens of burst, then 10 more sends at 20/s
+    assert time.monotonic() - start >= 0.4
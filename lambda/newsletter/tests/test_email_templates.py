@@ -0,0 +1,35 @@
+from newsletter_core import email_templates
+from newsletter_core.email_templates import render_welcome_email
+
+
+def test_render_splices_name_and_year():
+    rendered = render_welcome_email('Ana', year=2031)
+    assert '>Hi Ana,</p>' in rendered.html
+    assert '© 2031 TranquilMindQuest' in rendered.html
+    assert 'Hi Ana,' in rendered.text
+    assert '© 2031 TranquilMindQuest' in rendered.text
+    assert rendered.subject == 'Welcome to TranquilMindQuest Newsletter! 🧘'
+
+
+def test_css_braces_are_not_treated_as_slots():
+    rendered = render_welcome_email('Ana', year=2031)
+    assert '@media only screen and (max-width: 600px) {' in rendered.html
+    assert '{name}' not in rendered.html
+
+
+def test_name_is_html_escaped_only_in_html_body():
+    rendered = render_welcome_email('<b>"Eve"</b>', year=2031)
+    assert '>Hi &lt;b&gt;&quot;Eve&quot;&lt;/b&gt;,</p>' in rendered.html
+    assert 'Hi <b>"Eve"</b>,' in rendered.text
+
+
+def test_repeat_renders_are_cached():
+    email_templates.clear_render_cache()
+    first = render_welcome_email('Ana', year=2031)
+    second = render_welcome_email('Ana', year=2031)
+    assert first is second
+    assert email_templates._render_cached.cache_info().hits == 1
+
+
+def test_unknown_locale_falls_back_to_default():
+    assert render_welcome_email('Ana', 2031, 'xx').html == render_welcome_email('Ana', 2031).html
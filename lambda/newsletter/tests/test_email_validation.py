@@ -0,0 +1,31 @@
+import pytest
+
+from bench_email_validation import EDGE_CASES, generate_corpus, legacy_sanitize_email
+from newsletter_core.email_validation import validate_email, validate_many
+from lambda_function import sanitize_email
+
+
+@pytest.mark.parametrize('email', EDGE_CASES)
+def test_edge_cases_match_legacy(email):
+    assert validate_email(email) == legacy_sanitize_email(email)
+
+
+def test_corpus_matches_legacy():
+    corpus = generate_corpus(20000)
+    assert validate_many(corpus) == [legacy_sanitize_email(email) for email in corpus]
+
+
+def test_corpus_has_both_accepts_and_rejects():
+    results = validate_many(generate_corpus(2000))
+    assert any(results) and not all(results)
+
+
+def test_normalizes_and_rejects_injection():
+    assert validate_email('  Ana@Example.COM ') == 'ana@example.com'
+    assert validate_email('ana%0a@example.com') is None
+    assert validate_email('ana@example.com\nBcc: x@evil.test') is None
+
+
+def test_handler_uses_fast_validator():
+    assert sanitize_email(' A@B.CO ') == 'a@b.co'
+    assert validate_many(iter(['a@b.co', None, 'bad'])) == ['a@b.co', None, None]
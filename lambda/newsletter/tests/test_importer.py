@@ -0,0 +1,165 @@
+import gzip
+import io
+import tracemalloc
+
+
+import lambda_function
+from newsletter_core import handlers
+from newsletter_core.importer import (
+    detect_format,
+    import_source,
+    import_subscribers,
+    iter_csv_records,
+    iter_jsonl_records,
+)
+from newsletter_core.send_queue import InMemoryQueue, SQSQueue, decode_job
+from newsletter_core.subscriber_store import (
+    CachedSubscriberStore,
+    InMemorySubscriberStore,
+    RecentlySeenCache,
+    SQLiteSubscriberStore,
+)
+
+
+def test_csv_with_header_picks_named_columns():
+    lines = io.StringIO('First Name,Email Address\nAna,ana@example.com\n,\nBo,bo@example.com\n')
+    assert list(iter_csv_records(lines)) == [('ana@example.com', 'Ana'), ('bo@example.com', 'Bo')]
+
+
+def test_csv_without_header_uses_first_columns():
+    lines = io.StringIO('ana@example.com,Ana\nbo@example.com\n')
+    assert list(iter_csv_records(lines)) == [('ana@example.com', 'Ana'), ('bo@example.com', '')]
+
+
+def test_jsonl_accepts_objects_and_strings_and_flags_junk():
+    lines = io.StringIO('{"email": "ana@example.com", "name": "Ana"}\n"bo@example.com"\nnot json\n\n[1]\n')
+    assert list(iter_jsonl_records(lines)) == [
+        ('ana@example.com', 'Ana'), ('bo@example.com', ''), ('', ''), ('', '')
+    ]
+
+
+def test_detect_format():
+    assert detect_format('list.csv') == 'csv'
+    assert detect_format('s3://bucket/list.jsonl.gz') == 'jsonl'
+
+
+def test_import_counts_rejects_and_duplicates():
+    store = InMemorySubscriberStore()
+    store.add_if_absent('old@example.com', 'Old')
+    records = [
+        ('Ana@Example.com', 'Ana'),
+        ('ana@example.com', 'Ana again'),
+        ('not-an-email', ''),
+        ('old@example.com', ''),
+        ('bo@example.com', ''),
+    ]
+
+    stats = import_subscribers(records, store, batch_size=2, progress=None)
+
+    assert stats.as_dict() == {'read': 5, 'imported': 2, 'duplicates': 2, 'rejected': 1, 'queued': 0}
+    assert store.get('ana@example.com')['name'] == 'Ana'
+    assert store.get('bo@example.com')['name'] == 'bo'
+
+
+def test_duplicates_outside_dedupe_window_are_caught_by_store():
+    store = InMemorySubscriberStore()
+    records = [(f'user{i}@example.com', '') for i in range(5)] * 2
+
+    stats = import_subscribers(records, store, batch_size=3, dedupe_window=2, progress=None)
+
+    assert stats.imported == 5
+    assert stats.duplicates == 5
+    assert len(store) == 5
+
+
+def test_new_subscribers_are_queued():
+    queue = InMemoryQueue()
+    store = InMemorySubscriberStore()
+    store.add_if_absent('old@example.com')
+
+    stats = import_subscribers(
+        [('ana@example.com', 'Ana'), ('old@example.com', '')], store, queue, progress=None
+    )
+
+    assert stats.queued == 1
+    [(_, body)] = queue.receive()
+    assert decode_job(body) == ('ana@example.com', 'Ana')
+
+
+def test_progress_is_reported():
+    reports = []
+    import_subscribers(
+        ((f'user{i}@example.com', '') for i in range(25)), InMemorySubscriberStore(),
+        batch_size=4, progress=lambda stats: reports.append(stats.read), progress_every=10
+    )
+    assert reports == [12, 20]
+
+
+def test_sqlite_and_cached_add_many(tmp_path):
+    store = CachedSubscriberStore(SQLiteSubscriberStore(str(tmp_path / 'subs.db')), RecentlySeenCache())
+    assert store.add_many([('a@example.com', 'A'), ('b@example.com', 'B')]) == [True, True]
+    assert store.add_many([('b@example.com', 'B'), ('c@example.com', 'C')]) == [False, True]
+    assert len(store.store) == 3
+
+
+def test_sqs_send_many_uses_batches():
+    class StubSQS:
+        def __init__(self):
+            self.batches = []
+
+        def send_message_batch(self, QueueUrl, Entries):
+            self.batches.append(Entries)
+            return {'Successful': [{'Id': entry['Id']} for entry in Entries]}
+
+    sqs = StubSQS()
+    queue = SQSQueue('https://sqs.example/queue', sqs_client=sqs)
+
+    assert queue.send_many([{'e': f'u{i}@example.com', 'n': 'u'} for i in range(23)]) == 23
+    assert [len(batch) for batch in sqs.batches] == [10, 10, 3]
+
+
+def test_import_gzipped_jsonl_file(tmp_path):
+    path = tmp_path / 'subscribers.jsonl.gz'
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write('{"email": "ana@example.com", "name": "Ana"}\n{"email": "bad"}\n')
+
+    stats = import_source(str(path), InMemorySubscriberStore(), progress=None)
+    assert (stats.imported, stats.rejected) == (1, 1)
+
+
+def test_memory_stays_flat_for_large_imports():
+    def peak_for(count):
+        records = ((f'user{i}@example.com', 'Name') for i in range(count))
+        tracemalloc.start()
+        import_subscribers(records, CountingStore(), batch_size=500, dedupe_window=1000, progress=None)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    class CountingStore:
+        def add_many(self, records, now=None):
+            return [True] * len(records)
+
+    small, large = peak_for(5000), peak_for(50000)
+    assert large < small * 1.5
+
+
+def test_import_handler(tmp_path, fresh_subscriber_store, monkeypatch):
+    queue = InMemoryQueue()
+    monkeypatch.setattr(handlers, 'send_queue', queue)
+    path = tmp_path / 'list.csv'
+    path.write_text('email,name\nana@example.com,Ana\nbad\n', encoding='utf-8')
+
+    result = lambda_function.import_handler({'source': str(path), 'queueWelcome': True}, None)
+
+    assert result == {
+        'success': True, 'read': 2, 'imported': 1, 'duplicates': 0, 'rejected': 1, 'queued': 1
+    }
+    assert fresh_subscriber_store.get('ana@example.com') is not None
+    assert len(queue) == 1
+
+
+def test_import_handler_requires_queue_for_welcome(monkeypatch):
+    monkeypatch.setattr(handlers, 'send_queue', None)
+    result = lambda_function.import_handler({'source': 'list.csv', 'queueWelcome': True}, None)
+    assert result['success'] is False
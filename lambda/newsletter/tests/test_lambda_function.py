@@ -0,0 +1,65 @@
+import json
+
+from botocore.exceptions import ClientError
+
+from conftest import make_event
+from lambda_function import lambda_handler
+
+
+def test_preflight_returns_cors_headers(stub_ses):
+    response = lambda_handler(make_event('OPTIONS'), None)
+    assert response['statusCode'] == 200
+    assert response['headers']['Access-Control-Allow-Origin'] == 'https://tranquilmindquest.com'
+    assert stub_ses.calls == []
+
+
+def test_forbidden_origin_is_rejected(stub_ses):
+    response = lambda_handler(make_event(body={'email': 'a@example.com'}, origin='https://evil.test'), None)
+    assert response['statusCode'] == 403
+    assert stub_ses.calls == []
+
+
+def test_invalid_email_is_rejected(stub_ses):
+    response = lambda_handler(make_event(body={'email': 'not-an-email'}), None)
+    assert response['statusCode'] == 400
+    assert stub_ses.calls == []
+
+
+def test_valid_subscription_sends_welcome_email(stub_ses):
+    response = lambda_handler(make_event(body={'email': ' Ana@Example.com ', 'name': 'Ana'}), None)
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['messageId'] == 'stub-1'
+    sent = stub_ses.calls[0]
+    assert sent['Destination'] == {'ToAddresses': ['ana@example.com']}
+    assert '>Hi Ana,</p>' in sent['Message']['Body']['Html']['Data']
+
+
+def test_ses_error_maps_to_500(stub_ses):
+    stub_ses.error = ClientError({'Error': {'Code': 'MessageRejected', 'Message': 'no'}}, 'SendEmail')
+    response = lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+    assert response['statusCode'] == 500
+    assert 'Invalid email address' in json.loads(response['body'])['error']
+
+
+def test_both_entry_points_share_the_core_handler():
+    import importlib.util
+    import os
+
+    import lambda_function
+    from conftest import FUNCTION_DIR
+
+    path = os.path.join(FUNCTION_DIR, '..', '..', 'aws', 'lambda-newsletter-handler.py')
+    spec = importlib.util.spec_from_file_location('aws_newsletter_handler', path)
+    aws_handler = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(aws_handler)
+
+    assert aws_handler.lambda_handler is lambda_function.lambda_handler
+
+
+def test_wildcard_origin_allows_any_origin(monkeypatch):
+    from newsletter_core import cors
+
+    assert cors.lookup_cors('https://any.test')[0] is None
+    monkeypatch.setattr(cors, 'ALLOW_ANY_ORIGIN', True)
+    assert cors.lookup_cors('https://any.test') == ('*', cors.WILDCARD_CORS_HEADERS)
+    assert cors.lookup_cors('https://tranquilmindquest.com')[0] == 'https://tranquilmindquest.com'
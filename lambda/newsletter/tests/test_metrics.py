@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from conftest import make_event
+from lambda_function import lambda_handler, send_queue_consumer_handler
+from newsletter_core import metrics
+
+
+@pytest.fixture
+def metrics_enabled(monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+
+
+def emf_records(output):
+    return [json.loads(line) for line in output.splitlines() if line.startswith('{"_aws"')]
+
+
+def test_disabled_metrics_use_the_shared_noop():
+    assert metrics.start_invocation('subscribe') is metrics.NULL_METRICS
+
+
+def test_phase_timings_are_attributed_between_marks():
+    ticks = iter([0.0, 0.002, 0.005, 0.006])
+    recorder = metrics.InvocationMetrics('subscribe', cold_start=True, clock=lambda: next(ticks))
+    recorder.mark('Parse')
+    recorder.mark('Validate')
+
+    record = recorder.to_emf(status_code=200, timestamp=1)[0]
+
+    assert record['ParseTime'] == pytest.approx(2.0)
+    assert record['ValidateTime'] == pytest.approx(3.0)
+    assert record['TotalTime'] == pytest.approx(6.0)
+    assert record['ColdStart'] == 1 and record['WarmStart'] == 0
+    names = {m['Name'] for m in record['_aws']['CloudWatchMetrics'][0]['Metrics']}
+    assert {'ParseTime', 'ValidateTime', 'TotalTime', 'Invocations', 'ColdStart'} <= names
+
+
+def test_successful_signup_emits_phase_metrics(stub_ses, metrics_enabled, capsys):
+    lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+
+    (record,) = emf_records(capsys.readouterr().out)
+    assert record['Handler'] == 'subscribe'
+    assert record['StatusCode'] == 200
+    for phase in ('Cors', 'Parse', 'Validate', 'Dedupe', 'Render', 'Ses'):
+        assert f'{phase}Time' in record
+    assert record['WarmStart'] == 1
+
+
+def test_ses_error_codes_are_counted(stub_ses, metrics_enabled, capsys):
+    stub_ses.error = ClientError({'Error': {'Code': 'Throttling', 'Message': 'slow'}}, 'SendEmail')
+    lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+
+    records = emf_records(capsys.readouterr().out)
+    assert records[0]['StatusCode'] == 500
+    assert records[1]['ErrorCode'] == 'Throttling'
+    assert records[1]['SESError'] == 1
+    assert records[1]['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Handler', 'ErrorCode']]
+
+
+def test_consumer_counts_sent_and_failed(stub_ses, metrics_enabled, capsys):
+    records = [{'messageId': 'm1', 'body': '{"e":"ana@example.com","n":"Ana"}'}, {'messageId': 'm2', 'body': '{}'}]
+    send_queue_consumer_handler({'Records': records}, None)
+
+    emitted = emf_records(capsys.readouterr().out)
+    assert emitted[0]['Handler'] == 'queue-consumer'
+    assert emitted[0]['Sent'] == 1 and emitted[0]['Failed'] == 1
+    assert emitted[1]['ErrorCode'] == 'Unknown'
@@ -0,0 +1,125 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from newsletter_core import rate_limiter
+from newsletter_core.rate_limiter import RateLimitedSESClient, TokenBucket, count_recipients, get_send_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def throttle(message='Maximum sending rate exceeded.'):
+    return ClientError({'Error': {'Code': 'Throttling', 'Message': message}}, 'SendEmail')
+
+
+class FlakySES:
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.calls = 0
+        self.quota_calls = 0
+
+    def get_send_quota(self):
+        self.quota_calls += 1
+        return {'MaxSendRate': 14.0, 'Max24HourSend': 50000.0}
+
+    def send_email(self, **kwargs):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return {'MessageId': f'id-{self.calls}'}
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate(monkeypatch):
+    monkeypatch.delenv('SES_MAX_SEND_RATE', raising=False)
+    rate_limiter.reset_send_rate()
+    yield
+    rate_limiter.reset_send_rate()
+
+
+def test_bucket_paces_to_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        bucket.acquire()
+    # 2 tokens of burst, then 8 more at 2/s
+    assert clock.now == pytest.approx(4.0)
+
+
+def test_oversized_request_waits_for_full_bucket_then_goes_into_debt():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5, clock=clock, sleep=clock.sleep)
+    bucket.acquire(50)
+    assert clock.now == 0
+    bucket.acquire(1)
+    assert clock.now == pytest.approx(9.2)
+
+
+def test_try_acquire_never_blocks():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, clock=clock, sleep=clock.sleep)
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_send_rate_is_read_from_quota_once():
+    client = FlakySES([])
+    assert get_send_rate(client) == 14.0
+    assert get_send_rate(client) == 14.0
+    assert client.quota_calls == 1
+
+
+def test_send_rate_env_override(monkeypatch):
+    monkeypatch.setenv('SES_MAX_SEND_RATE', '3')
+    client = FlakySES([])
+    assert get_send_rate(client) == 3.0
+    assert client.quota_calls == 0
+
+
+def test_throttled_sends_are_retried(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, 'uniform', lambda low, high: high)
+    clock = FakeClock()
+    client = FlakySES([throttle(), throttle()])
+    wrapped = RateLimitedSESClient(client, rate=100, sleep=clock.sleep, clock=clock)
+
+    response = wrapped.send_email(Destination={'ToAddresses': ['a@example.com']})
+
+    assert response == {'MessageId': 'id-3'}
+    assert clock.now == pytest.approx(0.2 + 0.4)
+
+
+def test_daily_quota_and_other_errors_are_not_retried():
+    client = FlakySES([throttle('Daily message quota exceeded.')])
+    wrapped = RateLimitedSESClient(client, rate=100)
+    with pytest.raises(ClientError):
+        wrapped.send_email(Destination={'ToAddresses': ['a@example.com']})
+    assert client.calls == 1
+
+
+def test_retries_are_bounded():
+    clock = FakeClock()
+    client = FlakySES([throttle()] * 10)
+    wrapped = RateLimitedSESClient(client, rate=100, max_retries=2, sleep=clock.sleep, clock=clock)
+    with pytest.raises(ClientError):
+        wrapped.send_email(Destination={'ToAddresses': ['a@example.com']})
+    assert client.calls == 3
+
+
+def test_non_send_attributes_pass_through():
+    client = FlakySES([])
+    wrapped = RateLimitedSESClient(client)
+    assert wrapped.get_send_quota()['MaxSendRate'] == 14.0
+
+
+def test_recipient_counts():
+    assert count_recipients('send_email', {'Destination': {'ToAddresses': ['a'], 'BccAddresses': ['b', 'c']}}) == 3
+    destinations = [{'Destination': {'ToAddresses': [f'u{i}']}} for i in range(50)]
+    assert count_recipients('send_bulk_templated_email', {'Destinations': destinations}) == 50
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+import lambda_function
+from newsletter_core import handlers
+from conftest import make_event
+from newsletter_core.send_queue import FileQueue, InMemoryQueue, make_job
+
+
+@pytest.fixture(params=['memory', 'file'])
+def queue(request, tmp_path, monkeypatch):
+    queue = InMemoryQueue() if request.param == 'memory' else FileQueue(str(tmp_path / 'jobs'))
+    monkeypatch.setattr(handlers, 'send_queue', queue)
+    return queue
+
+
+def test_handler_enqueues_and_returns_202(stub_ses, queue):
+    response = lambda_function.lambda_handler(make_event(body={'email': 'Ana@Example.com'}), None)
+
+    assert response['statusCode'] == 202
+    assert json.loads(response['body'])['success'] is True
+    assert stub_ses.calls == []
+    assert len(queue) == 1
+
+
+def test_invalid_email_is_not_enqueued(stub_ses, queue):
+    response = lambda_function.lambda_handler(make_event(body={'email': 'nope'}), None)
+    assert response['statusCode'] == 400
+    assert len(queue) == 0
+
+
+def test_consumer_drains_queue_in_batches(stub_ses, queue):
+    for i in range(25):
+        queue.send(make_job(f'user{i}@example.com', f'User {i}'))
+
+    result = lambda_function.send_queue_consumer_handler({}, None)
+
+    assert result == {'sent': 25, 'failed': 0, 'suppressed': 0}
+    assert len(stub_ses.calls) == 25
+    assert {'ToAddresses': ['user0@example.com']} in [call['Destination'] for call in stub_ses.calls]
+    assert len(queue) == 0
+
+
+def test_consumer_releases_failed_jobs(stub_ses, queue):
+    queue.send(make_job('ana@example.com', 'Ana'))
+    stub_ses.error = ClientError({'Error': {'Code': 'Throttling', 'Message': 'slow down'}}, 'SendEmail')
+
+    result = lambda_function.send_queue_consumer_handler({'maxJobs': 1}, None)
+
+    assert result == {'sent': 0, 'failed': 1, 'suppressed': 0}
+    assert len(queue) == 1
+
+
+def test_consumer_reports_sqs_batch_item_failures(stub_ses):
+    records = [
+        {'messageId': 'm1', 'body': '{"e":"ana@example.com","n":"Ana"}'},
+        {'messageId': 'm2', 'body': 'not json'},
+    ]
+    result = lambda_function.send_queue_consumer_handler({'Records': records}, None)
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'm2'}]}
+    assert len(stub_ses.calls) == 1
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from conftest import make_event
+from newsletter_core import handlers, rate_limiter, sending
+from newsletter_core.email_templates import ses_template_content
+from newsletter_core.ses_v2 import SesV2TemplateBackend, versioned_template_name
+
+
+def client_error(code, operation):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, operation)
+
+
+class StubSESv2Client:
+    """
+    Minimal sesv2 stand-in: templates live in a dict, sends are recorded.
+    """
+
+    def __init__(self, get_error=None):
+        self.templates = {}
+        self.sends = []
+        self.get_error = get_error
+
+    def get_email_template(self, TemplateName):
+        if self.get_error is not None:
+            raise self.get_error
+        if TemplateName not in self.templates:
+            raise client_error('NotFoundException', 'GetEmailTemplate')
+        return {'TemplateName': TemplateName, 'TemplateContent': self.templates[TemplateName]}
+
+    def create_email_template(self, TemplateName, TemplateContent):
+        self.templates[TemplateName] = TemplateContent
+        return {}
+
+    def send_email(self, **kwargs):
+        self.sends.append(kwargs)
+        return {'MessageId': f'v2-{len(self.sends)}'}
+
+
+@pytest.fixture
+def v2_backend(monkeypatch, stub_ses):
+    client = StubSESv2Client()
+    monkeypatch.setattr(sending, 'sesv2_client', client)
+    monkeypatch.setattr(sending, 'sending_backend', sending.create_sending_backend('v2-template'))
+    return client
+
+
+def test_template_content_uses_handlebars_placeholders():
+    content = ses_template_content()
+    assert '{{name}}' in content['Html']
+    assert '{{year}}' in content['Html']
+    assert '{{{name}}}' in content['Text']
+    assert content['Subject']
+
+
+def test_template_name_changes_with_content():
+    content = ses_template_content()
+    changed = dict(content, Subject=content['Subject'] + '!')
+    assert versioned_template_name('welcome', content) != versioned_template_name('welcome', changed)
+
+
+def test_registers_template_once_then_sends_template_data(v2_backend, stub_ses):
+    response = handlers.lambda_handler(make_event(body={'email': 'a@example.com', 'name': 'Ana'}), None)
+    handlers.lambda_handler(make_event(body={'email': 'b@example.com'}), None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['messageId'] == 'v2-1'
+    assert len(v2_backend.templates) == 1
+    assert stub_ses.calls == []
+
+    first = v2_backend.sends[0]
+    template = first['Content']['Template']
+    assert template['TemplateName'] in v2_backend.templates
+    assert json.loads(template['TemplateData'])['name'] == 'Ana'
+    assert first['Destination'] == {'ToAddresses': ['a@example.com']}
+
+
+def test_existing_template_is_not_recreated(monkeypatch):
+    client = StubSESv2Client()
+    backend = SesV2TemplateBackend(lambda: client, 'welcome', 'from@example.com', 'reply@example.com')
+    client.templates[backend.template_name] = backend.content
+    monkeypatch.setattr(client, 'create_email_template', None)
+
+    assert backend.send_welcome('a@example.com', 'Friend') == 'v2-1'
+
+
+def test_template_registration_runs_on_the_bounded_client():
+    unbounded, bounded = StubSESv2Client(), StubSESv2Client()
+    unbounded.bounded = lambda timeout: bounded
+    unbounded.get_email_template = unbounded.create_email_template = None
+    backend = SesV2TemplateBackend(lambda: unbounded, 'welcome', 'from@example.com', 'reply@example.com')
+
+    backend.send_welcome('a@example.com', 'Ana', timeout=0.5)
+
+    assert list(bounded.templates) == [backend.template_name]
+    assert len(bounded.sends) == 1 and unbounded.sends == []
+
+
+def test_configured_v2_backend_registers_templates_on_the_bounded_client(monkeypatch):
+    unbounded, bounded = StubSESv2Client(), StubSESv2Client()
+    unbounded.bounded = lambda timeout: bounded
+    unbounded.get_email_template = unbounded.create_email_template = None
+    monkeypatch.setattr(sending, 'sesv2_client', unbounded)
+    backend = sending.create_sending_backend('v2-template')
+
+    backend.send_welcome('a@example.com', 'Ana', timeout=0.5)
+
+    assert list(bounded.templates) == [backend.primary.template_name]
+    assert len(bounded.sends) == 1 and unbounded.sends == []
+
+
+def test_falls_back_to_v1_when_template_unavailable(monkeypatch, stub_ses):
+    client = StubSESv2Client(get_error=client_error('AccessDeniedException', 'GetEmailTemplate'))
+    monkeypatch.setattr(sending, 'sesv2_client', client)
+    monkeypatch.setattr(sending, 'sending_backend', sending.create_sending_backend('v2-template'))
+
+    response = handlers.lambda_handler(make_event(body={'email': 'a@example.com'}), None)
+
+    assert response['statusCode'] == 200
+    assert client.sends == []
+    assert len(stub_ses.calls) == 1
+    assert 'Message' in stub_ses.calls[0]
+
+
+def test_send_rate_read_from_sesv2_account(monkeypatch):
+    monkeypatch.delenv('SES_MAX_SEND_RATE', raising=False)
+    rate_limiter.reset_send_rate()
+
+    class AccountClient:
+        def get_account(self):
+            return {'SendQuota': {'MaxSendRate': 40.0, 'Max24HourSend': 100000.0}}
+
+    try:
+        assert rate_limiter.get_send_rate(AccountClient()) == 40.0
+    finally:
+        rate_limiter.reset_send_rate()
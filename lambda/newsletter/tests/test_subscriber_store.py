@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+from conftest import LocalDynamoDB, make_event
+from lambda_function import lambda_handler
+from newsletter_core.subscriber_store import (
+    CachedSubscriberStore,
+    DynamoDBSubscriberStore,
+    InMemorySubscriberStore,
+    RecentlySeenCache,
+    SQLiteSubscriberStore,
+)
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'dynamodb'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return InMemorySubscriberStore()
+    if request.param == 'sqlite':
+        return SQLiteSubscriberStore(str(tmp_path / 'subscribers.db'))
+    return DynamoDBSubscriberStore('subscribers', client=LocalDynamoDB('email'))
+
+
+def test_conditional_insert(store):
+    assert store.add_if_absent('ana@example.com', 'Ana', now=100) is True
+    assert store.add_if_absent('ana@example.com', 'Other', now=200) is False
+    assert store.get('ana@example.com') == {'email': 'ana@example.com', 'name': 'Ana', 'subscribed_at': 100}
+    store.discard('ana@example.com')
+    assert store.get('ana@example.com') is None
+    assert store.add_if_absent('ana@example.com', 'Ana') is True
+
+
+def test_pages_cover_every_subscriber_once(store):
+    emails = [f'user{i:02d}@example.com' for i in range(7)]
+    store.add_many([(email, '') for email in reversed(emails)], now=100)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        records, cursor = store.page(cursor, limit=3)
+        seen.extend(record['email'] for record in records)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert sorted(seen) == emails
+    assert pages == 3
+
+
+def test_cache_short_circuits_backend():
+    backend = LocalDynamoDB('email')
+    store = CachedSubscriberStore(DynamoDBSubscriberStore('subscribers', client=backend))
+    assert store.add_if_absent('ana@example.com') is True
+    assert store.add_if_absent('ana@example.com') is False
+    assert backend.count('put_item') == 1
+
+
+def test_recently_seen_entries_expire_and_are_bounded():
+    now = [0.0]
+    cache = RecentlySeenCache(ttl_seconds=10, maxsize=2, clock=lambda: now[0])
+    cache.add('a')
+    cache.add('b')
+    cache.add('c')
+    assert not cache.seen('a')
+    assert cache.seen('c')
+    now[0] = 11
+    assert not cache.seen('c')
+
+
+def test_repeat_signup_skips_rendering_and_ses(stub_ses, monkeypatch):
+    from newsletter_core import sending
+    render = sending.render_welcome_email
+    renders = []
+    monkeypatch.setattr(
+        sending, 'render_welcome_email', lambda name, **kwargs: renders.append(name) or render(name, **kwargs)
+    )
+
+    first = lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+    second = lambda_handler(make_event(body={'email': ' ANA@example.com'}), None)
+
+    assert first['statusCode'] == 200 and second['statusCode'] == 200
+    assert 'already subscribed' in json.loads(second['body'])['message']
+    assert len(stub_ses.calls) == 1
+    assert len(renders) == 1
+
+
+def test_failed_send_allows_retry(stub_ses):
+    stub_ses.error = ClientError({'Error': {'Code': 'MessageRejected', 'Message': 'no'}}, 'SendEmail')
+    assert lambda_handler(make_event(body={'email': 'ana@example.com'}), None)['statusCode'] == 500
+
+    stub_ses.error = None
+    assert lambda_handler(make_event(body={'email': 'ana@example.com'}), None)['statusCode'] == 200
+    assert len(stub_ses.calls) == 2
@@ -0,0 +1,140 @@
+import json
+import os
+
+import pytest
+
+import lambda_function
+from conftest import LocalDynamoDB, make_event
+from newsletter_core import handlers
+from newsletter_core.send_queue import InMemoryQueue, make_job
+from newsletter_core.suppression import (
+    CachedSuppressionIndex,
+    DynamoDBSuppressionIndex,
+    InMemorySuppressionIndex,
+    SQLiteSuppressionIndex,
+    feedback_entries,
+    notification_from_record,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'ses_feedback_sns.json')
+
+
+@pytest.fixture
+def feedback_event():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_only_permanent_bounces_and_complaints_are_suppressed(feedback_event):
+    entries = [
+        entry
+        for record in feedback_event['Records']
+        for entry in feedback_entries(notification_from_record(record))
+    ]
+    assert entries == [('gone@example.com', 'bounce:General'), ('angry@example.com', 'complaint:abuse')]
+
+
+def test_feedback_handler_fills_the_index(feedback_event, fresh_suppression_index):
+    result = lambda_function.feedback_handler(feedback_event, None)
+
+    assert result == {'suppressed': 2, 'ignored': 2}
+    assert fresh_suppression_index.is_suppressed('gone@example.com')
+    assert fresh_suppression_index.is_suppressed('angry@example.com')
+    assert not fresh_suppression_index.is_suppressed('full@example.com')
+
+
+def test_feedback_via_sqs_envelope(fresh_suppression_index, feedback_event):
+    sns = feedback_event['Records'][0]['Sns']
+    event = {'Records': [{'messageId': '1', 'body': json.dumps(sns)}, {'messageId': '2', 'body': 'junk'}]}
+
+    assert lambda_function.feedback_handler(event, None) == {'suppressed': 1, 'ignored': 1}
+    assert fresh_suppression_index.is_suppressed('gone@example.com')
+
+
+def test_suppressed_address_is_never_sent(stub_ses, fresh_suppression_index, fresh_subscriber_store):
+    fresh_suppression_index.suppress_many([('gone@example.com', 'bounce:General')])
+
+    response = lambda_function.lambda_handler(make_event(body={'email': 'Gone@Example.com'}), None)
+
+    assert response['statusCode'] == 400
+    assert stub_ses.calls == []
+    assert fresh_subscriber_store.get('gone@example.com') is None
+
+
+def test_batch_and_queue_skip_suppressed(stub_ses, fresh_suppression_index, monkeypatch):
+    fresh_suppression_index.suppress_many([('gone@example.com', 'complaint:abuse')])
+
+    response = lambda_function.lambda_handler(
+        make_event(body={'subscriptions': ['gone@example.com', 'ok@example.com']}), None
+    )
+    assert [r['status'] for r in json.loads(response['body'])['results']] == ['Suppressed', 'Sent']
+
+    queue = InMemoryQueue()
+    queue.send(make_job('gone@example.com', 'Gone'))
+    monkeypatch.setattr(handlers, 'send_queue', queue)
+    result = lambda_function.send_queue_consumer_handler({}, None)
+
+    assert result == {'sent': 0, 'failed': 0, 'suppressed': 1}
+    assert len(queue) == 0
+    assert len(stub_ses.calls) == 1
+
+
+def test_index_errors_fail_open(stub_ses, monkeypatch):
+    class BrokenIndex:
+        def is_suppressed(self, email):
+            raise RuntimeError('table unavailable')
+
+    monkeypatch.setattr(handlers, 'suppression_index', BrokenIndex())
+    response = lambda_function.lambda_handler(make_event(body={'email': 'ok@example.com'}), None)
+    assert response['statusCode'] == 200
+
+
+def test_cache_answers_repeat_lookups():
+    class CountingIndex(InMemorySuppressionIndex):
+        lookups = 0
+
+        def is_suppressed(self, email):
+            CountingIndex.lookups += 1
+            return super().is_suppressed(email)
+
+    index = CachedSuppressionIndex(CountingIndex())
+    for _ in range(3):
+        assert not index.is_suppressed('ok@example.com')
+    assert CountingIndex.lookups == 1
+
+    index.suppress_many([('ok@example.com', 'bounce:General')])
+    assert index.is_suppressed('ok@example.com')
+
+
+def test_sqlite_index(tmp_path):
+    index = SQLiteSuppressionIndex(str(tmp_path / 'suppressions.db'))
+    index.suppress_many([('a@example.com', 'bounce:General'), ('b@example.com', 'complaint:abuse')])
+    index.suppress_many([('a@example.com', 'complaint:abuse')])
+
+    assert len(index) == 2
+    assert index.get('a@example.com')['reason'] == 'complaint:abuse'
+    index.remove('a@example.com')
+    assert not index.is_suppressed('a@example.com')
+
+
+def test_dynamodb_index_batches_writes_and_retries_unprocessed(monkeypatch):
+    monkeypatch.setattr('newsletter_core.suppression.time.sleep', lambda seconds: None)
+
+    class FlakyDynamoDB(LocalDynamoDB):
+        batches = ()
+
+        def batch_write_item(self, RequestItems):
+            [(table, requests)] = RequestItems.items()
+            self.batches += (len(requests),)
+            # Leave the last item unprocessed on the first full batch
+            unprocessed = requests[-1:] if len(self.batches) == 1 else []
+            super().batch_write_item({table: requests[:len(requests) - len(unprocessed)]})
+            return {'UnprocessedItems': {table: unprocessed} if unprocessed else {}}
+
+    client = FlakyDynamoDB('email')
+    index = DynamoDBSuppressionIndex('suppressions', client=client)
+    index.suppress_many([(f'user{i}@example.com', 'bounce:General') for i in range(30)])
+
+    assert client.batches == (25, 1, 5)
+    assert len(client.items) == 30
+    assert index.is_suppressed('user24@example.com')
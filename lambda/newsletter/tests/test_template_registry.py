@@ -0,0 +1,183 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import bench_templates
+import lambda_function
+from conftest import make_event
+from newsletter_core import confirmation, handlers
+from newsletter_core.send_queue import InMemoryQueue, decode_localized_job, make_job
+from newsletter_core.ses_v2 import SesV2TemplateBackend
+from newsletter_core.template_registry import TemplateRegistry, inline_css, negotiate_locale
+from test_ses_v2 import StubSESv2Client
+
+AVAILABLE = ('en', 'es')
+
+
+def localized_event(accept_language, **body):
+    event = make_event(body=body)
+    event['headers']['accept-language'] = accept_language
+    return event
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('es-MX,es;q=0.9,en;q=0.8', 'es'),
+    ('fr-CA,fr;q=0.9', 'en'),
+    ('de;q=0,ES;q=0.5,en;q=0.4', 'es'),
+    ('en-GB;q=0.2, es-AR;q=0.7', 'es'),
+    ('*', 'en'),
+    ('es;q=oops, en', 'en'),
+    ('', 'en'),
+])
+def test_negotiate_locale(header, expected):
+    assert negotiate_locale(header, AVAILABLE) == expected
+
+
+def test_css_is_inlined_by_specificity_and_inline_styles_win():
+    source = (
+        '<html><head><style>'
+        'p { color: black; margin: 0 } .footer p { color: gray } a:hover { color: red }'
+        '@media (max-width: 600px) { .footer { padding: 0 !important; } }'
+        '</style></head><body>'
+        '<p>Hi {name},</p>'
+        '<div class="footer"><p style="margin: 4px">x</p><a href="{unsubscribe_url}&amp;a=1">u</a><br></div>'
+        '</body></html>'
+    )
+
+    inlined = inline_css(source, read_stylesheet=None)
+
+    assert '<p style="color: black; margin: 0;">Hi {name},</p>' in inlined
+    assert '<p style="color: gray; margin: 4px;">x</p>' in inlined
+    # Not inlinable: kept in a <style> block, in their original form
+    assert 'a:hover { color: red }' in inlined and '@media (max-width: 600px) {' in inlined
+    assert '<a href="{unsubscribe_url}&amp;a=1">' in inlined
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    (tmp_path / 'manifest.json').write_text(json.dumps({
+        'welcome': {'subject': {'en': 'Welcome', 'es': 'Bienvenido', 'de': 'Willkommen'}},
+        'welcome_b': {'body': 'welcome', 'subject': {'en': 'You are in!'}},
+    }), encoding='utf-8')
+    (tmp_path / 'welcome.css').write_text('p { color: #333333; }', encoding='utf-8')
+    for locale, greeting in (('en', 'Hi'), ('es', 'Hola')):
+        (tmp_path / f'welcome.{locale}.html').write_text(
+            f'<head><link rel="stylesheet" href="welcome.css"></head><p>{greeting} {{name}}</p>', encoding='utf-8'
+        )
+        (tmp_path / f'welcome.{locale}.txt').write_text(f'{greeting} {{name}}', encoding='utf-8')
+    return tmp_path
+
+
+def test_variants_compile_once_and_fall_back(template_dir):
+    registry = TemplateRegistry(str(template_dir))
+    reads = []
+    read = registry.read
+    registry.read = lambda filename: reads.append(filename) or read(filename)
+
+    spanish = registry.variant('welcome', 'es')
+
+    assert spanish.subject == 'Bienvenido'
+    assert spanish.html.render({'name': 'Ana'}) == '<head></head><p style="color: #333333;">Hola Ana</p>'
+    assert spanish.text.render({'name': 'Ana'}) == 'Hola Ana'
+    assert registry.variant('welcome', 'es-MX') is spanish
+    assert registry.variant('welcome', 'es') is spanish
+    assert len(reads) == 3
+    # German has a subject but no body files, so it is not offered
+    assert registry.locales('welcome') == ('en', 'es')
+    assert registry.variant('welcome', 'de').subject == 'Welcome'
+    # An A/B subject line reuses the welcome bodies
+    assert registry.variant('welcome_b').subject == 'You are in!'
+    assert registry.variant('welcome_b').text.segments == registry.variant('welcome').text.segments
+    with pytest.raises(KeyError):
+        registry.variant('missing')
+
+
+def test_signup_gets_the_welcome_email_in_the_browser_language(stub_ses):
+    response = lambda_function.lambda_handler(
+        localized_event('es-ES,es;q=0.9,en;q=0.8', email='ana@example.com', name='Ana'), None
+    )
+
+    assert response['statusCode'] == 200
+    message = stub_ses.calls[0]['Message']
+    assert message['Subject']['Data'] == '¡Bienvenido al boletín de TranquilMindQuest! 🧘'
+    assert 'Hola, Ana:' in message['Body']['Text']['Data']
+    assert '<html lang="es">' in message['Body']['Html']['Data']
+
+
+def test_queued_jobs_keep_their_locale(stub_ses, monkeypatch):
+    queue = InMemoryQueue()
+    monkeypatch.setattr(handlers, 'send_queue', queue)
+
+    lambda_function.lambda_handler(localized_event('es', email='ana@example.com', name='Ana'), None)
+    [(receipt, body)] = queue.receive()
+    queue.release(receipt)
+
+    assert decode_localized_job(body) == ('ana@example.com', 'Ana', 'es')
+    assert decode_localized_job(json.dumps(make_job('bo@example.com', 'Bo'))) == ('bo@example.com', 'Bo', 'en')
+    assert lambda_function.send_queue_consumer_handler({}, None)['sent'] == 1
+    assert 'Hola, Ana:' in stub_ses.calls[0]['Message']['Body']['Text']['Data']
+
+
+def test_confirmation_and_welcome_follow_accept_language(stub_ses, monkeypatch, fresh_subscriber_store):
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr(confirmation, 'CONFIRM_TOKEN_SECRETS', [b'secret'])
+    monkeypatch.setattr(confirmation, 'CONFIRM_URL', 'https://api.example.com/subscribe')
+    monkeypatch.setattr(confirmation, 'CONFIRM_REDIRECT_URL', '')
+
+    lambda_function.lambda_handler(localized_event('es', email='ana@example.com', name='Ana'), None)
+    text = stub_ses.calls[0]['Message']['Body']['Text']['Data']
+    assert stub_ses.calls[0]['Message']['Subject']['Data'] == 'Confirma tu suscripción a TranquilMindQuest'
+    url = next(line for line in text.splitlines() if line.startswith('https://api.example.com/subscribe'))
+
+    confirm = make_event('GET', origin=None, queryStringParameters={'token': parse_qs(urlparse(url).query)['token'][0]})
+    confirm['headers']['Accept-Language'] = 'es-419'
+    lambda_function.lambda_handler(confirm, None)
+
+    assert 'Hola, Ana:' in stub_ses.calls[1]['Message']['Body']['Text']['Data']
+
+
+def test_welcome_after_confirmation_keeps_the_signup_locale(stub_ses, monkeypatch, fresh_subscriber_store):
+    monkeypatch.setattr(handlers, 'confirm_subscriptions', True)
+    monkeypatch.setattr(confirmation, 'CONFIRM_TOKEN_SECRETS', [b'secret'])
+    monkeypatch.setattr(confirmation, 'CONFIRM_URL', 'https://api.example.com/subscribe')
+    monkeypatch.setattr(confirmation, 'CONFIRM_REDIRECT_URL', '')
+
+    def open_link(token, accept_language):
+        confirm = make_event('GET', origin=None, queryStringParameters={'token': token})
+        confirm['headers']['Accept-Language'] = accept_language
+        lambda_function.lambda_handler(confirm, None)
+
+    lambda_function.lambda_handler(localized_event('es', email='ana@example.com', name='Ana'), None)
+    text = stub_ses.calls[0]['Message']['Body']['Text']['Data']
+    url = next(line for line in text.splitlines() if line.startswith('https://api.example.com/subscribe'))
+    # The link is opened in a mail client that asks for English
+    open_link(parse_qs(urlparse(url).query)['token'][0], 'en-US,en;q=0.9')
+    assert 'Hola, Ana:' in stub_ses.calls[1]['Message']['Body']['Text']['Data']
+
+    # Links issued before tokens carried a locale still follow the browser
+    old_token = confirmation.create_token('bo@example.com', 'Bo')
+    open_link(old_token, 'es')
+    assert 'Hola, Bo:' in stub_ses.calls[2]['Message']['Body']['Text']['Data']
+
+
+def test_v2_backend_registers_one_stored_template_per_locale():
+    client = StubSESv2Client()
+    backend = SesV2TemplateBackend(lambda: client, 'welcome', 'from@example.com', 'reply@example.com')
+
+    backend.send_welcome('a@example.com', 'Ana', locale='es')
+    backend.send_welcome('b@example.com', 'Bo')
+    backend.send_welcome('c@example.com', 'Cy', locale='es')
+
+    assert len(client.templates) == 2
+    names = [send['Content']['Template']['TemplateName'] for send in client.sends]
+    assert names[0] == names[2] != names[1] == backend.template_name
+    assert client.templates[names[0]]['Subject'].startswith('¡Bienvenido')
+
+
+def test_benchmark_reports_every_variant():
+    results = bench_templates.run(iterations=50, warmup=5)
+
+    assert {r['variant'] for r in results} == {'welcome.en', 'welcome.es', 'confirm.en', 'confirm.es'}
+    for r in results:
+        assert r['ops_per_sec'] > 0 and r['compile_ms'] > 0 and r['html_bytes'] > 1000
@@ -0,0 +1,152 @@
+import email
+import html
+import json
+from email import policy
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from conftest import make_event
+from lambda_function import bulk_send_handler, lambda_handler
+from newsletter_core import handlers, sending, unsubscribe
+from newsletter_core.confirmation import create_token, verify_token
+from newsletter_core.email_templates import welcome_template
+from newsletter_core.raw_email import RawEmailTemplate
+from newsletter_core.ses_v2 import SesV2TemplateBackend
+from newsletter_core.unsubscribe import create_unsubscribe_token, verify_unsubscribe_token
+
+SECRET = b'unsubscribe-secret'
+UNSUBSCRIBE_URL = 'https://api.tranquilmindquest.com/unsubscribe'
+
+
+@pytest.fixture
+def one_click(monkeypatch, stub_ses):
+    monkeypatch.setattr(unsubscribe, 'UNSUBSCRIBE_TOKEN_SECRETS', [SECRET])
+    monkeypatch.setattr(unsubscribe, 'UNSUBSCRIBE_URL', UNSUBSCRIBE_URL)
+    monkeypatch.setattr(sending, 'sending_backend', sending.create_sending_backend('v1'))
+    return stub_ses
+
+
+def unsubscribe_event(method, token):
+    # Mail clients send the one-click POST without an Origin header
+    return make_event(
+        method, 'List-Unsubscribe=One-Click', origin=None,
+        path='/unsubscribe', queryStringParameters={'token': token}
+    )
+
+
+def parse_raw(call):
+    return email.message_from_bytes(call['RawMessage']['Data'], policy=policy.default)
+
+
+def token_from(message):
+    url = message['List-Unsubscribe'].strip('<>')
+    return parse_qs(urlparse(url).query)['token'][0]
+
+
+def test_unsubscribe_tokens_do_not_expire_and_are_not_confirm_tokens():
+    token = create_unsubscribe_token('ana@example.com', SECRET)
+
+    assert verify_unsubscribe_token(token, [SECRET]) == 'ana@example.com'
+    assert verify_unsubscribe_token(token, [b'other']) is None
+    # A confirm token signed with the same secret is not an unsubscribe token, and vice versa
+    assert verify_unsubscribe_token(create_token('ana@example.com', 'Ana', SECRET), [SECRET]) is None
+    assert verify_token(token, [SECRET]) is None
+
+
+def test_raw_template_decodes_to_the_rendered_bodies():
+    subject, html_template, text_template = welcome_template()
+    raw_template = RawEmailTemplate(subject, html_template, text_template, 'from@example.com', 'reply@example.com')
+    values = {'name': 'Zoë <b>', 'year': '2026', 'unsubscribe_url': f'{UNSUBSCRIBE_URL}?token=a.b&x=1'}
+
+    data = raw_template.build('zoe@example.com', values, [('List-Unsubscribe', '<https://x/u>')])
+    message = email.message_from_bytes(data, policy=policy.default)
+
+    assert max(len(line) for line in data.split(b'\r\n')) <= 78
+    assert message['Subject'] == subject
+    assert message['To'] == 'zoe@example.com'
+    assert message['List-Unsubscribe'] == '<https://x/u>'
+    text_part, html_part = [part.get_payload(decode=True).decode('utf-8') for part in message.iter_parts()]
+    escaped = {slot: html.escape(value) for slot, value in values.items()}
+    assert html_part.replace('\r\n', '\n') == html_template.render(escaped)
+    assert text_part.replace('\r\n', '\n') == text_template.render(values)
+
+
+def test_welcome_email_carries_one_click_headers(one_click):
+    response = lambda_handler(make_event(body={'email': 'ana@example.com', 'name': 'Ana'}), None)
+
+    assert response['statusCode'] == 200
+    assert one_click.calls == []
+    [call] = one_click.raw_calls
+    assert call['Destinations'] == ['ana@example.com']
+    message = parse_raw(call)
+    assert message['List-Unsubscribe-Post'] == 'List-Unsubscribe=One-Click'
+    assert verify_unsubscribe_token(token_from(message), [SECRET]) == 'ana@example.com'
+    # The footer link is the same signed link
+    assert f'token={token_from(message)}' in message.get_body(('plain',)).get_content()
+
+
+def test_one_click_post_suppresses_and_forgets(one_click, fresh_subscriber_store, fresh_suppression_index):
+    lambda_handler(make_event(body={'email': 'ana@example.com', 'name': 'Ana'}), None)
+    token = token_from(parse_raw(one_click.raw_calls[0]))
+
+    response = lambda_handler(unsubscribe_event('POST', token), None)
+
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Type'].startswith('text/html')
+    assert fresh_suppression_index.get('ana@example.com')['reason'] == 'unsubscribe'
+    assert fresh_subscriber_store.get('ana@example.com') is None
+    result = bulk_send_handler({'recipients': ['ana@example.com']}, None)
+    assert result['results'][0]['status'] == 'Suppressed'
+
+
+def test_get_only_shows_the_button(one_click, fresh_suppression_index):
+    token = create_unsubscribe_token('ana@example.com', SECRET)
+
+    response = lambda_handler(unsubscribe_event('GET', token), None)
+
+    assert response['statusCode'] == 200
+    assert 'method="post"' in response['body']
+    assert 'ana@example.com' in response['body']
+    assert not fresh_suppression_index.is_suppressed('ana@example.com')
+
+
+def test_invalid_token_is_rejected(one_click, fresh_suppression_index):
+    forged = create_unsubscribe_token('ana@example.com', b'guess')
+
+    for method in ('GET', 'POST'):
+        assert lambda_handler(unsubscribe_event(method, forged), None)['statusCode'] == 400
+    assert len(fresh_suppression_index.index) == 0
+
+
+def test_signing_up_again_lifts_an_unsubscribe_but_not_a_bounce(one_click, fresh_suppression_index):
+    fresh_suppression_index.suppress_many([('ana@example.com', 'unsubscribe'), ('bo@example.com', 'bounce:General')])
+
+    again = lambda_handler(make_event(body={'email': 'ana@example.com'}), None)
+    bounced = lambda_handler(make_event(body={'email': 'bo@example.com'}), None)
+
+    assert again['statusCode'] == 200
+    assert not fresh_suppression_index.is_suppressed('ana@example.com')
+    assert bounced['statusCode'] == 400
+    assert json.loads(bounced['body'])['error'] == handlers.ADDRESS_SUPPRESSED
+
+
+def test_v2_template_sends_list_unsubscribe_headers():
+    sends = []
+
+    class Client:
+        def get_email_template(self, **kwargs):
+            return {}
+
+        def send_email(self, **kwargs):
+            sends.append(kwargs)
+            return {'MessageId': 'v2-1'}
+
+    backend = SesV2TemplateBackend(
+        Client, 'welcome', 'from@example.com', 'reply@example.com', lambda address: f'{UNSUBSCRIBE_URL}?token=t'
+    )
+    backend.send_welcome('ana@example.com', 'Ana')
+
+    template = sends[0]['Content']['Template']
+    assert json.loads(template['TemplateData'])['unsubscribe_url'] == f'{UNSUBSCRIBE_URL}?token=t'
+    assert {'Name': 'List-Unsubscribe', 'Value': f'<{UNSUBSCRIBE_URL}?token=t>'} in template['Headers']